@@ -19,7 +19,7 @@ from opennem.api.tasks.router import router as tasks_router
 from opennem.api.weather.router import router as weather_router
 from opennem.core.time import INTERVALS, PERIODS
 from opennem.core.units import UNITS
-from opennem.db import database, get_database_session
+from opennem.db import db_connect_async, db_disconnect, get_database_session
 from opennem.db.models.opennem import FuelTech, Network, NetworkRegion
 from opennem.schema.network import NetworkRegionSchema, NetworkSchema
 from opennem.schema.opennem import FueltechSchema
@@ -77,16 +77,21 @@ app.add_middleware(
 )
 
 
-# @app.on_event("startup")
+@app.on_event("startup")
 async def startup() -> None:
     logger.debug("In startup")
-    await database.connect()
 
+    # async queries connect on first use if the database isn't up yet
+    try:
+        await db_connect_async()
+    except Exception as e:
+        logger.error("Could not connect async database: {}".format(e))
 
-# @app.on_event("shutdown")
+
+@app.on_event("shutdown")
 async def shutdown() -> None:
     logger.debug("In shutdown")
-    await database.disconnect()
+    await db_disconnect()
 
 
 @app.get("/networks", response_model=List[NetworkSchema])
@@ -4,93 +4,120 @@ from typing import List, Optional
 from sqlalchemy import sql
 from sqlalchemy.sql.elements import TextClause
 
-from opennem.api.stats.controllers import networks_to_in
+from opennem.api.templates import get_query, register_query_template
 from opennem.schema.dates import TimeSeries
 from opennem.schema.network import NetworkNEM, NetworkSchema, NetworkWEM
 from opennem.schema.stats import StatTypes
 
+# template slots
+WEM_APVI_CASE = "or (f.network_id='APVI' and f.network_region='WEM')"
 
-def weather_observation_query(time_series: TimeSeries, station_codes: List[str]) -> str:
+NETWORK_REGION_FACILITY = "f.network_region = :network_region and"
 
-    if time_series.interval.interval > 1440:
-        # @TODO replace with mv
-        __query = """
-        select
-            date_trunc('{trunc}', t.observation_time at time zone '{tz}') as observation_month,
-            t.station_id,
-            avg(t.temp_avg),
-            min(t.temp_min),
-            max(t.temp_max)
-        from
-            (
-                select
-                    time_bucket_gapfill('1 day', observation_time) as observation_time,
-                    fs.station_id,
-                    avg(fs.temp_air) as temp_avg,
-
-                    case when min(fs.temp_min) is not null
-                        then min(fs.temp_min)
-                        else min(fs.temp_air)
-                    end as temp_min,
-
-                    case when max(fs.temp_max) is not null
-                        then max(fs.temp_max)
-                        else max(fs.temp_air)
-                    end as temp_max
-
-                from bom_observation fs
-                where
-                    fs.station_id in ({station_codes}) and
-                    fs.observation_time <= '{date_end}' and
-                    fs.observation_time >= '{date_start}'
-                group by 1, 2
-            ) as t
-        group by 1, 2;
-        """.format(
-            trunc=time_series.interval.trunc,
-            tz=time_series.network.timezone_database,
-            station_codes=",".join(["'{}'".format(i) for i in station_codes]),
-            date_start=time_series.get_range().start,
-            date_end=time_series.get_range().end,
-        )
+NETWORK_REGION_BALANCING = "bs.network_region = :network_region and"
 
-    else:
-        __query = """
-        select
-            time_bucket_gapfill('{interval_sql}', observation_time) as ot,
-            fs.station_id as station_id,
-            avg(fs.temp_air) as temp_air,
+NETWORK_REGION_MV = "t.network_region = :network_region and"
 
-            case when min(fs.temp_min) is not null
-                then min(fs.temp_min)
-                else min(fs.temp_air)
-            end as temp_min,
+NETWORK_REGION_FLOW = "(t.flow_from = :network_region or t.flow_to = :network_region) and"
 
-            case when max(fs.temp_max) is not null
-                then max(fs.temp_max)
-                else max(fs.temp_air)
-            end as temp_max
+# price group fields
+GROUP_NETWORK = "bs.network_id"
 
-        from bom_observation fs
-        where
-            fs.station_id in ({station_codes}) and
-            fs.observation_time <= '{date_end}' and
-            fs.observation_time >= '{date_start}'
-        group by 1, 2;
-        """.format(
-            interval_sql=time_series.interval.interval_sql,
-            station_codes=",".join(["'{}'".format(i) for i in station_codes]),
-            date_start=time_series.get_range().start,
-            date_end=time_series.get_range().end,
-        )
+GROUP_NETWORK_REGION = "bs.network_region"
 
-    return dedent(__query)
+GROUP_COUNTRY = "'AU'"
 
 
-def interconnector_power_flow(time_series: TimeSeries, network_region: str) -> str:
-    """Get interconnector region flows using materialized view"""
+def network_codes_array(networks: List[NetworkSchema]) -> List[str]:
+    return [n.code for n in networks]
 
-    ___query = """
+
+WEATHER_OBSERVATION_MONTHLY = register_query_template(
+    "weather_observation_monthly",
+    """
+    select
+        date_trunc(:trunc, t.observation_time at time zone :timezone) as observation_month,
+        t.station_id,
+        avg(t.temp_avg),
+        min(t.temp_min),
+        max(t.temp_max)
+    from
+        (
+            select
+                time_bucket_gapfill('1 day', observation_time) as observation_time,
+                fs.station_id,
+                avg(fs.temp_air) as temp_avg,
+
+                case when min(fs.temp_min) is not null
+                    then min(fs.temp_min)
+                    else min(fs.temp_air)
+                end as temp_min,
+
+                case when max(fs.temp_max) is not null
+                    then max(fs.temp_max)
+                    else max(fs.temp_air)
+                end as temp_max
+
+            from bom_observation fs
+            where
+                fs.station_id = ANY(:station_codes) and
+                fs.observation_time <= :date_end and
+                fs.observation_time >= :date_start
+            group by 1, 2
+        ) as t
+    group by 1, 2;
+    """,
+)
+
+WEATHER_OBSERVATION = register_query_template(
+    "weather_observation",
+    """
+    select
+        time_bucket_gapfill(CAST(:interval AS text)::interval, observation_time) as ot,
+        fs.station_id as station_id,
+        avg(fs.temp_air) as temp_air,
+
+        case when min(fs.temp_min) is not null
+            then min(fs.temp_min)
+            else min(fs.temp_air)
+        end as temp_min,
+
+        case when max(fs.temp_max) is not null
+            then max(fs.temp_max)
+            else max(fs.temp_air)
+        end as temp_max
+
+    from bom_observation fs
+    where
+        fs.station_id = ANY(:station_codes) and
+        fs.observation_time <= :date_end and
+        fs.observation_time >= :date_start
+    group by 1, 2;
+    """,
+)
+
+
+def weather_observation_query(time_series: TimeSeries, station_codes: List[str]) -> TextClause:
+    # @TODO replace monthly with mv
+    template = WEATHER_OBSERVATION
+
+    if time_series.interval.interval > 1440:
+        template = WEATHER_OBSERVATION_MONTHLY
+
+    return get_query(
+        template,
+        trunc=time_series.interval.trunc,
+        interval=time_series.interval.interval_sql,
+        timezone=time_series.network.timezone_database,
+        station_codes=list(station_codes),
+        date_start=time_series.get_range().start,
+        date_end=time_series.get_range().end,
+    )
+
+
+INTERCONNECTOR_POWER_FLOW = register_query_template(
+    "interconnector_power_flow",
+    """
     select
         time_bucket_gapfill(INTERVAL '5 minutes', bs.trading_interval) as trading_interval,
         bs.network_region,
@@ -104,24 +131,27 @@ def interconnector_power_flow(time_series: TimeSeries, network_region: str) -> s
         end as exports
     from balancing_summary bs
     where
-        bs.network_id = '{network_id}' and
-        bs.network_region= '{region}' and
-        bs.trading_interval <= '{date_end}' and
-        bs.trading_interval >= '{date_start}'
+        bs.network_id = :network_code and
+        bs.network_region = :network_region and
+        bs.trading_interval <= :date_end and
+        bs.trading_interval >= :date_start
     group by 1, 2
     order by trading_interval asc;
+    """,
+)
 
 
-    """.format(
-        timezone=time_series.network.timezone_database,
-        network_id=time_series.network.code,
-        region=network_region,
+def interconnector_power_flow(time_series: TimeSeries, network_region: str) -> TextClause:
+    """Get interconnector region flows using materialized view"""
+
+    return get_query(
+        INTERCONNECTOR_POWER_FLOW,
+        network_code=time_series.network.code,
+        network_region=network_region,
         date_start=time_series.get_range().start,
         date_end=time_series.get_range().end,
     )
 
-    return dedent(___query)
-
 
 def country_stats_query(stat_type: StatTypes, country: str = "au") -> TextClause:
     __query = sql.text(
@@ -144,12 +174,32 @@ def country_stats_query(stat_type: StatTypes, country: str = "au") -> TextClause
     return __query
 
 
+PRICE_NETWORK = register_query_template(
+    "price_network",
+    """
+    select
+        time_bucket_gapfill(CAST(:trunc AS text)::interval, bs.trading_interval) as trading_interval,
+        {group_field},
+        avg(bs.price) as price
+    from balancing_summary bs
+    where
+        bs.trading_interval <= :date_max and
+        bs.trading_interval > :date_min and
+        bs.network_id = ANY(:network_codes) and
+        {network_region_query}
+        1=1
+    group by 1, 2
+    order by 1 desc
+    """,
+)
+
+
 def price_network_query(
     time_series: TimeSeries,
-    group_field: str = "bs.network_id",
+    group_field: str = GROUP_NETWORK,
     network_region: Optional[str] = None,
     networks_query: Optional[List[NetworkSchema]] = None,
-) -> str:
+) -> TextClause:
 
     if not networks_query:
         networks_query = [time_series.network]
@@ -157,123 +207,85 @@ def price_network_query(
     if time_series.network not in networks_query:
         networks_query.append(time_series.network)
 
-    __query = """
-        select
-            time_bucket_gapfill('{trunc}', bs.trading_interval) as trading_interval,
-            {group_field},
-            avg(bs.price) as price
-        from balancing_summary bs
-        where
-            bs.trading_interval <= '{date_max}' and
-            bs.trading_interval > '{date_min}' and
-            {network_query}
-            {network_region_query}
-            1=1
-        group by 1, 2
-        order by 1 desc
-    """
-
-    timezone = time_series.network.timezone_database
-    network_region_query = ""
-
     if network_region:
-        network_region_query = f"bs.network_region='{network_region}' and "
-        group_field = "bs.network_region"
-
-    network_query = "bs.network_id IN ({}) and ".format(networks_to_in(networks_query))
+        group_field = GROUP_NETWORK_REGION
 
     if len(networks_query) > 1:
-        group_field = "'AU'"
-
-    date_max = time_series.get_range().end
-    date_min = time_series.get_range().start
-
-    query = dedent(
-        __query.format(
-            network_query=network_query,
-            trunc=time_series.interval.interval_sql,
-            network_region_query=network_region_query,
-            timezone=timezone,
-            date_max=date_max,
-            date_min=date_min,
-            group_field=group_field,
-        )
+        group_field = GROUP_COUNTRY
+
+    if group_field not in (GROUP_NETWORK, GROUP_NETWORK_REGION, GROUP_COUNTRY):
+        raise Exception("Invalid price group field: {}".format(group_field))
+
+    return get_query(
+        PRICE_NETWORK,
+        {
+            "group_field": group_field,
+            "network_region_query": NETWORK_REGION_BALANCING if network_region else "",
+        },
+        network_codes=network_codes_array(networks_query),
+        network_region=network_region,
+        trunc=time_series.interval.interval_sql,
+        date_max=time_series.get_range().end,
+        date_min=time_series.get_range().start,
     )
 
-    return query
-
-
-def network_demand_query(
-    time_series: TimeSeries,
-    network_region: Optional[str] = None,
-    networks_query: Optional[List[NetworkSchema]] = None,
-) -> str:
-    if not networks_query:
-        networks_query = [time_series.network]
-
-    if time_series.network not in networks_query:
-        networks_query.append(time_series.network)
 
-    __query = """
+NETWORK_DEMAND = register_query_template(
+    "network_demand",
+    """
     select
-        trading_interval at time zone '{timezone}',
+        trading_interval at time zone :timezone,
         network_id,
         max(demand_total) as demand
     from balancing_summary bs
     where
-        bs.trading_interval <= '{date_max}' and
-        bs.trading_interval >= '{date_min}' and
-        {network_query}
+        bs.trading_interval <= :date_max and
+        bs.trading_interval >= :date_min and
+        bs.network_id = ANY(:network_codes) and
         {network_region_query}
         1=1
     group by
         1, {groups_additional}
     order by 1 asc;
-    """
-
-    group_keys = ["network_id"]
-    network_region_query = ""
+    """,
+)
 
-    if network_region:
-        group_keys.append("network_region")
-        network_region_query = f"bs.network_region = '{network_region}' and "
-
-    groups_additional = ", ".join(group_keys)
 
-    network_query = "bs.network_id IN ({}) and ".format(networks_to_in(networks_query))
-
-    date_max = time_series.get_range().end
-    date_min = time_series.get_range().start
-
-    query = __query.format(
-        timezone=time_series.network.timezone_database,
-        date_max=date_max,
-        date_min=date_min,
-        network_id=time_series.network.code,
-        network_query=network_query,
-        network_region_query=network_region_query,
-        groups_additional=groups_additional,
-    )
-
-    return dedent(query)
-
-
-def power_network_fueltech_query(
+def network_demand_query(
     time_series: TimeSeries,
     network_region: Optional[str] = None,
     networks_query: Optional[List[NetworkSchema]] = None,
-) -> str:
-    """Query power stats"""
-
+) -> TextClause:
     if not networks_query:
         networks_query = [time_series.network]
 
     if time_series.network not in networks_query:
         networks_query.append(time_series.network)
 
-    __query = """
+    group_keys = ["network_id"]
+
+    if network_region:
+        group_keys.append("network_region")
+
+    return get_query(
+        NETWORK_DEMAND,
+        {
+            "groups_additional": ", ".join(group_keys),
+            "network_region_query": NETWORK_REGION_BALANCING if network_region else "",
+        },
+        network_codes=network_codes_array(networks_query),
+        network_region=network_region,
+        timezone=time_series.network.timezone_database,
+        date_max=time_series.get_range().end,
+        date_min=time_series.get_range().start,
+    )
+
+
+POWER_NETWORK_FUELTECH = register_query_template(
+    "power_network_fueltech_export",
+    """
     select
-        time_bucket_gapfill('{trunc}', fs.trading_interval) AS trading_interval,
+        time_bucket_gapfill(CAST(:trunc AS text)::interval, fs.trading_interval) AS trading_interval,
         ft.code as fueltech_code,
         sum(fs.generated) as facility_power
     from facility_scada fs
@@ -282,58 +294,75 @@ def power_network_fueltech_query(
     where
         fs.is_forecast is False and
         f.fueltech_id is not null and
-        f.fueltech_id not in ({fueltechs_exclude}) and
-        {network_query}
+        f.fueltech_id <> ALL(:fueltechs_exclude) and
+        (f.network_id = ANY(:network_codes) {wem_apvi_case}) and
         {network_region_query}
-        fs.trading_interval <= '{date_max}' and
-        fs.trading_interval > '{date_min}'
-        {fueltech_filter}
+        fs.trading_interval <= :date_max and
+        fs.trading_interval > :date_min
     group by 1, 2
-    """
+    """,
+)
 
-    network_region_query: str = ""
-    fueltech_filter: str = ""
-    wem_apvi_case: str = ""
-    timezone: str = time_series.network.timezone_database
+
+def power_network_fueltech_query(
+    time_series: TimeSeries,
+    network_region: Optional[str] = None,
+    networks_query: Optional[List[NetworkSchema]] = None,
+) -> TextClause:
+    """Query power stats"""
+
+    if not networks_query:
+        networks_query = [time_series.network]
+
+    if time_series.network not in networks_query:
+        networks_query.append(time_series.network)
 
     fueltechs_excluded = ["exports", "imports"]
 
     if NetworkNEM in networks_query:
         fueltechs_excluded.append("solar_rooftop")
 
-    if network_region:
-        network_region_query = f"f.network_region='{network_region}' and "
-
-    if NetworkWEM in networks_query:
-        # silly single case we'll refactor out
-        # APVI network is used to provide rooftop for WEM so we require it
-        # in country-wide totals
-        wem_apvi_case = "or (f.network_id='APVI' and f.network_region='WEM')"
-
-    network_query = "(f.network_id IN ({}) {}) and ".format(
-        networks_to_in(networks_query), wem_apvi_case
+    # silly single case we'll refactor out
+    # APVI network is used to provide rooftop for WEM so we require it
+    # in country-wide totals
+    wem_apvi_case = WEM_APVI_CASE if NetworkWEM in networks_query else ""
+
+    return get_query(
+        POWER_NETWORK_FUELTECH,
+        {
+            "wem_apvi_case": wem_apvi_case,
+            "network_region_query": NETWORK_REGION_FACILITY if network_region else "",
+        },
+        network_codes=network_codes_array(networks_query),
+        network_region=network_region,
+        fueltechs_exclude=fueltechs_excluded,
+        trunc=time_series.interval.interval_sql,
+        date_max=time_series.get_range().end,
+        date_min=time_series.get_range().start,
     )
 
-    date_max = time_series.get_range().end
-    date_min = time_series.get_range().start
-
-    fueltechs_exclude = ", ".join("'{}'".format(i) for i in fueltechs_excluded)
-
-    query = dedent(
-        __query.format(
-            network_query=network_query,
-            trunc=time_series.interval.interval_sql,
-            network_region_query=network_region_query,
-            timezone=timezone,
-            date_max=date_max,
-            date_min=date_min,
-            fueltech_filter=fueltech_filter,
-            wem_apvi_case=wem_apvi_case,
-            fueltechs_exclude=fueltechs_exclude,
-        )
-    )
 
-    return query
+POWER_NETWORK_ROOFTOP = register_query_template(
+    "power_network_rooftop",
+    """
+    select
+        time_bucket_gapfill('30 minutes', fs.trading_interval)  AS trading_interval,
+        ft.code as fueltech_code,
+        coalesce(sum(fs.generated), 0) as facility_power
+    from facility_scada fs
+    join facility f on fs.facility_code = f.code
+    join fueltech ft on f.fueltech_id = ft.code
+    where
+        fs.is_forecast = :forecast and
+        f.fueltech_id = 'solar_rooftop' and
+        (f.network_id = ANY(:network_codes) {wem_apvi_case}) and
+        {network_region_query}
+        fs.trading_interval <= :date_max and
+        fs.trading_interval > :date_min
+    group by 1, 2
+    order by 1 asc
+    """,
+)
 
 
 def power_network_rooftop_query(
@@ -341,7 +370,7 @@ def power_network_rooftop_query(
     network_region: Optional[str] = None,
     networks_query: Optional[List[NetworkSchema]] = None,
     forecast: bool = False,
-) -> str:
+) -> TextClause:
     """Query power stats"""
 
     if not networks_query:
@@ -350,163 +379,91 @@ def power_network_rooftop_query(
     if time_series.network not in networks_query:
         networks_query.append(time_series.network)
 
-    __query = """
-        select
-            time_bucket_gapfill('30 minutes', fs.trading_interval)  AS trading_interval,
-            ft.code as fueltech_code,
-            coalesce(sum(fs.generated), 0) as facility_power
-        from facility_scada fs
-        join facility f on fs.facility_code = f.code
-        join fueltech ft on f.fueltech_id = ft.code
-        where
-            fs.is_forecast is {forecast} and
-            f.fueltech_id = 'solar_rooftop' and
-            {network_query}
-            {network_region_query}
-            fs.trading_interval <= '{date_max}' and
-            fs.trading_interval > '{date_min}'
-        group by 1, 2
-        order by 1 asc
-    """
-
-    network_region_query: str = ""
-    wem_apvi_case: str = ""
-    timezone: str = time_series.network.timezone_database
-
-    if network_region:
-        network_region_query = f"f.network_region='{network_region}' and "
-
-    if NetworkWEM in networks_query:
-        # silly single case we'll refactor out
-        # APVI network is used to provide rooftop for WEM so we require it
-        # in country-wide totals
-        wem_apvi_case = "or (f.network_id='APVI' and f.network_region='WEM')"
-
-    network_query = "(f.network_id IN ({}) {}) and ".format(
-        networks_to_in(networks_query), wem_apvi_case
+    # silly single case we'll refactor out
+    # APVI network is used to provide rooftop for WEM so we require it
+    # in country-wide totals
+    wem_apvi_case = WEM_APVI_CASE if NetworkWEM in networks_query else ""
+
+    return get_query(
+        POWER_NETWORK_ROOFTOP,
+        {
+            "wem_apvi_case": wem_apvi_case,
+            "network_region_query": NETWORK_REGION_FACILITY if network_region else "",
+        },
+        network_codes=network_codes_array(networks_query),
+        network_region=network_region,
+        forecast=forecast,
+        date_max=time_series.get_range().end,
+        date_min=time_series.get_range().start,
     )
 
-    date_max = time_series.get_range().end
-    date_min = time_series.get_range().start
-
-    query = dedent(
-        __query.format(
-            network_query=network_query,
-            network_region_query=network_region_query,
-            timezone=timezone,
-            date_max=date_max,
-            date_min=date_min,
-            forecast=str(forecast),
-        )
-    )
-
-    return query
-
 
 """
 Energy Queries
 """
 
-
-def energy_network_fueltech_query(
-    time_series: TimeSeries,
-    network_region: Optional[str] = None,
-    networks_query: Optional[List[NetworkSchema]] = None,
-) -> str:
-    """
-    Get Energy for a network or network + region
-    based on a year
+ENERGY_NETWORK_FUELTECH_MONTHLY = register_query_template(
+    "energy_network_fueltech_monthly",
     """
-
-    if not networks_query:
-        networks_query = [time_series.network]
-
-    if time_series.network not in networks_query:
-        networks_query.append(time_series.network)
-
-    if time_series.interval.interval > 1440:
-        __query = """
-        select
-            date_trunc('{trunc}', t.trading_day) as trading_month,
-            t.fueltech_id,
-            coalesce(sum(t.fueltech_energy) / 1000 , 0) as fueltech_energy,
-            coalesce(sum(t.fueltech_market_value), 0) as fueltech_market_value,
-            coalesce(sum(t.fueltech_emissions), 0) as fueltech_emissions
-        from
-            (select
-                time_bucket_gapfill('1 day', t.ti_day_aest) as trading_day,
-                t.fueltech_id,
-                sum(t.energy) as fueltech_energy,
-                sum(t.market_value) as fueltech_market_value,
-                sum(t.emissions) as fueltech_emissions
-            from mv_facility_all t
-            where
-                t.ti_day_aest <= '{date_max}' and
-                t.ti_day_aest >= '{date_min}' and
-                t.fueltech_id not in ('imports', 'exports') and
-                {network_query}
-                {network_region_query}
-                1=1
-            group by 1, 2) as t
-        group by 1, 2
-        order by
-            1 desc;
-        """
-    else:
-        __query = """
-        select
-            t.ti_{trunc_name} as trading_day,
+    select
+        date_trunc(:trunc, t.trading_day) as trading_month,
+        t.fueltech_id,
+        coalesce(sum(t.fueltech_energy) / 1000 , 0) as fueltech_energy,
+        coalesce(sum(t.fueltech_market_value), 0) as fueltech_market_value,
+        coalesce(sum(t.fueltech_emissions), 0) as fueltech_emissions
+    from
+        (select
+            time_bucket_gapfill('1 day', t.ti_day_aest) as trading_day,
             t.fueltech_id,
-            coalesce(sum(t.energy) / 1000, 0) as fueltech_energy,
-            coalesce(sum(t.market_value), 0) as fueltech_market_value,
-            coalesce(sum(t.emissions), 0) as fueltech_emissions
+            sum(t.energy) as fueltech_energy,
+            sum(t.market_value) as fueltech_market_value,
+            sum(t.emissions) as fueltech_emissions
         from mv_facility_all t
         where
-            t.trading_interval <= '{date_max}' and
-            t.trading_interval >= '{date_min}' and
+            t.ti_day_aest <= :date_max and
+            t.ti_day_aest >= :date_min and
             t.fueltech_id not in ('imports', 'exports') and
-            {network_query}
+            t.network_id = ANY(:network_codes) and
             {network_region_query}
             1=1
-        group by 1, 2
-        order by
-            trading_day desc;
-        """
-
-    network_region_query = ""
-    date_range = time_series.get_range()
-
-    if network_region:
-        network_region_query = f"t.network_region='{network_region}' and"
-
-    networks_list = networks_to_in(networks_query)
-    network_query = "t.network_id IN ({}) and ".format(networks_list)
-
-    trunc_name = "{}_{}".format(
-        time_series.interval.trunc, time_series.network.timezone_database
-    ).lower()
-
-    query = dedent(
-        __query.format(
-            trunc=date_range.interval.trunc,
-            trunc_name=trunc_name,
-            date_min=date_range.start,
-            date_max=date_range.end,
-            network_query=network_query,
-            network_region_query=network_region_query,
-        )
-    )
+        group by 1, 2) as t
+    group by 1, 2
+    order by
+        1 desc;
+    """,
+)
 
-    return query
+ENERGY_NETWORK_FUELTECH = register_query_template(
+    "energy_network_fueltech_export",
+    """
+    select
+        t.ti_{trunc_name} as trading_day,
+        t.fueltech_id,
+        coalesce(sum(t.energy) / 1000, 0) as fueltech_energy,
+        coalesce(sum(t.market_value), 0) as fueltech_market_value,
+        coalesce(sum(t.emissions), 0) as fueltech_emissions
+    from mv_facility_all t
+    where
+        t.trading_interval <= :date_max and
+        t.trading_interval >= :date_min and
+        t.fueltech_id not in ('imports', 'exports') and
+        t.network_id = ANY(:network_codes) and
+        {network_region_query}
+        1=1
+    group by 1, 2
+    order by
+        trading_day desc;
+    """,
+)
 
 
-def energy_network_interconnector_emissions_query(
+def energy_network_fueltech_query(
     time_series: TimeSeries,
     network_region: Optional[str] = None,
     networks_query: Optional[List[NetworkSchema]] = None,
-) -> str:
+) -> TextClause:
     """
-    Get emissions for a network or network + region
+    Get Energy for a network or network + region
     based on a year
     """
 
@@ -516,9 +473,34 @@ def energy_network_interconnector_emissions_query(
     if time_series.network not in networks_query:
         networks_query.append(time_series.network)
 
-    __query = """
+    date_range = time_series.get_range()
+    slots = {"network_region_query": NETWORK_REGION_MV if network_region else ""}
+    template = ENERGY_NETWORK_FUELTECH_MONTHLY
+
+    if time_series.interval.interval <= 1440:
+        template = ENERGY_NETWORK_FUELTECH
+
+        # the view has a column for each interval and timezone
+        slots["trunc_name"] = "{}_{}".format(
+            time_series.interval.trunc, time_series.network.timezone_database
+        ).lower()
+
+    return get_query(
+        template,
+        slots,
+        network_codes=network_codes_array(networks_query),
+        network_region=network_region,
+        trunc=date_range.interval.trunc,
+        date_min=date_range.start,
+        date_max=date_range.end,
+    )
+
+
+ENERGY_NETWORK_INTERCONNECTOR_EMISSIONS = register_query_template(
+    "energy_network_interconnector_emissions",
+    """
     select
-        t.trading_interval at time zone '{timezone}' as trading_interval,
+        t.trading_interval at time zone :timezone as trading_interval,
         t.flow_from,
         t.flow_to,
         t.flow_energy as energy,
@@ -526,31 +508,38 @@ def energy_network_interconnector_emissions_query(
         t.flow_to_emissions
     from vw_region_flow_emissions t
     where
-        t.trading_interval <= '{date_max}' and
-        t.trading_interval >= '{date_min}' and
+        t.trading_interval <= :date_max and
+        t.trading_interval >= :date_min and
         {network_region_query}
         1=1
     order by 1 desc
+    """,
+)
+
 
+def energy_network_interconnector_emissions_query(
+    time_series: TimeSeries,
+    network_region: Optional[str] = None,
+    networks_query: Optional[List[NetworkSchema]] = None,
+) -> TextClause:
     """
+    Get emissions for a network or network + region
+    based on a year
+    """
+
+    if not networks_query:
+        networks_query = [time_series.network]
+
+    if time_series.network not in networks_query:
+        networks_query.append(time_series.network)
 
-    timezone = time_series.network.timezone_database
-    network_region_query = ""
     date_range = time_series.get_range()
 
-    if network_region:
-        network_region_query = f"""
-            (t.flow_from='{network_region}' or t.flow_to='{network_region}') and
-        """
-
-    query = dedent(
-        __query.format(
-            timezone=timezone,
-            # trunc=date_range.interval.trunc,
-            date_min=date_range.start,
-            date_max=date_range.end,
-            network_region_query=network_region_query,
-        )
+    return get_query(
+        ENERGY_NETWORK_INTERCONNECTOR_EMISSIONS,
+        {"network_region_query": NETWORK_REGION_FLOW if network_region else ""},
+        network_region=network_region,
+        timezone=time_series.network.timezone_database,
+        date_min=date_range.start,
+        date_max=date_range.end,
     )
-
-    return query
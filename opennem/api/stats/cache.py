@@ -0,0 +1,398 @@
+"""
+    Response cache for the stats endpoints
+
+    Stats responses are cached as the serialized JSON body keyed on the
+    normalised query parameters (endpoint, network, code, interval, period,
+    year) so a hit skips the queries, `stats_factory` and serializing the
+    `OpennemDataSet`.
+
+    Responses are held in an in-process LRU and shared between API processes
+    through redis at `settings.cache_url` if `settings.cache_redis_enabled`
+    is set. The TTL is derived from the interval so recent 5 minute data
+    expires quickly and history for past years is kept for much longer.
+
+    Ingest pipelines call `invalidate_stats_cache` (or
+    `invalidate_stats_cache_for_records`) once they have written data for a
+    network. Invalidations only reach the API processes through redis, so
+    without redis ingest invalidation has no effect on the API. The local LRU
+    never keeps a response for longer than `STATS_CACHE_LOCAL_TTL` so without
+    redis responses are at most that stale.
+
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from cachetools import LRUCache
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+from opennem.core.time import INTERVALS
+from opennem.settings import settings
+from opennem.utils.cache import get_redis_client
+
+try:
+    from redis import RedisError
+except ImportError:
+    RedisError = Exception  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_PREFIX = "opennem:stats:"
+
+STATS_CACHE_INDEX_PREFIX = "opennem:stats_index:"
+
+# number of responses held in process
+STATS_CACHE_SIZE = 512
+
+# (interval size in minutes, ttl in seconds) for intervals up to that size
+STATS_CACHE_TTLS = ((5, 60), (30, 60 * 5), (60 * 24, 60 * 15))
+
+# ttl for monthly, quarterly and yearly intervals
+STATS_CACHE_TTL_MAX = 60 * 60
+
+# ttl for responses for a year that has passed
+STATS_CACHE_TTL_HISTORY = 60 * 60 * 24
+
+# invalidations from ingest processes don't reach the in process cache so the
+# local copy is only kept briefly whether or not redis is enabled
+STATS_CACHE_LOCAL_TTL = 60
+
+INTERVAL_SIZES: Dict[str, int] = {i.interval_human: i.interval for i in INTERVALS}
+
+
+class StatsCacheKey(NamedTuple):
+    endpoint: str
+    network: str
+    code: str
+    interval: str
+    period: str
+    year: str
+
+    @property
+    def redis_key(self) -> str:
+        return STATS_CACHE_PREFIX + ":".join(self)
+
+    @classmethod
+    def from_redis_key(cls, redis_key: str) -> "StatsCacheKey":
+        """Codes can contain colons so the key is split around it"""
+        head, interval, period, year = redis_key[len(STATS_CACHE_PREFIX) :].rsplit(":", 3)
+        endpoint, network, code = head.split(":", 2)
+
+        return cls(endpoint, network, code, interval, period, year)
+
+
+def _normalise(value: Any) -> str:
+    if value is None:
+        return ""
+
+    return str(value).strip()
+
+
+def get_stats_cache_key(
+    endpoint: str,
+    network_code: Optional[str],
+    code: Optional[str] = None,
+    interval: Optional[str] = None,
+    period: Optional[str] = None,
+    year: Optional[int] = None,
+) -> StatsCacheKey:
+    """
+    Cache key for a stats query. Network codes are upper cased, intervals
+    and periods are case sensitive ("1m" isn't "1M")
+    """
+    return StatsCacheKey(
+        endpoint,
+        _normalise(network_code).upper(),
+        _normalise(code),
+        _normalise(interval),
+        _normalise(period),
+        _normalise(year),
+    )
+
+
+def get_stats_cache_ttl(interval: Optional[str], year: Optional[str] = None) -> int:
+    """
+    TTL for a response in seconds. Unset intervals are the network interval
+    so are treated as the shortest
+    """
+    if year and int(year) < datetime.now().year:
+        return STATS_CACHE_TTL_HISTORY
+
+    interval_size = INTERVAL_SIZES.get(interval or "", 0)
+
+    for interval_max, ttl in STATS_CACHE_TTLS:
+        if interval_size <= interval_max:
+            return ttl
+
+    return STATS_CACHE_TTL_MAX
+
+
+# key -> (expires, body)
+_local_cache: LRUCache = LRUCache(maxsize=STATS_CACHE_SIZE)
+
+_local_cache_lock = threading.Lock()
+
+
+def get_cached_response(key: StatsCacheKey) -> Optional[bytes]:
+    now = time.monotonic()
+
+    with _local_cache_lock:
+        cached: Optional[Tuple[float, bytes]] = _local_cache.get(key)
+
+        if cached and cached[0] > now:
+            return cached[1]
+
+        if cached:
+            del _local_cache[key]
+
+    client = get_redis_client()
+
+    if not client:
+        return None
+
+    try:
+        body = client.get(key.redis_key)
+    except RedisError as e:
+        logger.error("Could not read stats cache: {}".format(e))
+        return None
+
+    if body is None:
+        return None
+
+    try:
+        ttl = client.ttl(key.redis_key)
+    except RedisError:
+        ttl = None
+
+    if not ttl or ttl < 0:
+        ttl = STATS_CACHE_LOCAL_TTL
+
+    with _local_cache_lock:
+        _local_cache[key] = (now + min(ttl, STATS_CACHE_LOCAL_TTL), body)
+
+    return body
+
+
+def set_cached_response(key: StatsCacheKey, body: bytes, ttl: Optional[int] = None) -> None:
+    if ttl is None:
+        ttl = get_stats_cache_ttl(key.interval, key.year)
+
+    with _local_cache_lock:
+        _local_cache[key] = (time.monotonic() + min(ttl, STATS_CACHE_LOCAL_TTL), body)
+
+    client = get_redis_client()
+
+    if not client:
+        return None
+
+    index_key = STATS_CACHE_INDEX_PREFIX + key.network
+
+    try:
+        pipe = client.pipeline()
+        pipe.set(key.redis_key, body, ex=ttl)
+        pipe.sadd(index_key, key.redis_key)
+        pipe.expire(index_key, STATS_CACHE_TTL_HISTORY)
+        pipe.execute()
+    except RedisError as e:
+        logger.error("Could not write stats cache: {}".format(e))
+
+
+def _key_is_stale(
+    key: StatsCacheKey, network_code: str, codes: Optional[List[str]], since: Optional[datetime]
+) -> bool:
+    if key.network != network_code:
+        return False
+
+    if codes is not None and key.code not in codes:
+        return False
+
+    # responses for years before the data that was written don't change
+    if since and key.year and int(key.year) < since.year:
+        return False
+
+    return True
+
+
+def invalidate_stats_cache(
+    network_code: str,
+    codes: Optional[Iterable[str]] = None,
+    since: Optional[datetime] = None,
+) -> int:
+    """
+    Drop cached responses for a network once data has been written. Can be
+    limited to station or region codes and to data written since a time.
+    Returns the number of responses dropped
+    """
+    network_code = network_code.upper()
+    code_list = [_normalise(c) for c in codes] if codes is not None else None
+    num_invalidated = 0
+
+    with _local_cache_lock:
+        stale_keys = [
+            k
+            for k in list(_local_cache.keys())
+            if _key_is_stale(k, network_code, code_list, since)
+        ]
+
+        for key in stale_keys:
+            del _local_cache[key]
+
+    num_invalidated += len(stale_keys)
+
+    client = get_redis_client()
+
+    if not client:
+        return num_invalidated
+
+    index_key = STATS_CACHE_INDEX_PREFIX + network_code
+
+    try:
+        redis_keys = [k.decode("utf-8") for k in client.smembers(index_key)]
+        stale_redis_keys = [
+            k
+            for k in redis_keys
+            if _key_is_stale(StatsCacheKey.from_redis_key(k), network_code, code_list, since)
+        ]
+
+        if stale_redis_keys:
+            pipe = client.pipeline()
+            pipe.delete(*stale_redis_keys)
+            pipe.srem(index_key, *stale_redis_keys)
+            pipe.execute()
+    except (RedisError, ValueError) as e:
+        logger.error("Could not invalidate stats cache for {}: {}".format(network_code, e))
+        return num_invalidated
+
+    return num_invalidated + len(stale_redis_keys)
+
+
+def invalidate_stats_cache_for_records(
+    records: Iterable[Dict], interval_field: str = "trading_interval"
+) -> int:
+    """
+    Invalidate the networks in a set of written records from the earliest
+    interval written for each
+    """
+    network_since: Dict[str, Optional[datetime]] = defaultdict(lambda: None)
+
+    for record in records:
+        network_code = record.get("network_id")
+
+        if not network_code:
+            continue
+
+        interval = record.get(interval_field)
+        since = network_since[network_code]
+
+        if isinstance(interval, datetime) and (since is None or interval < since):
+            network_since[network_code] = interval
+
+    return sum(
+        invalidate_stats_cache(network_code, since=since)
+        for network_code, since in network_since.items()
+    )
+
+
+def clear_stats_cache() -> None:
+    with _local_cache_lock:
+        _local_cache.clear()
+
+
+def serialize_stats_response(result: Any) -> bytes:
+    """
+    Serialize a response model the way the stats routes do with
+    `response_model_exclude_unset`
+    """
+    return JSONResponse(content=jsonable_encoder(result, exclude_unset=True)).body
+
+
+async def _run_cache_async(func: Callable, *args: Any) -> Any:
+    """Shared cache reads and writes go to redis so run them off the event loop"""
+    if get_redis_client() is None:
+        return func(*args)
+
+    return await run_in_threadpool(func, *args)
+
+
+def cache_stats_response(
+    endpoint: str,
+    network: str = "network_code",
+    code: Optional[str] = None,
+    interval: Optional[str] = None,
+    period: Optional[str] = None,
+    year: Optional[str] = None,
+) -> Callable:
+    """
+    Cache the responses of a stats route. The arguments name the route
+    parameters the key is built from. The wrapped function keeps the route
+    signature so dependencies resolve as before and errors aren't cached.
+    Async routes are wrapped with an async function
+    """
+
+    def _get_key(kwargs: Dict[str, Any]) -> StatsCacheKey:
+        return get_stats_cache_key(
+            endpoint,
+            kwargs.get(network),
+            kwargs.get(code) if code else None,
+            kwargs.get(interval) if interval else None,
+            kwargs.get(period) if period else None,
+            kwargs.get(year) if year else None,
+        )
+
+    def _cache_decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def _cache_stats_wrapper_async(**kwargs: Any) -> Any:
+                if not settings.cache_stats_enabled:
+                    return await func(**kwargs)
+
+                key = _get_key(kwargs)
+                body = await _run_cache_async(get_cached_response, key)
+
+                if body is not None:
+                    logger.debug("stats cache HIT at key: {}".format(key))
+                    return Response(content=body, media_type="application/json")
+
+                logger.debug("stats cache MISS at key: {}".format(key))
+
+                result = await func(**kwargs)
+                body = serialize_stats_response(result)
+
+                await _run_cache_async(set_cached_response, key, body)
+
+                return Response(content=body, media_type="application/json")
+
+            return _cache_stats_wrapper_async
+
+        @wraps(func)
+        def _cache_stats_wrapper(**kwargs: Any) -> Any:
+            if not settings.cache_stats_enabled:
+                return func(**kwargs)
+
+            key = _get_key(kwargs)
+            body = get_cached_response(key)
+
+            if body is not None:
+                logger.debug("stats cache HIT at key: {}".format(key))
+                return Response(content=body, media_type="application/json")
+
+            logger.debug("stats cache MISS at key: {}".format(key))
+
+            result = func(**kwargs)
+            body = serialize_stats_response(result)
+
+            set_cached_response(key, body)
+
+            return Response(content=body, media_type="application/json")
+
+        return _cache_stats_wrapper
+
+    return _cache_decorator
@@ -2,7 +2,7 @@ import logging
 from collections import OrderedDict
 from datetime import datetime, timezone
 from textwrap import dedent
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 import pytz
 from sqlalchemy.orm import Session
@@ -13,7 +13,14 @@ from opennem.db.models.opennem import FacilityScada, Station
 from opennem.schema.network import NetworkSchema
 from opennem.schema.time import TimeInterval, TimePeriod
 from opennem.schema.units import UnitDefinition
-from opennem.utils.cache import cache_scada_result
+from opennem.utils.cache import (
+    cache_scada_result,
+    extend_scada_range_cache,
+    get_cached_scada_ranges,
+    get_scada_range_key,
+    set_cached_scada_range,
+    single_flight,
+)
 from opennem.utils.numbers import cast_trailing_nulls
 from opennem.utils.time import human_to_timedelta
 from opennem.utils.timezone import is_aware, make_aware
@@ -266,7 +273,6 @@ SCADA_RANGE_EXCLUDE_DUIDS = [
 ]
 
 
-@cache_scada_result
 def get_scada_range(
     network: Optional[NetworkSchema] = None,
     networks: Optional[List[NetworkSchema]] = None,
@@ -275,21 +281,45 @@ def get_scada_range(
 ) -> Optional[ScadaDateRange]:
     """Get the start and end dates for a network query. This is more efficient
     than providing or querying the range at query time
+
+    Ranges are read from the facility_scada_bounds table that's maintained on
+    write. Ranges for facilities are built from the cached per facility ranges
     """
+    if facilities and not networks:
+        facility_ranges = list(get_facility_scada_ranges(facilities, network=network).values())
+
+        if not facility_ranges:
+            return None
+
+        return ScadaDateRange(
+            start=min(r.start for r in facility_ranges),
+            end=max(r.end for r in facility_ranges),
+            network=network,
+        )
+
+    return _get_scada_range(network, networks, network_region, facilities)
+
+
+@cache_scada_result
+def _get_scada_range(
+    network: Optional[NetworkSchema] = None,
+    networks: Optional[List[NetworkSchema]] = None,
+    network_region: Optional[str] = None,
+    facilities: Optional[List[str]] = None,
+) -> Optional[ScadaDateRange]:
     engine = get_database_engine()
 
     __query = """
         select
-            min(fs.trading_interval)::timestamp AT TIME ZONE '{timezone}',
-            max(fs.trading_interval)::timestamp AT TIME ZONE '{timezone}'
-        from facility_scada fs
+            min(fs.first_seen)::timestamp AT TIME ZONE '{timezone}',
+            max(fs.last_seen)::timestamp AT TIME ZONE '{timezone}'
+        from facility_scada_bounds fs
         where
             {facility_query}
             {network_query}
             {network_region_query}
             facility_code not like 'ROOFTOP_%%'
             and facility_code not in ({exclude_duids})
-            and is_forecast is False
     """
 
     network_query = ""
@@ -349,6 +379,131 @@ def get_scada_range(
     return scada_range
 
 
+def get_facility_scada_ranges(
+    facilities: List[str], network: Optional[NetworkSchema] = None
+) -> Dict[str, ScadaDateRange]:
+    """Get the start and end dates for each facility keyed by facility code.
+    Cached ranges are used and the rest are queried together in one query.
+    Facilities without any scada are left out
+    """
+    network_codes = [network.code] if network else []
+    facility_codes = sorted(set(filter(None, map(normalize_duid, facilities))))
+    facility_keys = {f: get_scada_range_key(network_codes, [f]) for f in facility_codes}
+
+    def _get_cached() -> Optional[Dict[str, ScadaDateRange]]:
+        scada_ranges = get_cached_scada_ranges(list(facility_keys.values()))
+
+        if len(scada_ranges) < len(facility_keys):
+            return None
+
+        return {f: scada_ranges[k] for f, k in facility_keys.items()}
+
+    def _compute() -> Dict[str, ScadaDateRange]:
+        scada_ranges = get_cached_scada_ranges(list(facility_keys.values()))
+        facility_ranges = {
+            f: scada_ranges[k] for f, k in facility_keys.items() if k in scada_ranges
+        }
+        facilities_missing = [f for f in facility_codes if f not in facility_ranges]
+
+        if not facilities_missing:
+            return facility_ranges
+
+        for facility_code, scada_range in _query_facility_scada_ranges(
+            facilities_missing, network
+        ).items():
+            set_cached_scada_range(facility_keys[facility_code], scada_range)
+            facility_ranges[facility_code] = scada_range
+
+        return facility_ranges
+
+    if not facility_codes:
+        return {}
+
+    return single_flight(get_scada_range_key(network_codes, facility_codes), _get_cached, _compute)
+
+
+def _query_facility_scada_ranges(
+    facility_codes: List[str], network: Optional[NetworkSchema] = None
+) -> Dict[str, ScadaDateRange]:
+    engine = get_database_engine()
+
+    __query = """
+        select
+            fs.facility_code,
+            min(fs.first_seen)::timestamp AT TIME ZONE '{timezone}',
+            max(fs.last_seen)::timestamp AT TIME ZONE '{timezone}'
+        from facility_scada_bounds fs
+        where
+            fs.facility_code IN ({facility_codes}) and
+            {network_query}
+            facility_code not like 'ROOFTOP_%%'
+            and facility_code not in ({exclude_duids})
+        group by 1
+    """
+
+    network_query = ""
+
+    if network:
+        network_query = f"fs.network_id = '{network.code}' and"
+
+    scada_range_query = dedent(
+        __query.format(
+            facility_codes=duid_in_case(facility_codes),
+            network_query=network_query,
+            timezone="UTC",
+            exclude_duids=duid_in_case(SCADA_RANGE_EXCLUDE_DUIDS),
+        )
+    )
+
+    with engine.connect() as c:
+        logger.debug(scada_range_query)
+        scada_range_result = list(c.execute(scada_range_query))
+
+    return {
+        facility_code: ScadaDateRange(start=scada_min, end=scada_max, network=network)
+        for facility_code, scada_min, scada_max in scada_range_result
+        if scada_min and scada_max
+    }
+
+
+def extend_scada_range_for_records(
+    records: Iterable[Dict], interval_field: str = "trading_interval"
+) -> int:
+    """Move the cached scada ranges up to the latest intervals in a set of
+    written facility_scada records. Returns the number of ranges extended
+    """
+    network_ends: Dict[str, datetime] = {}
+    facility_ends: Dict[str, Dict[str, datetime]] = {}
+
+    for record in records:
+        network_code = record.get("network_id")
+        facility_code = record.get("facility_code")
+        interval = record.get(interval_field)
+
+        if not network_code or not facility_code or not isinstance(interval, datetime):
+            continue
+
+        if record.get("is_forecast") or facility_code.startswith("ROOFTOP_"):
+            continue
+
+        if facility_code in SCADA_RANGE_EXCLUDE_DUIDS:
+            continue
+
+        if network_code not in network_ends or interval > network_ends[network_code]:
+            network_ends[network_code] = interval
+
+        network_facility_ends = facility_ends.setdefault(network_code, {})
+        facility_end = network_facility_ends.get(facility_code)
+
+        if not facility_end or interval > facility_end:
+            network_facility_ends[facility_code] = interval
+
+    return sum(
+        extend_scada_range_cache(network_code, end, facility_ends[network_code])
+        for network_code, end in network_ends.items()
+    )
+
+
 def station_attach_stats(station: Station, session: Session) -> Station:
     # @TODO update for new queries
     since = datetime.now() - human_to_timedelta("7d")
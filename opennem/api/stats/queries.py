@@ -1,27 +1,96 @@
 """
     Queries for network data
 
+    Queries are registered as templates in `opennem.api.templates` and
+    returned as `text()` clauses with their values bound
+
+    Intervals are bound as text and cast in the statement since asyncpg
+    only encodes a timedelta for an interval parameter
+
     @TODO make these pluggable
-    @TODO use sqlalchemy text() compiled queries
 """
 
 from datetime import datetime, timedelta
-from textwrap import dedent
 from typing import List, Optional
 
 from fastapi.exceptions import HTTPException
+from sqlalchemy.sql.elements import TextClause
 from starlette import status
 
 from opennem.api.stats.controllers import get_scada_range
 from opennem.api.stats.schema import ScadaDateRange
+from opennem.api.templates import get_query, register_query_template
 from opennem.core.networks import network_from_network_region
 from opennem.core.normalizers import normalize_duid
+from opennem.db import with_session_timezone
 from opennem.schema.network import NetworkSchema
 from opennem.schema.time import TimeInterval, TimePeriod
 
+# template slots
+INTERVAL_REMAINDER = """ +
+    ((extract(minute FROM fs.trading_interval AT TIME ZONE :timezone)::int / :interval_size)::integer
+    * interval '1 minute' * :interval_size)::interval"""
+
+NETWORK_REGION_FACILITY = "and f.network_region = :network_region"
+
+NETWORK_FACILITY_SCADA = "and fs.network_id = :network_code"
+
+NETWORK_REGION_BALANCING = "and bs.network_region = :network_region"
+
+NETWORK_BALANCING = "and bs.network_id = :network_code"
+
+DATE_MIN_PERIOD = "CAST(:date_max AS timestamptz) - CAST(:period AS text)::interval"
+
+DATE_MIN_YEAR = ":year_start"
+
+
+def facility_codes_array(facility_codes: List[str]) -> List[str]:
+    return [normalize_duid(i) for i in facility_codes]
+
+
+def network_date(network: NetworkSchema, year: int, month: int = 1, day: int = 1) -> datetime:
+    """Midnight on a date in the network timezone"""
+    return datetime(year, month, day, tzinfo=network.get_fixed_offset())
+
+
+def start_of_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
 
-def duid_in_case(facility_codes: List[str]) -> str:
-    return ",".join(["'{}'".format(i) for i in map(normalize_duid, facility_codes)])
+def interval_remainder(interval: TimeInterval) -> str:
+    """Sub-hour intervals are bucketed on the minute"""
+    if interval.interval >= 60:
+        return ""
+
+    return INTERVAL_REMAINDER
+
+
+POWER_FACILITY = register_query_template(
+    "power_facility",
+    """
+    select
+        t.trading_interval at time zone :timezone,
+        coalesce(avg(t.facility_power), 0),
+        t.facility_code
+    from (
+        select
+            time_bucket_gapfill(CAST(:trunc AS text)::interval, fs.trading_interval) AS trading_interval,
+            coalesce(
+                avg(fs.generated), 0
+            ) as facility_power,
+            fs.facility_code
+        from facility_scada fs
+        join facility f on fs.facility_code = f.code
+        where
+            fs.trading_interval <= :date_max and
+            fs.trading_interval > :date_min and
+            fs.facility_code = ANY(:facility_codes)
+        group by 1, 3
+    ) as t
+    group by 1, 3
+    order by 1 desc
+    """,
+)
 
 
 def power_facility_query(
@@ -30,38 +99,12 @@ def power_facility_query(
     period: TimePeriod,
     interval: Optional[TimeInterval] = None,
     date_range: Optional[ScadaDateRange] = None,
-) -> str:
-    timezone = network.get_timezone(postgres_format=True)
-
+) -> TextClause:
     if not date_range:
         date_range = get_scada_range(network=network, facilities=facility_codes)
 
     timezone = network.timezone_database
 
-    __query = """
-        select
-            t.trading_interval at time zone '{timezone}',
-            coalesce(avg(t.facility_power), 0),
-            t.facility_code
-        from (
-            select
-                time_bucket_gapfill('{trunc}', fs.trading_interval) AS trading_interval,
-                coalesce(
-                    avg(fs.generated), 0
-                ) as facility_power,
-                fs.facility_code
-            from facility_scada fs
-            join facility f on fs.facility_code = f.code
-            where
-                fs.trading_interval <= '{date_max}' and
-                fs.trading_interval > '{date_min}' and
-                fs.facility_code in ({facility_codes_parsed})
-            group by 1, 3
-        ) as t
-        group by 1, 3
-        order by 1 desc
-    """
-
     if not interval:
         interval = network.get_interval()
 
@@ -77,71 +120,102 @@ def power_facility_query(
     if period:
         date_min = date_range.get_end() - timedelta(minutes=period.period)
 
-    query = __query.format(
-        facility_codes_parsed=duid_in_case(facility_codes),
+    return get_query(
+        POWER_FACILITY,
+        facility_codes=facility_codes_array(facility_codes),
         trunc=interval.interval_sql,
-        period=period.period_sql,
         timezone=timezone,
         date_max=date_max,
         date_min=date_min,
     )
 
-    return query
+
+POWER_NETWORK = register_query_template(
+    "power_network",
+    """
+    with intervals as (
+        select generate_series(
+            date_trunc(:trunc, now() AT TIME ZONE :timezone) - CAST(:period AS text)::interval,
+            date_trunc(:trunc, now() AT TIME ZONE :timezone),
+            CAST(:interval AS text)::interval
+        )::timestamp as interval
+    )
+
+    select
+        i.interval as trading_day,
+        fs.generated,
+        fs.facility_code as facility_code
+    from intervals i
+    left outer join
+        (select
+            date_trunc(:trunc, fs.trading_interval AT TIME ZONE :timezone)::timestamp {interval_remainder} as interval,
+            fs.facility_code,
+            coalesce(avg(generated), 0) as generated
+            from facility_scada fs
+            where
+                fs.trading_interval > now() AT TIME ZONE :timezone - CAST(:period AS text)::interval
+                and fs.network_id = :network_code
+            group by 1, 2
+        ) as fs on fs.interval = i.interval
+    order by 1 desc, 2 desc
+    """,
+)
 
 
 def power_network(
     network_code: str,
     interval: TimeInterval,
     period: TimePeriod,
-) -> str:
-
-    scale = 1
-
+) -> TextClause:
     network = network_from_network_region(network_code)
     timezone = network.timezone_database
 
     if not timezone:
         timezone = "UTC"
 
-    __query = """
-        with intervals as (
-            select generate_series(
-                date_trunc('{trunc}', now() AT TIME ZONE '{timezone}') - '{period}'::interval,
-                date_trunc('{trunc}', now() AT TIME ZONE '{timezone}'),
-                '{interval}'::interval
-            )::timestamp as interval
-        )
-
-        select
-            i.interval as trading_day,
-            fs.generated,
-            fs.facility_code as facility_code
-        from intervals i
-        left outer join
-            (select
-                date_trunc('{trunc}', fs.trading_interval AT TIME ZONE '{timezone}')::timestamp  {interval_remainder} as interval,
-                fs.facility_code,
-                coalesce(avg(generated), 0) as generated
-                from facility_scada fs
-                where
-                    fs.trading_interval > now() AT TIME ZONE '{timezone}' - '{period}'::interval
-                    and fs.network_id = '{network_code}'
-                group by 1, 2
-            ) as fs on fs.interval = i.interval
-        order by 1 desc, 2 desc
-    """
-
-    query = __query.format(
+    return get_query(
+        POWER_NETWORK,
+        {"interval_remainder": interval_remainder(interval)},
         network_code=network_code,
         trunc=interval.trunc,
         interval=interval.interval_human,
-        interval_remainder=interval.get_sql_join(timezone=network.timezone_database),
+        interval_size=interval.interval,
         period=period.period_sql,
-        scale=scale,
         timezone=timezone,
     )
 
-    return query
+
+POWER_NETWORK_FUELTECH = register_query_template(
+    "power_network_fueltech",
+    """
+    select
+        t.trading_interval,
+        sum(t.facility_power),
+        t.fueltech_code
+    from (
+        select
+            time_bucket_gapfill(CAST(:trunc AS text)::interval, trading_interval) AS trading_interval,
+            coalesce(
+                avg(fs.generated), 0
+            ) as facility_power,
+            fs.facility_code,
+            ft.code as fueltech_code
+        from facility_scada fs
+        join facility f on fs.facility_code = f.code
+        join fueltech ft on f.fueltech_id = ft.code
+        where
+            fs.trading_interval <= coalesce(CAST(:date_end AS timestamptz), now())
+            and fs.trading_interval >= coalesce(CAST(:date_end AS timestamptz), now())
+                - CAST(:period AS text)::interval
+            and fs.network_id = :network_code
+            and f.fueltech_id is not null
+            {network_region_query}
+        group by 1, 3, 4
+    ) as t
+    group by 1, 3
+    order by 1 desc
+    """,
+)
 
 
 def power_network_fueltech(
@@ -150,63 +224,57 @@ def power_network_fueltech(
     period: TimePeriod,
     network_region: Optional[str] = None,
     scada_range: Optional[ScadaDateRange] = None,
-) -> str:
+) -> TextClause:
 
     timezone = network.get_timezone(postgres_format=True)
 
     if not timezone:
         timezone = "UTC"
 
-    __query = """
-        SET SESSION TIME ZONE '{timezone}';
-
-        select
-            t.trading_interval,
-            sum(t.facility_power),
-            t.fueltech_code
-        from (
-            select
-                time_bucket_gapfill('{trunc}', trading_interval) AS trading_interval,
-                coalesce(
-                    avg(fs.generated), 0
-                ) as facility_power,
-                fs.facility_code,
-                ft.code as fueltech_code
-            from facility_scada fs
-            join facility f on fs.facility_code = f.code
-            join fueltech ft on f.fueltech_id = ft.code
-            where
-                fs.trading_interval <= {date_end}
-                and fs.trading_interval >= {date_end}::timestamp - '{period}'::interval
-                and fs.network_id = '{network_code}'
-                and f.fueltech_id is not null
-                {network_region_query}
-            group by 1, 3, 4
-        ) as t
-        group by 1, 3
-        order by 1 desc
-    """
-
-    network_region_query = ""
-
-    if network_region:
-        network_region_query = f"and f.network_region='{network_region}'"
-
-    date_end = "now()"
-
-    if scada_range:
-        date_end = scada_range.get_end_sql()
-
-    query = __query.format(
+    query = get_query(
+        POWER_NETWORK_FUELTECH,
+        {"network_region_query": NETWORK_REGION_FACILITY if network_region else ""},
         network_code=network.code,
+        network_region=network_region,
         trunc=interval.interval_sql,
         period=period.period_sql,
-        network_region_query=network_region_query,
-        timezone=timezone,
-        date_end=date_end,
+        date_end=scada_range.get_end() if scada_range else None,
     )
 
-    return query
+    return with_session_timezone(query, timezone)
+
+
+ENERGY_FACILITY = register_query_template(
+    "energy_facility",
+    """
+    with intervals as (
+        select generate_series(
+            date_trunc(:trunc, now() AT TIME ZONE :timezone) - CAST(:period AS text)::interval,
+            date_trunc(:trunc, now() AT TIME ZONE :timezone),
+            CAST(:interval AS text)::interval
+        )::timestamp as interval
+    )
+
+    select
+        i.interval as trading_day,
+        fs.generated,
+        fs.facility_code as facility_code
+    from intervals i
+    left outer join
+        (select
+            date_trunc(:trunc, fs.trading_interval AT TIME ZONE :timezone)::timestamp {interval_remainder} as interval,
+            fs.facility_code,
+            coalesce(sum(fs.eoi_quantity), 0.0) / :scale as generated
+            from facility_scada fs
+            where
+                fs.facility_code = ANY(:facility_codes)
+                and fs.trading_interval > now() AT TIME ZONE :timezone - CAST(:period AS text)::interval
+                and fs.network_id = :network_code
+            group by 1, 2
+        ) as fs on fs.interval = i.interval
+    order by 1 desc, 2 asc
+    """,
+)
 
 
 def energy_facility(
@@ -214,82 +282,57 @@ def energy_facility(
     network_code: str,
     interval: TimeInterval,
     period: TimePeriod,
-) -> str:
+) -> TextClause:
 
     network = network_from_network_region(network_code)
     timezone = network.timezone_database
 
-    __query = """
-        with intervals as (
-            select generate_series(
-                date_trunc('{trunc}', now() AT TIME ZONE '{timezone}') - '{period}'::interval,
-                date_trunc('{trunc}', now() AT TIME ZONE '{timezone}'),
-                '{interval}'::interval
-            )::timestamp as interval
-        )
-
-        select
-            i.interval as trading_day,
-            fs.generated,
-            fs.facility_code as facility_code
-        from intervals i
-        left outer join
-            (select
-                date_trunc('{trunc}', fs.trading_interval AT TIME ZONE '{timezone}')::timestamp  {interval_remainder} as interval,
-                fs.facility_code,
-                coalesce(sum(fs.eoi_quantity), 0.0) / {scale} as generated
-                from facility_scada fs
-                where
-                    fs.facility_code in ({facility_codes_parsed})
-                    and fs.trading_interval > now() AT TIME ZONE '{timezone}' - '{period}'::interval
-                    and fs.network_id = '{network_code}'
-                group by 1, 2
-            ) as fs on fs.interval = i.interval
-        order by 1 desc, 2 asc"""
-
-    query = __query.format(
-        facility_codes_parsed=duid_in_case(facility_codes),
+    return get_query(
+        ENERGY_FACILITY,
+        {"interval_remainder": interval_remainder(interval)},
+        facility_codes=facility_codes_array(facility_codes),
         network_code=network_code,
         trunc=interval.trunc,
         interval=interval.interval_sql,
-        interval_remainder=interval.get_sql_join(timezone=network.timezone_database),
+        interval_size=interval.interval,
         period=period.period_sql,
         scale=network.intervals_per_hour,
         timezone=timezone,
     )
 
-    return query
 
-
-def energy_facility_query(
-    facility_codes: List[str],
-    network: NetworkSchema,
-    period: TimePeriod,
-    interval: Optional[TimeInterval] = None,
-) -> str:
-    """
-    Get Energy for a list of facility codes
+ENERGY_FACILITY_MV = register_query_template(
+    "energy_facility_mv",
     """
-
-    __query = """
     select
-        date_trunc('{trunc}', t.trading_interval at time zone '{timezone}') as trading_day,
+        date_trunc(:trunc, t.trading_interval at time zone :timezone) as trading_day,
         t.code,
         sum(t.energy) / 1000 as fueltech_energy,
         sum(t.market_value) as fueltech_market_value,
         sum(t.emissions) as fueltech_emissions
     from mv_facility_all t
     where
-        t.trading_interval <= '{date_max}' and
-        t.trading_interval >= '{date_min}' and
-        t.code in ({facility_codes_parsed})
+        t.trading_interval <= :date_max and
+        t.trading_interval >= :date_min and
+        t.code = ANY(:facility_codes)
     group by 1, 2
     order by
         trading_day desc;
+    """,
+)
+
+
+def energy_facility_query(
+    facility_codes: List[str],
+    network: NetworkSchema,
+    period: TimePeriod,
+    interval: Optional[TimeInterval] = None,
+) -> TextClause:
+    """
+    Get Energy for a list of facility codes
     """
 
     timezone = network.timezone_database
-    offset = network.get_timezone(postgres_format=True)
 
     date_range: ScadaDateRange = get_scada_range(network=network, facilities=facility_codes)
 
@@ -308,82 +351,114 @@ def energy_facility_query(
     if not interval:
         raise Exception("Require an interval")
 
-    trunc = interval.trunc
-
     date_max = date_range.get_end()
     date_min = date_range.get_start()
 
     if period.period_human == "1M":
         date_min = date_range.get_end() - timedelta(minutes=period.period)
     elif period.period_human == "1Y":
-        # might have to do +offset times
-        year = datetime.now().year
-        date_min = "{}-01-01 00:00:00{}".format(year, offset)
+        # start of the year in the network timezone
+        date_min = date_max.replace(
+            month=1, day=1, hour=0, minute=0, second=0, microsecond=0, year=datetime.now().year
+        )
     elif period.period_human in ["7d", "5Y", "10Y"]:
         date_min = date_range.get_end() - timedelta(minutes=period.period)
 
-    # elif period.period_human == "all":
-    # else:
-    # date_min = date_range.get_end() - timedelta(minutes=period.period)
-
-    query = dedent(
-        __query.format(
-            facility_codes_parsed=duid_in_case(facility_codes),
-            trunc=trunc,
-            date_max=date_max,
-            date_min=date_min,
-            timezone=timezone,
-        )
+    return get_query(
+        ENERGY_FACILITY_MV,
+        facility_codes=facility_codes_array(facility_codes),
+        trunc=interval.trunc,
+        date_max=date_max,
+        date_min=date_min,
+        timezone=timezone,
+    )
+
+
+ENERGY_NETWORK = register_query_template(
+    "energy_network",
+    """
+    with intervals as (
+        select generate_series(
+            date_trunc(:trunc, now() AT TIME ZONE :timezone) - CAST(:period AS text)::interval,
+            date_trunc(:trunc, now() AT TIME ZONE :timezone),
+            CAST(:interval AS text)::interval
+        )::timestamp as interval
     )
-    return query
+
+    select
+        i.interval as trading_day,
+        fs.generated,
+        fs.facility_code as facility_code
+    from intervals i
+    left outer join
+        (select
+            date_trunc(:trunc, fs.trading_interval AT TIME ZONE :timezone)::timestamp {interval_remainder} as interval,
+            fs.facility_code,
+            coalesce(sum(fs.eoi_quantity), 0.0) / :scale as generated
+            from facility_scada fs
+            where
+                fs.trading_interval > now() AT TIME ZONE :timezone - CAST(:period AS text)::interval
+                and fs.network_id = :network_code
+            group by 1, 2
+        ) as fs on fs.interval = i.interval
+    order by 1 desc, 2 asc
+    """,
+)
 
 
 def energy_network(
     network: NetworkSchema,
     interval: TimeInterval,
     period: TimePeriod,
-) -> str:
-
-    timezone = network.timezone_database
-
-    __query = """
-        with intervals as (
-            select generate_series(
-                date_trunc('{trunc}', now() AT TIME ZONE '{timezone}') - '{period}'::interval,
-                date_trunc('{trunc}', now() AT TIME ZONE '{timezone}'),
-                '{interval}'::interval
-            )::timestamp as interval
-        )
-
-        select
-            i.interval as trading_day,
-            fs.generated,
-            fs.facility_code as facility_code
-        from intervals i
-        left outer join
-            (select
-                date_trunc('{trunc}', fs.trading_interval AT TIME ZONE '{timezone}')::timestamp  {interval_remainder} as interval,
-                fs.facility_code,
-                coalesce(sum(fs.eoi_quantity), 0.0) / {scale} as generated
-                from facility_scada fs
-                where
-                    fs.trading_interval > now() AT TIME ZONE '{timezone}' - '{period}'::interval
-                    and fs.network_id = '{network_code}'
-                group by 1, 2
-            ) as fs on fs.interval = i.interval
-        order by 1 desc, 2 asc"""
-
-    query = __query.format(
+) -> TextClause:
+    return get_query(
+        ENERGY_NETWORK,
+        {"interval_remainder": interval_remainder(interval)},
         network_code=network.code,
         trunc=interval.trunc,
         interval=interval.interval_sql,
-        interval_remainder=interval.get_sql_join(timezone=network.timezone_database),
+        interval_size=interval.interval,
         period=period.period_sql,
         scale=network.intervals_per_hour,
-        timezone=timezone,
+        timezone=network.timezone_database,
     )
 
-    return query
+
+ENERGY_NETWORK_FUELTECH = register_query_template(
+    "energy_network_fueltech",
+    """
+    with intervals as (
+        select generate_series(
+            date_trunc(:trunc, now() AT TIME ZONE :timezone) - CAST(:period AS text)::interval,
+            date_trunc(:trunc, now() AT TIME ZONE :timezone),
+            CAST(:interval AS text)::interval
+        )::timestamp as interval
+    )
+
+    select
+        i.interval as trading_day,
+        fs.generated,
+        fs.code
+    from intervals i
+    left outer join
+        (
+            select
+                date_trunc(:trunc, fs.trading_interval AT TIME ZONE :timezone)::timestamp {interval_remainder} as interval,
+                ft.code,
+                coalesce(sum(fs.eoi_quantity), 0) / :scale as generated
+            from facility_scada fs
+            join facility f on fs.facility_code = f.code
+            join fueltech ft on f.fueltech_id = ft.code
+            where
+                fs.trading_interval > now() AT TIME ZONE :timezone - CAST(:period AS text)::interval
+                and fs.network_id = :network_code
+                and f.fueltech_id is not null
+                {network_region_query}
+            group by 1, 2
+        ) as fs on fs.interval = i.interval
+    order by 1 desc, 2 desc
+    """,
+)
 
 
 def energy_network_fueltech(
@@ -391,62 +466,58 @@ def energy_network_fueltech(
     interval: TimeInterval,
     period: TimePeriod,
     network_region: str = None,
-) -> str:
+) -> TextClause:
 
     timezone = network.timezone_database
 
     if not timezone:
         timezone = "UTC"
 
-    __query = """
-        with intervals as (
-            select generate_series(
-                date_trunc('{trunc}', now() AT TIME ZONE '{timezone}') - '{period}'::interval,
-                date_trunc('{trunc}', now() AT TIME ZONE '{timezone}'),
-                '{interval}'::interval
-            )::timestamp as interval
-        )
-
-        select
-            i.interval as trading_day,
-            fs.generated,
-            fs.code
-        from intervals i
-        left outer join
-            (
-                select
-                    date_trunc('{trunc}', fs.trading_interval AT TIME ZONE '{timezone}')::timestamp  {interval_remainder} as interval,
-                    ft.code,
-                    coalesce(sum(fs.eoi_quantity), 0) / {scale} as generated
-                from facility_scada fs
-                join facility f on fs.facility_code = f.code
-                join fueltech ft on f.fueltech_id = ft.code
-                where
-                    fs.trading_interval > now() AT TIME ZONE '{timezone}' - '{period}'::interval
-                    and fs.network_id = '{network_code}'
-                    and f.fueltech_id is not null
-                    {network_region_query}
-                group by 1, 2
-            ) as fs on fs.interval = i.interval
-        order by 1 desc, 2 desc"""
-
-    network_region_query = ""
-
-    if network_region:
-        network_region_query = f"and f.network_region='{network_region}'"
-
-    query = __query.format(
+    return get_query(
+        ENERGY_NETWORK_FUELTECH,
+        {
+            "interval_remainder": interval_remainder(interval),
+            "network_region_query": NETWORK_REGION_FACILITY if network_region else "",
+        },
         network_code=network.code,
+        network_region=network_region,
         trunc=interval.trunc,
         interval=interval.interval_sql,
-        interval_remainder=interval.get_sql_join(timezone=network.timezone_database),
+        interval_size=interval.interval,
         period=period.period_sql,
         scale=network.intervals_per_hour,
-        network_region_query=network_region_query,
         timezone=timezone,
     )
 
-    return query
+
+ENERGY_NETWORK_FUELTECH_YEAR = register_query_template(
+    "energy_network_fueltech_year",
+    """
+    select
+        t.trading_interval,
+        sum(t.facility_energy),
+        t.fueltech_code
+    from (
+        select
+            time_bucket_gapfill(CAST(:trunc AS text)::interval, trading_interval) AS trading_interval,
+            energy_sum(fs.generated, CAST(:trunc AS text)) * interval_size('1 day', count(fs.generated)) / 1000 as facility_energy,
+            f.code,
+            ft.code as fueltech_code
+        from facility_scada fs
+        join facility f on fs.facility_code = f.code
+        join fueltech ft on f.fueltech_id = ft.code
+        where
+            fs.trading_interval >= :year_start
+            and fs.trading_interval <= :year_max
+            and fs.network_id = :network_code
+            and f.fueltech_id is not null
+            {network_region_query}
+        group by 1, 3, 4
+    ) as t
+    group by 1, 3
+    order by 1 desc;
+    """,
+)
 
 
 def energy_network_fueltech_year(
@@ -455,7 +526,7 @@ def energy_network_fueltech_year(
     year: int,
     network_region: str = None,
     scada_range: ScadaDateRange = None,
-) -> str:
+) -> TextClause:
     """
     Get Energy for a network or network + region
     based on a year
@@ -466,115 +537,96 @@ def energy_network_fueltech_year(
     if not timezone:
         timezone = "UTC"
 
-    year_max = "'{}-12-31'".format(year)
+    year_max = network_date(network, year, 12, 31)
 
     if year == datetime.now().year:
-        year_max = scada_range.get_end_sql(as_date=False)
-
-    __query = """
-        SET SESSION TIME ZONE '{timezone}';
+        year_max = scada_range.get_end()
 
-        select
-            t.trading_interval,
-            sum(t.facility_energy),
-            t.fueltech_code
-        from (
-            select
-                time_bucket_gapfill('{trunc}', trading_interval) AS trading_interval,
-                energy_sum(fs.generated, '{trunc}') * interval_size('1 day', count(fs.generated)) / 1000 as facility_energy,
-                f.code,
-                ft.code as fueltech_code
-            from facility_scada fs
-            join facility f on fs.facility_code = f.code
-            join fueltech ft on f.fueltech_id = ft.code
-            where
-                fs.trading_interval >= '{year}-01-01'
-                and fs.trading_interval <= {year_max}
-                and fs.network_id = '{network_code}'
-                and f.fueltech_id is not null
-                {network_region_query}
-            group by 1, 3, 4
-        ) as t
-        group by 1, 3
-        order by 1 desc;
-    """
-
-    network_region_query = ""
-
-    if network_region:
-        network_region_query = f"and f.network_region='{network_region}'"
-
-    query = __query.format(
+    query = get_query(
+        ENERGY_NETWORK_FUELTECH_YEAR,
+        {"network_region_query": NETWORK_REGION_FACILITY if network_region else ""},
         network_code=network.code,
+        network_region=network_region,
         trunc=interval.interval_sql,
-        year=year,
+        year_start=network_date(network, year),
         year_max=year_max,
-        scale=network.intervals_per_hour,
-        network_region_query=network_region_query,
-        timezone=timezone,
     )
 
-    return query
+    return with_session_timezone(query, timezone)
+
+
+ENERGY_NETWORK_FUELTECH_ALL = register_query_template(
+    "energy_network_fueltech_all",
+    """
+    select
+        date_trunc('month', t.trading_interval),
+        sum(t.facility_energy),
+        t.fueltech_code
+    from (
+        select
+            time_bucket_gapfill('1 day', trading_interval) AS trading_interval,
+            energy_sum(fs.generated, '1 day') * interval_size('1 day', count(fs.generated)) / 1000 as facility_energy,
+            f.code,
+            ft.code as fueltech_code
+        from facility_scada fs
+        join facility f on fs.facility_code = f.code
+        join fueltech ft on f.fueltech_id = ft.code
+        where
+            fs.trading_interval >= :scada_min
+            and fs.trading_interval <= :scada_max
+            and f.fueltech_id is not null
+            {network_query}
+            {network_region_query}
+        group by 1, 3, 4
+    ) as t
+    group by 1, 3
+    order by 1 desc;
+    """,
+)
 
 
 def energy_network_fueltech_all(
     network: Optional[NetworkSchema],
     network_region: Optional[str],
     scada_range: ScadaDateRange,
-):
+) -> TextClause:
     timezone = "AEST"
 
     if network:
         timezone = network.get_timezone(postgres_format=True)
 
-    __query = """
-
-        SET SESSION TIME ZONE '{timezone}';
-
-        select
-            date_trunc('month', t.trading_interval),
-            sum(t.facility_energy),
-            t.fueltech_code
-        from (
-            select
-                time_bucket_gapfill('1 day', trading_interval) AS trading_interval,
-                energy_sum(fs.generated, '1 day') * interval_size('1 day', count(fs.generated)) / 1000 as facility_energy,
-                f.code,
-                ft.code as fueltech_code
-            from facility_scada fs
-            join facility f on fs.facility_code = f.code
-            join fueltech ft on f.fueltech_id = ft.code
-            where
-                fs.trading_interval >= {scada_min}
-                and fs.trading_interval <= {scada_max}
-                and f.fueltech_id is not null
-                {network_query}
-                {network_region_query}
-            group by 1, 3, 4
-        ) as t
-        group by 1, 3
-        order by 1 desc;
-    """
-
-    network_query = ""
-    network_region_query = ""
-
-    if network:
-        network_query = f"and fs.network_id = '{network.code}' "
+    query = get_query(
+        ENERGY_NETWORK_FUELTECH_ALL,
+        {
+            "network_query": NETWORK_FACILITY_SCADA if network else "",
+            "network_region_query": NETWORK_REGION_FACILITY if network_region else "",
+        },
+        network_code=network.code if network else None,
+        network_region=network_region,
+        scada_min=start_of_day(scada_range.get_start()),
+        scada_max=start_of_day(scada_range.get_end()),
+    )
 
-    if network_region:
-        network_region_query = f"and f.network_region='{network_region}' "
+    return with_session_timezone(query, timezone)
 
-    query = __query.format(
-        network_code=network.code,
-        network_query=network_query,
-        network_region_query=network_region_query,
-        scada_min=scada_range.get_start_sql(as_date=True),
-        scada_max=scada_range.get_end_sql(as_date=True),
-        timezone=timezone,
-    )
 
-    return query
+PRICE_NETWORK_REGION = register_query_template(
+    "price_network_region",
+    """
+    select
+        time_bucket_gapfill(CAST(:trunc AS text)::interval, bs.trading_interval) AS trading_interval,
+        bs.network_region,
+        coalesce(avg(bs.price), 0) as price
+    from balancing_summary bs
+    where
+        bs.trading_interval >= {date_min_query}
+        and bs.trading_interval <= :date_max
+        {network_query}
+        {network_region_query}
+    group by 1, 2
+    order by 1 desc
+    """,
+)
 
 
 def price_network_region(
@@ -584,116 +636,114 @@ def price_network_region(
     period: TimePeriod,
     scada_range: ScadaDateRange,
     year: Optional[int] = None,
-) -> str:
+) -> TextClause:
 
     timezone = network.get_timezone(postgres_format=True)
 
     if not timezone:
         timezone = "UTC"
 
-    __query = """
-        SET SESSION TIME ZONE '{timezone}';
-
-        select
-            time_bucket_gapfill('{trunc}', bs.trading_interval) AS trading_interval,
-            bs.network_region,
-            coalesce(avg(bs.price), 0) as price
-        from balancing_summary bs
-        where
-            bs.trading_interval >= {date_min_query}
-            and bs.trading_interval <= {scada_max}
-            {network_query}
-            {network_region_query}
-        group by 1, 2
-        order by 1 desc
-    """
-
-    network_query = ""
-    network_region_query = ""
-
-    if network:
-        network_query = f"and bs.network_id = '{network.code}' "
-
-    if network_region_code:
-        network_region_query = f"and bs.network_region='{network_region_code}' "
-
-    date_min_query = ""
-
-    if period:
-        date_min_query = "{scada_max}::timestamp - interval '{period}'::interval".format(
-            scada_max=scada_range.get_end_sql(), period=period.period_sql
-        )
-
-    if year:
-        date_min_query = "'{year}-01-01'::date ".format(year=year)
-
     if not period and not year:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Require one of period or year",
         )
 
-    query = __query.format(
+    query = get_query(
+        PRICE_NETWORK_REGION,
+        {
+            "date_min_query": DATE_MIN_YEAR if year else DATE_MIN_PERIOD,
+            "network_query": NETWORK_BALANCING if network else "",
+            "network_region_query": NETWORK_REGION_BALANCING if network_region_code else "",
+        },
+        network_code=network.code if network else None,
+        network_region=network_region_code,
         trunc=interval.interval_sql,
-        timezone=timezone,
-        network_query=network_query,
-        network_region_query=network_region_query,
-        scada_max=scada_range.get_end_sql(),
-        date_min_query=date_min_query,
+        date_max=scada_range.get_end(),
+        period=period.period_sql if period else None,
+        year_start=network_date(network, year) if year else None,
     )
 
-    return query
+    return with_session_timezone(query, timezone)
+
+
+PRICE_NETWORK_MONTHLY = register_query_template(
+    "price_network_monthly",
+    """
+    select
+        date_trunc('month', t.trading_interval),
+        avg(t.price),
+        t.network_id
+    from (
+        select
+            time_bucket_gapfill('1 day', trading_interval) AS trading_interval,
+            avg(bs.price) as price,
+            bs.network_id as network_id
+        from balancing_summary bs
+        where
+            bs.trading_interval >= :scada_min
+            and bs.trading_interval <= :scada_max
+            and bs.network_id = ANY(:network_codes)
+        group by 1, 3
+    ) as t
+    group by 1, 3
+    order by 1 desc;
+    """,
+)
 
 
 def price_network_monthly(
     network: Optional[NetworkSchema],
     network_region_code: Optional[str],
     scada_range: ScadaDateRange,
-):
+) -> TextClause:
     timezone = "AEST"
 
     networks = [network.code]
 
-    if network.code == "au":
+    if network.code.upper() == "AU":
         networks = ["WEM", "NEM"]
 
     if network:
         timezone = network.get_timezone(postgres_format=True)
 
-    __query = """
+    query = get_query(
+        PRICE_NETWORK_MONTHLY,
+        network_codes=[i.upper() for i in networks],
+        scada_min=start_of_day(scada_range.get_start()),
+        scada_max=start_of_day(scada_range.get_end()),
+    )
 
-        SET SESSION TIME ZONE '{timezone}';
+    return with_session_timezone(query, timezone)
 
-        select
-            date_trunc('month', t.trading_interval),
-            avg(t.price),
-            t.network_id
-        from (
-            select
-                time_bucket_gapfill('1 day', trading_interval) AS trading_interval,
-                avg(bs.price) as price,
-                bs.network_id as network_id
-            from balancing_summary bs
-            where
-                bs.trading_interval >= {scada_min}
-                and bs.trading_interval <= {scada_max}
-                and bs.network_id IN ({network_codes})
-            group by 1, 3
-        ) as t
-        group by 1, 3
-        order by 1 desc;
-    """
 
-    network_codes = ""
+STATION_FACILITY_CODES = register_query_template(
+    "station_facility_codes",
+    """
+    select f.code
+    from facility f
+    where f.station_id in (
+        select s.id
+        from station s
+        join facility sf on sf.station_id = s.id
+        where
+            s.code = :station_code
+            and sf.network_id = :network_code
+            {approved_query}
+    )
+    """,
+)
 
-    for network_code in networks:
-        network_codes = ", ".join("'{}'".format(network_code.upper()))
 
-    query = __query.format(
-        network_codes=network_codes,
-        scada_min=scada_range.get_start_sql(as_date=True),
-        scada_max=scada_range.get_end_sql(as_date=True),
-        timezone=timezone,
+def station_facility_codes_query(
+    station_code: str, network: NetworkSchema, only_approved: bool = False
+) -> TextClause:
+    """
+    Get the facility codes for a station with facilities on a network
+    """
+    return get_query(
+        STATION_FACILITY_CODES,
+        {"approved_query": "and s.approved is true" if only_approved else ""},
+        station_code=station_code,
+        network_code=network.code,
     )
-
-    return query
@@ -1,20 +1,21 @@
 import logging
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query
 from starlette import status
+from starlette.concurrency import run_in_threadpool
 
 from opennem.api.time import human_to_interval, human_to_period
 from opennem.core.networks import network_from_network_code
 from opennem.core.normalizers import normalize_duid
 from opennem.core.units import get_unit
-from opennem.db import get_database_engine, get_database_session
-from opennem.db.models.opennem import Facility, Station
+from opennem.db import fetch_all_async
+from opennem.schema.network import NetworkSchema
 from opennem.schema.time import TimePeriod
 from opennem.utils.time import human_to_timedelta
 
+from .cache import cache_stats_response
 from .controllers import get_scada_range, stats_factory
 from .queries import (
     energy_facility_query,
@@ -26,6 +27,7 @@ from .queries import (
     power_network_fueltech,
     price_network_monthly,
     price_network_region,
+    station_facility_codes_query,
 )
 from .schema import DataQueryResult, OpennemDataSet
 
@@ -34,18 +36,33 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+async def get_station_facility_codes(
+    station_code: str, network: NetworkSchema, only_approved: bool = False
+) -> List[str]:
+    rows = await fetch_all_async(
+        station_facility_codes_query(station_code, network, only_approved=only_approved)
+    )
+
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Station not found")
+
+    return list(set([i[0] for i in rows]))
+
+
 @router.get(
     "/power/unit/{network_code}/{unit_code:path}",
     name="stats:Unit Power",
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-def power_unit(
+@cache_stats_response(
+    "power_unit", code="unit_code", interval="interval_human", period="period_human"
+)
+async def power_unit(
     unit_code: str = Query(..., description="Unit code"),
     network_code: str = Query(..., description="Network code"),
     interval_human: str = Query(None, description="Interval"),
     period_human: str = Query("7d", description="Period"),
-    engine=Depends(get_database_engine),
 ) -> OpennemDataSet:
 
     network = network_from_network_code(network_code)
@@ -67,10 +84,11 @@ def power_unit(
 
     facility_codes = [normalize_duid(unit_code)]
 
-    query = power_facility_query(facility_codes, network.code, interval=interval, period=period)
+    query = await run_in_threadpool(
+        power_facility_query, facility_codes, network=network, interval=interval, period=period
+    )
 
-    with engine.connect() as c:
-        results = list(c.execute(query))
+    results = await fetch_all_async(query)
 
     stats = [
         DataQueryResult(interval=i[0], result=i[1], group_by=i[2] if len(i) > 1 else None)
@@ -107,14 +125,15 @@ def power_unit(
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-def power_station(
+@cache_stats_response(
+    "power_station", code="station_code", interval="interval_human", period="period_human"
+)
+async def power_station(
     station_code: str = Query(..., description="Station code"),
     network_code: str = Query(..., description="Network code"),
     since: datetime = Query(None, description="Since time"),
     interval_human: str = Query(None, description="Interval"),
     period_human: str = Query("7d", description="Period"),
-    session: Session = Depends(get_database_session),
-    engine=Depends(get_database_engine),
 ) -> OpennemDataSet:
     if not since:
         since = datetime.now() - human_to_timedelta("7d")
@@ -138,28 +157,17 @@ def power_station(
     period = human_to_period(period_human)
     units = get_unit("power")
 
-    station = (
-        session.query(Station)
-        .join(Facility)
-        .filter(Station.code == station_code)
-        .filter(Facility.network_id == network.code)
-        .filter(Station.approved.is_(True))
-        .one_or_none()
-    )
-
-    if not station:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Station not found")
-
-    facility_codes = list(set([f.code for f in station.facilities]))
+    facility_codes = await get_station_facility_codes(station_code, network, only_approved=True)
 
     stats = []
 
-    query = power_facility_query(facility_codes, network=network, interval=interval, period=period)
+    query = await run_in_threadpool(
+        power_facility_query, facility_codes, network=network, interval=interval, period=period
+    )
 
     logger.debug(query)
 
-    with engine.connect() as c:
-        results = list(c.execute(query))
+    results = await fetch_all_async(query)
 
     stats = [
         DataQueryResult(interval=i[0], result=i[1], group_by=i[2] if len(i) > 1 else None)
@@ -197,12 +205,17 @@ def power_station(
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-def power_network_fueltech_api(
+@cache_stats_response(
+    "power_network_fueltech",
+    code="network_region",
+    interval="interval_human",
+    period="period_human",
+)
+async def power_network_fueltech_api(
     network_code: str = Query(..., description="Network code"),
     network_region: str = Query(None, description="Network region"),
     interval_human: str = Query(None, description="Interval"),
     period_human: str = Query("7d", description="Period"),
-    engine=Depends(get_database_engine),
 ) -> OpennemDataSet:
     network = network_from_network_code(network_code)
 
@@ -219,7 +232,7 @@ def power_network_fueltech_api(
     period = human_to_period(period_human)
     units = get_unit("power")
 
-    scada_range = get_scada_range(network=network)
+    scada_range = await run_in_threadpool(get_scada_range, network=network)
 
     query = power_network_fueltech(
         network=network,
@@ -229,8 +242,7 @@ def power_network_fueltech_api(
         scada_range=scada_range,
     )
 
-    with engine.connect() as c:
-        results = list(c.execute(query))
+    results = await fetch_all_async(query)
 
     stats = [
         DataQueryResult(interval=i[0], result=i[1], group_by=i[2] if len(i) > 1 else None)
@@ -274,9 +286,10 @@ def power_network_fueltech_api(
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-def energy_station(
-    engine=Depends(get_database_engine),
-    session: Session = Depends(get_database_session),
+@cache_stats_response(
+    "energy_station", code="station_code", interval="interval", period="period"
+)
+async def energy_station(
     network_code: str = Query(..., description="Network code"),
     station_code: str = Query(..., description="Station Code"),
     interval: str = Query(None, description="Interval"),
@@ -306,26 +319,10 @@ def energy_station(
     period_obj = human_to_period(period)
     units = get_unit("energy")
 
-    station = (
-        session.query(Station)
-        .join(Station.facilities)
-        .filter(Station.code == station_code)
-        .filter(Facility.network_id == network.code)
-        .one_or_none()
-    )
+    facility_codes = await get_station_facility_codes(station_code, network)
 
-    if not station:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Station not found")
-
-    if len(station.facilities) < 1:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Station has no facilities",
-        )
-
-    facility_codes = list(set([f.code for f in station.facilities]))
-
-    query = energy_facility_query(
+    query = await run_in_threadpool(
+        energy_facility_query,
         facility_codes,
         network=network,
         interval=interval_obj,
@@ -334,8 +331,7 @@ def energy_station(
 
     logger.debug(query)
 
-    with engine.connect() as c:
-        row = list(c.execute(query))
+    row = await fetch_all_async(query)
 
     if len(row) < 1:
         raise HTTPException(
@@ -413,8 +409,8 @@ def energy_station(
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-def energy_network_api(
-    engine=Depends(get_database_engine),
+@cache_stats_response("energy_network", interval="interval_human", period="period_human")
+async def energy_network_api(
     network_code: str = Query(..., description="Network code"),
     interval_human: str = Query("1d", description="Interval"),
     period_human: str = Query("1Y", description="Period"),
@@ -439,8 +435,7 @@ def energy_network_api(
 
     query = energy_network(network=network, interval=interval, period=period)
 
-    with engine.connect() as c:
-        results = list(c.execute(query))
+    results = await fetch_all_async(query)
 
     if len(results) < 1:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No results")
@@ -474,13 +469,19 @@ def energy_network_api(
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-def energy_network_fueltech_api(
+@cache_stats_response(
+    "energy_network_fueltech",
+    code="network_region",
+    interval="interval_human",
+    period="period_human",
+    year="year",
+)
+async def energy_network_fueltech_api(
     network_code: str = Query(None, description="Network code"),
     network_region: str = Query(None, description="Network region"),
     interval_human: str = Query("1d", description="Interval"),
     year: int = Query(None, description="Year to query"),
     period_human: str = Query("1Y", description="Period"),
-    engine=Depends(get_database_engine),
 ) -> OpennemDataSet:
     network = network_from_network_code(network_code)
     interval = human_to_interval(interval_human)
@@ -503,7 +504,7 @@ def energy_network_fueltech_api(
                 detail="Not a valid year",
             )
 
-        scada_range = get_scada_range(network=network)
+        scada_range = await run_in_threadpool(get_scada_range, network=network)
 
         query = energy_network_fueltech_year(
             network=network,
@@ -513,7 +514,7 @@ def energy_network_fueltech_api(
             scada_range=scada_range,
         )
     elif period_obj and period_obj.period_human == "all":
-        scada_range = get_scada_range(network=network)
+        scada_range = await run_in_threadpool(get_scada_range, network=network)
 
         query = energy_network_fueltech_all(
             network=network,
@@ -528,10 +529,7 @@ def energy_network_fueltech_api(
             network_region=network_region,
         )
 
-    # print(query)
-
-    with engine.connect() as c:
-        results = list(c.execute(query))
+    results = await fetch_all_async(query)
 
     stats = [
         DataQueryResult(interval=i[0], result=i[1], group_by=i[2] if len(i) > 1 else None)
@@ -572,8 +570,14 @@ def energy_network_fueltech_api(
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-def price_network_region_api(
-    engine=Depends(get_database_engine),
+@cache_stats_response(
+    "price_network_region",
+    code="network_region_code",
+    interval="interval_human",
+    period="period_human",
+    year="year",
+)
+async def price_network_region_api(
     network_code: str = Query(..., description="Network code"),
     network_region_code: str = Query(..., description="Region code"),
     interval_human: str = Query(None, description="Interval"),
@@ -600,7 +604,7 @@ def price_network_region_api(
 
     units = get_unit("price")
 
-    scada_range = get_scada_range(network=network)
+    scada_range = await run_in_threadpool(get_scada_range, network=network)
 
     if period_obj and period_obj.period_human == "all" and interval.interval_human == "1M":
         query = price_network_monthly(
@@ -618,8 +622,7 @@ def price_network_region_api(
             year=year,
         )
 
-    with engine.connect() as c:
-        results = list(c.execute(query))
+    results = await fetch_all_async(query)
 
     if len(results) < 1:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No data found")
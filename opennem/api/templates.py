@@ -0,0 +1,69 @@
+"""
+    Query template registry
+
+    Stats and export queries are registered once by name and compiled into
+    `sqlalchemy.text()` clauses with bind parameters. Values (dates, codes,
+    intervals, timezones) are always bound, lists of codes are bound as arrays
+    and compared with `= ANY()`.
+
+    Parts of a query that change its shape (optional filters, groupings or
+    the view that's read) are slots filled from fixed fragments, each variant
+    is compiled once and keeps the same statement text between requests so
+    it can be prepared and its plan cached by the server. psycopg2 interpolates
+    the parameters client side, drivers that prepare statements (asyncpg
+    through `databases`) prepare each variant once.
+
+"""
+from functools import lru_cache
+from textwrap import dedent
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+_query_templates: Dict[str, str] = {}
+
+
+class QueryTemplateException(Exception):
+    pass
+
+
+def register_query_template(name: str, query: str) -> str:
+    """
+    Register a query template. Slots are `{name}` format fields and bind
+    parameters are `:name`
+    """
+    if name in _query_templates:
+        raise QueryTemplateException("Query template {} already registered".format(name))
+
+    _query_templates[name] = dedent(query)
+
+    return name
+
+
+@lru_cache(maxsize=None)
+def _compile_query_template(name: str, slots: Tuple[Tuple[str, str], ...]) -> TextClause:
+    return text(_query_templates[name].format(**dict(slots)))
+
+
+def get_query_template(name: str, slots: Optional[Dict[str, str]] = None) -> TextClause:
+    """Get the compiled clause for a template variant"""
+    if name not in _query_templates:
+        raise QueryTemplateException("No query template {}".format(name))
+
+    return _compile_query_template(name, tuple(sorted((slots or {}).items())))
+
+
+def get_query(name: str, slots: Optional[Dict[str, str]] = None, **params: Any) -> TextClause:
+    """
+    Get a template variant with its parameters bound. Parameters the variant
+    doesn't use are ignored so optional filters can always be passed
+    """
+    template = get_query_template(name, slots)
+
+    params = {k: v for k, v in params.items() if k in template._bindparams}
+
+    if not params:
+        return template
+
+    return template.bindparams(**params)
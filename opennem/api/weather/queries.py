@@ -1,129 +1,146 @@
-from textwrap import dedent
 from typing import List, Optional, Union
 
+from sqlalchemy.sql.elements import TextClause
+
+from opennem.api.stats.queries import network_date
 from opennem.api.stats.schema import ScadaDateRange
+from opennem.api.templates import get_query, register_query_template
 from opennem.core.normalizers import normalize_duid
 from opennem.schema.network import NetworkNEM, NetworkSchema
 from opennem.schema.time import TimeInterval, TimePeriod
 from opennem.utils.time import human_to_timedelta
 
 
-def station_id_case(station_codes: List[str]) -> str:
-    return ",".join(["'{}'".format(i) for i in map(normalize_duid, station_codes)])
-
+def station_codes_array(station_codes: List[str]) -> List[str]:
+    return [normalize_duid(i) for i in station_codes]
 
-def observation_query(
-    station_codes: List[str],
-    interval: TimeInterval,
-    network: NetworkSchema = NetworkNEM,
-    period: Optional[TimePeriod] = None,
-    scada_range: Optional[ScadaDateRange] = None,
-    year: Optional[Union[str, int]] = None,
-) -> str:
-    if isinstance(year, int):
-        year = str(year)
 
-    timezone = network.timezone_database
+WEATHER_STATIONS = register_query_template(
+    "weather_stations",
+    """
+    select
+        bs.code,
+        bs.state,
+        bs.name_alias,
+        bs.registered,
+        bs.website_url,
+        bs.altitude,
+        ST_Y(bs.geom) as lat,
+        ST_X(bs.geom) as lng
+    from bom_station bs
+    {station_query}
+    """,
+)
+
+
+def weather_stations_query(station_code: Optional[str] = None) -> TextClause:
+    """Weather stations or a single station by code"""
+    return get_query(
+        WEATHER_STATIONS,
+        {"station_query": "where bs.code = :station_code" if station_code else ""},
+        station_code=station_code,
+    )
 
-    if not timezone:
-        timezone = "AEST"
 
-    __query = """
+OBSERVATION = register_query_template(
+    "weather_station_observation",
+    """
     select
-        time_bucket_gapfill('{trunc}', observation_time) as observation_time,
+        time_bucket_gapfill(CAST(:trunc AS text)::interval, observation_time) as observation_time,
         fs.station_id as station_id,
         avg(fs.temp_air) as temp_air,
         min(fs.temp_air) as temp_min,
         max(fs.temp_air) as temp_max
     from bom_observation fs
     where
-        fs.station_id in ({station_codes})
-        and fs.observation_time <= {date_end}
-        and fs.observation_time > {date_start_condition}
+        fs.station_id = ANY(:station_codes)
+        and fs.observation_time <= coalesce(CAST(:date_end AS timestamptz), now())
+        and fs.observation_time > :date_start
     group by 1, 2;
-    """
-    date_end = ""
+    """,
+)
 
-    if scada_range:
-        date_end = scada_range.get_end_sql()
 
-    date_start_condition = ""
+def observation_query(
+    station_codes: List[str],
+    interval: TimeInterval,
+    network: NetworkSchema = NetworkNEM,
+    period: Optional[TimePeriod] = None,
+    scada_range: Optional[ScadaDateRange] = None,
+    year: Optional[Union[str, int]] = None,
+) -> TextClause:
+    date_end = None
+    date_start = None
+
+    if scada_range:
+        date_end = scada_range.get_end()
 
-    if period:
-        date_start_condition = "{date_end}::timestamp - '{period}'::interval".format(
-            date_end=date_end, period=period.period_sql
-        )
-        date_start_condition = "'{}'".format(scada_range.get_end() - human_to_timedelta("7d"))
+    if period and scada_range:
+        date_start = scada_range.get_end() - human_to_timedelta("7d")
 
     if year:
-        date_start_condition = "'{year}-12-31'::date".format(year=int(year) - 1)
-        date_end = "'{year}-12-31'::date".format(year=year)
+        date_start = network_date(network, int(year) - 1, 12, 31)
+        date_end = network_date(network, int(year), 12, 31)
 
     if not period and not year:
         if not scada_range:
             raise Exception("require a scada range ")
 
-        date_start_condition = "'{}'".format(scada_range.get_start())
+        date_start = scada_range.get_start()
 
-    query = dedent(
-        __query.format(
-            station_codes=station_id_case(station_codes),
-            trunc=interval.interval_sql,
-            timezone=timezone,
-            date_start_condition=date_start_condition,
-            date_end=date_end,
-        )
+    return get_query(
+        OBSERVATION,
+        station_codes=station_codes_array(station_codes),
+        trunc=interval.interval_sql,
+        date_start=date_start,
+        date_end=date_end,
     )
 
-    return query
+
+OBSERVATION_ALL = register_query_template(
+    "weather_station_observation_all",
+    """
+    select
+        date_trunc('month', t.observation_time at time zone :timezone) as observation_month,
+        t.station_id,
+        avg(t.temp_avg),
+        min(t.temp_min),
+        max(t.temp_max)
+    from
+        (
+            select
+                time_bucket_gapfill('1 day', observation_time) as observation_time,
+                fs.station_id,
+                avg(fs.temp_air) as temp_avg,
+                min(fs.temp_air) as temp_min,
+                max(fs.temp_air) as temp_max
+            from bom_observation fs
+            where
+                fs.station_id = ANY(:station_codes)
+                and fs.observation_time <= :date_end
+                and fs.observation_time > :date_start
+            group by 1, 2
+        ) as t
+    group by 1, 2
+    order by 1 desc, 2 desc
+    """,
+)
 
 
 def observation_query_all(
     station_codes: List[str],
     scada_range: ScadaDateRange,
     network: NetworkSchema = NetworkNEM,
-) -> str:
-    #
-
+) -> TextClause:
     timezone = network.timezone_database
 
     if not timezone:
         timezone = "UTC"
 
-    __query = """
-        select
-            date_trunc('month', t.observation_time at time zone '{timezone}') as observation_month,
-            t.station_id,
-            avg(t.temp_avg),
-            min(t.temp_min),
-            max(t.temp_max)
-        from
-            (
-                select
-                    time_bucket_gapfill('1 day', observation_time) as observation_time,
-                    fs.station_id,
-                    avg(fs.temp_air) as temp_avg,
-                    min(fs.temp_air) as temp_min,
-                    max(fs.temp_air) as temp_max
-                from bom_observation fs
-                where
-                    fs.station_id in ({station_codes})
-                    and fs.observation_time <= {date_end}
-                    and fs.observation_time > {date_start}
-                group by 1, 2
-            ) as t
-        group by 1, 2
-        order by 1 desc, 2 desc
-    """
-
-    date_end = scada_range.get_end_sql()
-    date_start = scada_range.get_start_sql()
-
-    query = __query.format(
-        station_codes=station_id_case(station_codes),
+    return get_query(
+        OBSERVATION_ALL,
+        station_codes=station_codes_array(station_codes),
         timezone=timezone,
-        date_start=date_start,
-        date_end=date_end,
+        date_start=scada_range.get_start(),
+        date_end=scada_range.get_end(),
     )
-
-    return query
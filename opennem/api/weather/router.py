@@ -1,18 +1,17 @@
 from typing import List
 
 import pytz
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query
 from starlette import status
+from starlette.concurrency import run_in_threadpool
 
 from opennem.api.stats.controllers import get_scada_range, stats_factory
 from opennem.api.stats.schema import DataQueryResult, OpennemDataSet
 from opennem.api.time import human_to_interval, human_to_period
-from opennem.api.weather.queries import observation_query
+from opennem.api.weather.queries import observation_query, weather_stations_query
 from opennem.core.networks import network_from_network_code
 from opennem.core.units import get_unit
-from opennem.db import get_database_engine, get_database_session
-from opennem.db.models.opennem import BomStation
+from opennem.db import fetch_all_async
 from opennem.utils.timezone import get_fixed_timezone
 
 from .schema import WeatherStation
@@ -26,16 +25,14 @@ router = APIRouter()
     response_model=List[WeatherStation],
     response_model_exclude_unset=True,
 )
-def station(
-    session: Session = Depends(get_database_session),
-) -> List[WeatherStation]:
+async def station() -> List[WeatherStation]:
     """
     Get a list of all stations
 
     """
-    stations = session.query(BomStation).all()
+    stations = await fetch_all_async(weather_stations_query())
 
-    return stations
+    return [WeatherStation(**i) for i in stations]
 
 
 @router.get(
@@ -45,26 +42,21 @@ def station(
     response_model_exclude_unset=True,
     response_model_exclude=set(["observations"]),
 )
-def station_record(
+async def station_record(
     station_code: str = Query(..., description="Station code"),
-    session: Session = Depends(get_database_session),
 ) -> WeatherStation:
     """
     Get a single weather station by code
 
     """
-    station = (
-        session.query(BomStation)
-        .filter(BomStation.code == station_code)
-        .one_or_none()
-    )
+    stations = await fetch_all_async(weather_stations_query(station_code))
 
-    if not station:
+    if not stations:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="No station found"
         )
 
-    return station
+    return WeatherStation(**stations[0])
 
 
 @router.get(
@@ -73,7 +65,7 @@ def station_record(
     response_model=OpennemDataSet,
     response_model_exclude_unset=True,
 )
-def station_observations_api(
+async def station_observations_api(
     station_code: str = Query(None, description="Station code"),
     interval_human: str = Query("15m", description="Interval"),
     period_human: str = Query("7d", description="Period"),
@@ -82,7 +74,6 @@ def station_observations_api(
     timezone: str = None,
     offset: str = None,
     year: int = None,
-    engine=Depends(get_database_engine),
 ) -> OpennemDataSet:
     units = get_unit("temperature")
 
@@ -112,7 +103,7 @@ def station_observations_api(
     scada_range = None
 
     if network:
-        scada_range = get_scada_range(network=network)
+        scada_range = await run_in_threadpool(get_scada_range, network=network)
 
     query = observation_query(
         station_codes=station_codes,
@@ -123,8 +114,7 @@ def station_observations_api(
         year=year,
     )
 
-    with engine.connect() as c:
-        results = list(c.execute(query))
+    results = await fetch_all_async(query)
 
     stats = [
         DataQueryResult(
@@ -1,4 +1,6 @@
 import logging
+from datetime import datetime
+from typing import List, Optional
 
 import click
 from scrapy.utils.python import garbage_collect
@@ -11,6 +13,7 @@ from opennem.importer.all import run_all
 from opennem.importer.db import import_facilities
 from opennem.importer.db import init as db_init
 from opennem.importer.emissions import import_emissions_map
+from opennem.importer.mms_backfill import BACKFILL_DEFAULT_TABLES, run_backfill
 from opennem.importer.mms import mms_export
 from opennem.importer.opennem import opennem_export, opennem_import
 from opennem.settings import settings
@@ -102,6 +105,35 @@ def cmd_export_all() -> None:
     run_all()
 
 
+@click.group()
+def cmd_backfill() -> None:
+    pass
+
+
+@click.command()
+@click.option("--start", type=click.DateTime(formats=["%Y-%m"]), default="2020-01")
+@click.option("--end", type=click.DateTime(formats=["%Y-%m"]), default="2009-07")
+@click.option(
+    "--table",
+    "tables",
+    multiple=True,
+    default=BACKFILL_DEFAULT_TABLES,
+    help="MMSDM archive table to backfill (can be repeated)",
+)
+@click.option("--workers", type=int, default=None, help="Number of processes. Default CPU count")
+@click.option("--force", is_flag=True, help="Backfill months that have already completed")
+def cmd_backfill_mms(
+    start: datetime, end: datetime, tables: List[str], workers: Optional[int], force: bool
+) -> None:
+    results = run_backfill(start, end, list(tables), workers=workers, force=force)
+
+    logger.info(
+        "Backfill done: {completed} completed, {failed} failed, {num_records} records".format(
+            **results
+        )
+    )
+
+
 @click.group()
 def cmd_weather() -> None:
     pass
@@ -117,6 +149,7 @@ main.add_command(cmd_db, name="db")
 main.add_command(cmd_import, name="import")
 main.add_command(cmd_export, name="export")
 main.add_command(cmd_weather, name="weather")
+main.add_command(cmd_backfill, name="backfill")
 
 cmd_import.add_command(cmd_import_opennem, name="opennem")
 cmd_import.add_command(cmd_import_mms, name="mms")
@@ -135,6 +168,8 @@ cmd_db.add_command(cmd_db_aggregations, name="aggregations")
 
 cmd_weather.add_command(cmd_weather_init, name="init")
 
+cmd_backfill.add_command(cmd_backfill_mms, name="mms")
+
 if __name__ == "__main__":
     try:
         main()
@@ -0,0 +1,146 @@
+"""
+    Index of files that crawlers have downloaded and ingested
+
+    Directory listing crawls consult the index to skip files that have already
+    been ingested, downloads are made conditional on the ETag / Last-Modified
+    of the previous download and a content hash catches files that have been
+    re-published unchanged. Files are marked ingested once they are stored.
+
+    Failing to read or write the index never stops a crawl, files are just
+    fetched again.
+
+"""
+import logging
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional
+
+from opennem.db import SessionLocal
+from opennem.db.models.opennem import CrawlFile
+from opennem.db.upsert import upsert_records
+
+logger = logging.getLogger("opennem.core.crawl_index")
+
+
+class CrawlFileStatus(Enum):
+    downloaded = "downloaded"
+    ingested = "ingested"
+
+
+CRAWL_FILE_FIELDS = ["spider_name", "size", "etag", "last_modified", "content_hash", "status"]
+
+
+def get_crawl_files(urls: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the index entries for a list of urls keyed by url
+    """
+    if not urls:
+        return {}
+
+    session = SessionLocal()
+
+    try:
+        crawl_files = session.query(CrawlFile).filter(CrawlFile.url.in_(urls)).all()
+    except Exception as e:
+        logger.error("Could not read crawl index: {}".format(e))
+        return {}
+    finally:
+        session.close()
+
+    return {
+        i.url: {"url": i.url, **{f: getattr(i, f) for f in CRAWL_FILE_FIELDS}}
+        for i in crawl_files
+    }
+
+
+def get_crawl_file(url: str) -> Optional[Dict[str, Any]]:
+    return get_crawl_files([url]).get(url)
+
+
+def crawl_file_is_ingested(
+    crawl_file: Optional[Dict[str, Any]],
+    size: Optional[int] = None,
+    content_hash: Optional[str] = None,
+) -> bool:
+    """
+    Check if a file has been ingested and is unchanged. Size and content
+    hash are compared if they are known
+    """
+    if not crawl_file or crawl_file["status"] != CrawlFileStatus.ingested.value:
+        return False
+
+    if size is not None and crawl_file["size"] is not None and size != crawl_file["size"]:
+        return False
+
+    if content_hash and crawl_file["content_hash"] and content_hash != crawl_file["content_hash"]:
+        return False
+
+    return True
+
+
+def get_conditional_headers(crawl_file: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Request headers to only download a file if it has changed since it was
+    ingested
+    """
+    headers: Dict[str, str] = {}
+
+    if not crawl_file_is_ingested(crawl_file):
+        return headers
+
+    if crawl_file["etag"]:  # type: ignore
+        headers["If-None-Match"] = crawl_file["etag"]  # type: ignore
+
+    if crawl_file["last_modified"]:  # type: ignore
+        headers["If-Modified-Since"] = crawl_file["last_modified"]  # type: ignore
+
+    return headers
+
+
+def store_crawl_file(
+    url: str,
+    spider_name: Optional[str],
+    status: CrawlFileStatus = CrawlFileStatus.downloaded,
+    size: Optional[int] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    content_hash: Optional[str] = None,
+) -> bool:
+    record = {
+        "url": url,
+        "spider_name": spider_name,
+        "size": size,
+        "etag": etag,
+        "last_modified": last_modified,
+        "content_hash": content_hash,
+        "status": status.value,
+    }
+
+    try:
+        upsert_records(CrawlFile, [record], update_fields=CRAWL_FILE_FIELDS)
+    except Exception as e:
+        logger.error("Could not store crawl index for {}: {}".format(url, e))
+        return False
+
+    return True
+
+
+def mark_crawl_files_ingested(urls: Iterable[str]) -> bool:
+    urls = list(set(urls))
+
+    if not urls:
+        return False
+
+    session = SessionLocal()
+
+    try:
+        session.query(CrawlFile).filter(CrawlFile.url.in_(urls)).update(
+            {"status": CrawlFileStatus.ingested.value}, synchronize_session=False
+        )
+        session.commit()
+    except Exception as e:
+        logger.error("Could not mark crawl files ingested: {}".format(e))
+        return False
+    finally:
+        session.close()
+
+    return True
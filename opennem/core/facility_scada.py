@@ -0,0 +1,192 @@
+"""
+    Facility scada bounds and high-water marks for incremental ingest
+
+    The first and last interval stored for each facility are kept in
+    `facility_scada_bounds` which is updated whenever facility scada is
+    written so that scada ranges and first seen facilities are looked up
+    without scanning `facility_scada`.
+
+    Live crawls re-download files that are mostly intervals that are already
+    stored. The latest stored trading interval for a network is looked up (and
+    cached) and records older than it less a revision window are skipped so
+    only the intervals that can still change are written. Sources that are the
+    only writer of a field look up the latest interval with that field set.
+
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cachetools import TTLCache
+from psycopg2.extras import execute_values
+from sqlalchemy import func
+
+from opennem.api.stats.cache import invalidate_stats_cache_for_records
+from opennem.api.stats.controllers import extend_scada_range_for_records
+from opennem.db import SessionLocal, get_database_engine
+from opennem.db.models.opennem import FacilityScada, FacilityScadaBounds
+from opennem.schema.network import NetworkSchema
+from opennem.settings import settings
+
+logger = logging.getLogger(__name__)
+
+high_water_cache: TTLCache = TTLCache(maxsize=20, ttl=settings.cache_scada_values_ttl_sec)
+
+FACILITY_SCADA_BOUNDS_QUERY = """
+    INSERT INTO facility_scada_bounds (network_id, facility_code, first_seen, last_seen)
+    VALUES %s
+    ON CONFLICT (network_id, facility_code) DO UPDATE set
+        first_seen = least(facility_scada_bounds.first_seen, EXCLUDED.first_seen),
+        last_seen = greatest(facility_scada_bounds.last_seen, EXCLUDED.last_seen),
+        updated_at = now()
+"""
+
+
+def get_facility_scada_bounds(
+    records: Iterable[Dict], interval_field: str = "trading_interval"
+) -> List[Tuple[str, str, datetime, datetime]]:
+    """
+    Get the (network, facility, first interval, last interval) bounds of a
+    set of facility scada records. Forecasts are left out
+    """
+    bounds: Dict[Tuple[str, str], List[datetime]] = {}
+
+    for record in records:
+        network_code = record.get("network_id")
+        facility_code = record.get("facility_code")
+        interval = record.get(interval_field)
+
+        if not network_code or not facility_code or not isinstance(interval, datetime):
+            continue
+
+        if record.get("is_forecast"):
+            continue
+
+        facility_bounds = bounds.get((network_code, facility_code))
+
+        if not facility_bounds:
+            bounds[(network_code, facility_code)] = [interval, interval]
+        elif interval < facility_bounds[0]:
+            facility_bounds[0] = interval
+        elif interval > facility_bounds[1]:
+            facility_bounds[1] = interval
+
+    return [(n, f, first, last) for (n, f), (first, last) in bounds.items()]
+
+
+def update_facility_scada_bounds(
+    records: Iterable[Dict], interval_field: str = "trading_interval"
+) -> int:
+    """
+    Widen the stored bounds to cover a set of written facility scada
+    records. Returns the number of facilities updated
+    """
+    bounds = get_facility_scada_bounds(records, interval_field=interval_field)
+
+    if not bounds:
+        return 0
+
+    conn = get_database_engine().raw_connection()
+
+    try:
+        cursor = conn.cursor()
+        execute_values(cursor, FACILITY_SCADA_BOUNDS_QUERY, bounds)
+        conn.commit()
+    except Exception as e:
+        logger.error("Could not update facility scada bounds: {}".format(e))
+        conn.rollback()
+        return 0
+    finally:
+        conn.close()
+
+    return len(bounds)
+
+
+def facility_scada_stored(records: List[Dict], interval_field: str = "trading_interval") -> None:
+    """
+    Called once facility scada records are written. Updates the bounds,
+    extends the cached scada ranges and drops the stats responses for the
+    networks written
+    """
+    update_facility_scada_bounds(records, interval_field=interval_field)
+    extend_scada_range_for_records(records, interval_field=interval_field)
+    invalidate_stats_cache_for_records(records, interval_field=interval_field)
+
+
+def get_scada_high_water_mark(
+    network: NetworkSchema, field: Optional[str] = None
+) -> Optional[datetime]:
+    """
+    Get the latest stored trading interval for a network. With a field it's
+    the latest interval where that field is set, since other sources can
+    write later intervals without it. Cached for
+    `settings.cache_scada_values_ttl_sec`
+    """
+    cache_key = (network.code, field)
+
+    if cache_key in high_water_cache:
+        return high_water_cache[cache_key]
+
+    session = SessionLocal()
+
+    try:
+        if field:
+            high_water_mark = (
+                session.query(func.max(FacilityScada.trading_interval))
+                .filter(FacilityScada.network_id == network.code)
+                .filter(FacilityScada.is_forecast.is_(False))
+                .filter(getattr(FacilityScada, field).isnot(None))
+                .scalar()
+            )
+        else:
+            high_water_mark = (
+                session.query(func.max(FacilityScadaBounds.last_seen))
+                .filter(FacilityScadaBounds.network_id == network.code)
+                .scalar()
+            )
+    except Exception as e:
+        logger.error("Could not get scada high water mark for {}: {}".format(network.code, e))
+        return None
+    finally:
+        session.close()
+
+    high_water_cache[cache_key] = high_water_mark
+
+    return high_water_mark
+
+
+def get_revision_cutoff(
+    network: NetworkSchema, revision_window: Optional[int] = None, field: Optional[str] = None
+) -> Optional[datetime]:
+    """
+    Records with trading intervals before the cutoff are already stored and
+    won't be revised. The window is in minutes and defaults to
+    `settings.scada_revision_window_min`. The field is passed to
+    `get_scada_high_water_mark`
+    """
+    if revision_window is None:
+        revision_window = settings.scada_revision_window_min
+
+    high_water_mark = get_scada_high_water_mark(network, field=field)
+
+    if not high_water_mark:
+        return None
+
+    return high_water_mark - timedelta(minutes=revision_window)
+
+
+def filter_revision_window(
+    records: List[Dict], cutoff: Optional[datetime], interval_field: str = "trading_interval"
+) -> Tuple[List[Dict], int]:
+    """
+    Filter out records older than the cutoff. Returns the records to write
+    and the number skipped
+    """
+    if not cutoff:
+        return records, 0
+
+    records_filtered = [
+        r for r in records if not r[interval_field] or r[interval_field] >= cutoff
+    ]
+
+    return records_filtered, len(records) - len(records_filtered)
@@ -1,8 +1,10 @@
 import re
 from decimal import Decimal
-from typing import Optional, Union
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 from opennem.core.station_names import station_map_name
+from opennem.utils.numbers import float_to_str
 
 __id_unit_regex = re.compile(r"^(Y|C)[0-9]{1,3}")
 
@@ -128,6 +130,27 @@ ACRONYMS = [
 ]
 
 
+STRIP_WORDS_SET = frozenset(STRIP_WORDS)
+
+ACRONYMS_SET = frozenset(ACRONYMS)
+
+# Multi word strip words are removed from the whole name in one pass. The
+# alternation keeps the STRIP_WORDS order so the first listed word wins where
+# two overlap
+__strip_phrases_regex = re.compile("|".join(re.escape(w) for w in STRIP_WORDS if " " in w))
+
+__units_regex = re.compile(r"\d+\ ?(mw|kw|MW|KW)")
+__name_chars_regex = re.compile(r",|-|\(|\)|\–|\"|\'")
+__component_chars_regex = re.compile(r",|-|\(|\)|\–")
+__multiple_spaces_regex = re.compile(" +")
+__todae_regex = re.compile(r"^(Todae)\ (.*)")
+
+__whitespace_regex = re.compile(r"\s+")
+__multiple_whitespace_regex = re.compile(r"\s{2,}")
+
+# size of the memo over station_name_cleaner. Imports see a few thousand names
+STATION_NAME_CACHE_SIZE = 4096
+
 __is_number = re.compile(r"^[\d\.]+$")
 __is_single_number = re.compile(r"^\d$")
 
@@ -135,11 +158,11 @@ __is_single_number = re.compile(r"^\d$")
 
 
 def strip_whitespace(subject: str) -> str:
-    return str(re.sub(r"\s+", "", subject.strip()))
+    return str(__whitespace_regex.sub("", subject.strip()))
 
 
 def normalize_whitespace(subject: str) -> str:
-    return str(re.sub(r"\s{2,}", " ", subject.strip()))
+    return str(__multiple_whitespace_regex.sub(" ", subject.strip()))
 
 
 def is_number(value: Union[str, int]) -> bool:
@@ -148,14 +171,14 @@ def is_number(value: Union[str, int]) -> bool:
 
     value = str(value).strip()
 
-    if re.match(__is_number, value):
+    if __is_number.match(value):
         return True
 
     return False
 
 
 def is_single_number(value: Union[str, int]) -> bool:
-    if re.match(__is_single_number, value):
+    if __is_single_number.match(value):
         return True
     return False
 
@@ -207,7 +230,7 @@ def name_normalizer(name: str) -> str:
     if name and type(name) is str:
         name_normalized = name.strip()
 
-    name_normalized = re.sub(r"\-", "", name_normalized)
+    name_normalized = name_normalized.replace("-", "")
 
     return str(name_normalized)
 
@@ -260,6 +283,58 @@ def clean_float(number: Union[str, int, float]) -> Optional[float]:
     return None
 
 
+# blanks and placeholders used for missing values in AEMO and WEM files
+FLOAT_NULL_VALUES = frozenset(["", "-", "NULL", "null", "N/A"])
+
+
+def clean_float_column(
+    values: Sequence[Any], as_str: bool = False
+) -> List[Optional[Union[float, str]]]:
+    """
+    Clean a column of values into floats. Each unique value is converted once,
+    blanks and null placeholders become None and anything else that isn't a
+    number raises a ValueError
+
+    With as_str non-zero values are formatted with `float_to_str` like the
+    row generators do for CSV. Leave it off to hand native floats to the
+    binary COPY encoder
+    """
+    value_lookup: Dict[Any, Optional[Union[float, str]]] = {}
+    cleaned: List[Optional[Union[float, str]]] = []
+
+    for value in values:
+        try:
+            cleaned.append(value_lookup[value])
+            continue
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable values aren't numbers
+            raise ValueError("Invalid float value: {}".format(value))
+
+        number: Optional[Union[float, str]] = None
+
+        if isinstance(value, str):
+            value_clean = value.strip()
+
+            if value_clean not in FLOAT_NULL_VALUES:
+                try:
+                    number = float(value_clean)
+                except ValueError:
+                    raise ValueError("Invalid float value: {}".format(value))
+
+        elif isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            number = float(value)
+
+        if as_str and number:
+            number = float_to_str(number)  # type: ignore
+
+        value_lookup[value] = number
+        cleaned.append(number)
+
+    return cleaned
+
+
 def clean_numbers(part: Union[str, int]) -> Union[str, int, None]:
     """
     Clean the number part of a station name
@@ -283,8 +358,15 @@ def station_name_cleaner(facility_name: str) -> str:
 
     It's a bit of a mess and could use a refactor
 
-
+    String names are memoized since imports clean the same names row after row
     """
+    if type(facility_name) is str:
+        return _station_name_cleaner_cached(facility_name)
+
+    return _station_name_cleaner(facility_name)
+
+
+def _station_name_cleaner(facility_name: str) -> str:
     name_clean = facility_name or ""
 
     if type(facility_name) is str:
@@ -299,29 +381,26 @@ def station_name_cleaner(facility_name: str) -> str:
     # @TODO replace with the re character stripped - this is unicode junk
     name_clean = name_clean.replace("\u00a0", " ")
 
-    if station_map_name(name_clean) != name_clean:
-        return station_map_name(name_clean)
+    name_mapped = station_map_name(name_clean)
+
+    if name_mapped != name_clean:
+        return name_mapped
 
     # strip units from name
-    name_clean = re.sub(r"\d+\ ?(mw|kw|MW|KW)", "", name_clean)
+    name_clean = __units_regex.sub("", name_clean)
 
     # strip other chars
-    name_clean = re.sub(r",|-|\(|\)|\–|\"|\'", "", name_clean)
+    name_clean = __name_chars_regex.sub("", name_clean)
     # name_clean = re.sub(r"(\W|\ )+", "", name_clean)
 
-    name_clean = re.sub(" +", " ", name_clean)
+    name_clean = __multiple_spaces_regex.sub(" ", name_clean)
 
     name_clean = name_clean.replace("yalumba winery", "yalumba")
     name_clean = name_clean.replace("university of melbourne", "uom")
 
     # @TODO remove these hard codes
     if name_clean not in ["barcaldine solar farm", "Darling Downs Solar Farm"]:
-        for w in STRIP_WORDS:
-            if name_clean.startswith("todae solar") and w in ["solar"]:
-                continue
-
-            if " " in w:
-                name_clean = name_clean.replace(w, "")
+        name_clean = __strip_phrases_regex.sub("", name_clean)
 
     name_components = [str(i) for i in name_clean.strip().split(" ")]
     name_components_parsed = []
@@ -333,7 +412,7 @@ def station_name_cleaner(facility_name: str) -> str:
             continue
 
         comp = comp.strip()
-        comp = re.sub(r",|-|\(|\)|\–", "", comp)
+        comp = __component_chars_regex.sub("", comp)
 
         if type(comp) is not str:
             comp = None
@@ -341,21 +420,21 @@ def station_name_cleaner(facility_name: str) -> str:
         if comp == "":
             comp = None
 
-        if comp in STRIP_WORDS:
+        if comp in STRIP_WORDS_SET:
             comp = None
 
-        if comp in ACRONYMS:
-            comp = comp.upper()
+        if comp in ACRONYMS_SET:
+            comp = comp.upper()  # type: ignore
         elif type(comp) is str and comp.startswith("mc"):
             comp = "Mc" + comp[2:].capitalize()
         elif type(comp) is str and comp != "":
             comp = comp.capitalize()
 
         # strip numbers greater than 5
-        comp_clean = clean_numbers(comp)
+        comp_clean = clean_numbers(comp)  # type: ignore
 
         if comp_clean:
-            comp = comp_clean
+            comp = comp_clean  # type: ignore
 
         name_components_parsed.append(comp)
 
@@ -364,21 +443,23 @@ def station_name_cleaner(facility_name: str) -> str:
 
     name_clean = " ".join([str(i) for i in name_components_parsed if i is not None])
 
-    name_clean = re.sub(" +", " ", name_clean)
+    name_clean = __multiple_spaces_regex.sub(" ", name_clean)
 
     name_clean = name_clean.strip()
 
     if "/" in name_clean:
         name_clean = " / ".join([i.strip().title() for i in name_clean.split("/")])
 
-    if station_map_name(name_clean) != name_clean:
-        return station_map_name(name_clean)
+    name_mapped = station_map_name(name_clean)
+
+    if name_mapped != name_clean:
+        return name_mapped
 
     # uom special case
     name_clean = name_clean.replace("UOM ", "UoM ")
 
     # todae special case
-    todae_match = re.match(r"^(Todae)\ (.*)", name_clean)
+    todae_match = __todae_regex.match(name_clean)
     if todae_match:
         todae_name, todae_rest = todae_match.groups()
 
@@ -387,12 +468,15 @@ def station_name_cleaner(facility_name: str) -> str:
     return name_clean
 
 
+_station_name_cleaner_cached = lru_cache(maxsize=STATION_NAME_CACHE_SIZE)(_station_name_cleaner)
+
+
 def participant_name_filter(participant_name: str) -> Optional[str]:
     participant_name = strip_whitespace(participant_name)
 
     _p = participant_name.strip().replace("Pty Ltd", "").replace("Ltd", "").replace("/", " / ")
 
-    _p = re.sub(" +", " ", _p).strip()
+    _p = __multiple_spaces_regex.sub(" ", _p).strip()
 
     _p = _p.strip()
 
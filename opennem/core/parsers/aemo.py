@@ -5,14 +5,24 @@
 """
 
 import csv
+import io
 import logging
-from typing import Any, Dict, List, Optional, Union
+import zipfile
+from typing import IO, Any, Dict, Generator, Iterable, List, Optional, Sequence, Tuple, Union
 
 from pydantic import BaseModel, validator
-from pydantic.error_wrappers import ValidationError
 from pydantic.fields import PrivateAttr
 
 from opennem.schema.aemo.mms import get_mms_schema_for_table
+from opennem.schema.aemo.validator import AEMORecordValidator
+from opennem.utils.archive import stream_zip_members
+
+try:
+    import numpy
+
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +35,8 @@ class AEMOTableSchema(BaseModel):
     records: List[Union[Dict, BaseModel]] = []
 
     # optionally it has a schema
-    _record_schema: Optional[BaseModel] = PrivateAttr()
+    _record_schema: Optional[BaseModel] = PrivateAttr(default=None)
+    _record_validator: Optional[AEMORecordValidator] = PrivateAttr(default=None)
 
     # the url this table was taken from if any
     url_source: Optional[str]
@@ -61,6 +72,7 @@ class AEMOTableSchema(BaseModel):
 
     def set_schema(self, schema: BaseModel) -> bool:
         self._record_schema = schema
+        self._record_validator = AEMORecordValidator(schema)  # type: ignore
 
         return True
 
@@ -68,61 +80,66 @@ class AEMOTableSchema(BaseModel):
         return self.records
 
     def add_record(self, record: Union[Dict, BaseModel]) -> bool:
-        if self._record_schema:
-            _record = None
+        return self.add_records([record]) == 1
 
-            try:
-                _record = self._record_schema(**record)  # type: ignore
-            except ValidationError as e:
-                val_errors = e.errors()
+    def add_records(self, records: List[Union[Dict, BaseModel]]) -> int:
+        """
+        Add records validating them against the schema if the table has one.
+        Invalid records are counted by the validator and skipped. Returns the
+        number of records added
+        """
+        if not self._record_schema:
+            self.records += records
+            return len(records)
 
-                for ve in val_errors:
-                    ve_fieldname = ve["loc"][0]
-                    ve_val = ""
+        _records = self._record_validator.validate(records)  # type: ignore
 
-                    if (
-                        record
-                        and isinstance(record, dict)
-                        and ve_fieldname in record
-                    ):
-                        ve_val = record[ve_fieldname]
-
-                    logger.error(
-                        "{} has error: {} '{}'".format(
-                            ve_fieldname, ve["msg"], ve_val
-                        )
-                    )
-                return False
+        self.records += _records
 
-            self.records.append(_record)
-        else:
-            self.records.append(record)
+        return len(_records)
 
-        return True
+    def log_errors(self) -> None:
+        """Log the aggregate validation errors for the table"""
+        if self._record_schema:
+            self._record_validator.log_errors(self.full_name)  # type: ignore
 
     class Config:
         underscore_attrs_are_private = True
 
 
 class AEMOTableSet(BaseModel):
+    """
+    Tables parsed from an AEMO CSV in source order, indexed on their full
+    name. Repeated sections of a table are merged into the first one
+    """
+
     tables: List[AEMOTableSchema] = []
 
-    def has_table(self, table_name: str) -> bool:
-        if not self.tables:
-            return False
+    _table_index: Dict[str, AEMOTableSchema] = PrivateAttr(default_factory=dict)
 
-        if len(self.tables) < 1:
-            return False
+    def __init__(self, **data: Any) -> None:
+        super().__init__(**data)
 
-        table_name = table_name.upper()
+        tables = self.tables
+        self.tables = []
 
-        table_lookup = list(
-            filter(lambda t: t.full_name == table_name, self.tables)
-        )
+        for table in tables:
+            self.add_table(table)
 
-        return len(table_lookup) > 0
+    def has_table(self, table_name: str) -> bool:
+        return table_name.upper() in self._table_index
 
     def add_table(self, table: AEMOTableSchema) -> bool:
+        table_existing = self._table_index.get(table.full_name)
+
+        if table_existing is table:
+            return True
+
+        if table_existing:
+            table_existing.records += table.records
+            return True
+
+        self._table_index[table.full_name] = table
         self.tables.append(table)
 
         return True
@@ -130,22 +147,114 @@ class AEMOTableSet(BaseModel):
     def get_table(self, table_name: str) -> AEMOTableSchema:
         table_name = table_name.upper()
 
-        if not self.has_table(table_name):
+        table = self._table_index.get(table_name)
+
+        if not table:
             raise Exception("Table not found: {}".format(table_name))
 
-        table_lookup = list(
-            filter(lambda t: t.full_name == table_name, self.tables)
-        )
+        return table
+
+    def iter_tables(self) -> Generator[AEMOTableSchema, None, None]:
+        """Iterate the tables in the order they appear in the source"""
+        for table in self.tables:
+            yield table
+
+    @property
+    def table_names(self) -> List[str]:
+        return [t.full_name for t in self.tables]
 
-        return table_lookup.pop()
+    class Config:
+        underscore_attrs_are_private = True
 
 
 class AEMOParserException(Exception):
     pass
 
 
+class AEMOColumnarRecords(object):
+    """
+    Columnar store for AEMO table records. Fieldnames are stored once and
+    values are held as one list per field rather than a dict per row.
+
+    Iterating yields dict rows so it can be passed anywhere a list of
+    record dicts is expected, while processors that know about it can
+    work on whole columns at a time.
+    """
+
+    __slots__ = ("fieldnames", "columns", "_field_index")
+
+    def __init__(self, fieldnames: Sequence[str]) -> None:
+        self.fieldnames: List[str] = list(fieldnames)
+        self.columns: List[List[Any]] = [[] for _ in self.fieldnames]
+        self._field_index: Dict[str, int] = {f: i for i, f in enumerate(self.fieldnames)}
+
+    def __len__(self) -> int:
+        if not self.columns:
+            return 0
+
+        return len(self.columns[0])
+
+    def __iter__(self) -> Generator[Dict, None, None]:
+        for values in zip(*self.columns):
+            yield dict(zip(self.fieldnames, values))
+
+    def __iadd__(self, other: Iterable[Dict]) -> "AEMOColumnarRecords":
+        self.extend(other)
+        return self
+
+    def append(self, values: Sequence[Any]) -> None:
+        for column, value in zip(self.columns, values):
+            column.append(value)
+
+    def extend(self, other: Iterable[Dict]) -> None:
+        if isinstance(other, AEMOColumnarRecords) and other.fieldnames == self.fieldnames:
+            for column, other_column in zip(self.columns, other.columns):
+                column.extend(other_column)
+            return
+
+        for record in other:
+            self.append([record.get(f) for f in self.fieldnames])
+
+    def has_column(self, fieldname: str) -> bool:
+        return fieldname in self._field_index
+
+    def column(self, fieldname: str) -> List[Any]:
+        if fieldname not in self._field_index:
+            raise AEMOParserException("No such column: {}".format(fieldname))
+
+        return self.columns[self._field_index[fieldname]]
+
+    def set_column(self, fieldname: str, values: List[Any]) -> None:
+        if len(values) != len(self):
+            raise AEMOParserException("Column length mismatch for {}".format(fieldname))
+
+        if fieldname not in self._field_index:
+            self._field_index[fieldname] = len(self.fieldnames)
+            self.fieldnames.append(fieldname)
+            self.columns.append(values)
+            return
+
+        self.columns[self._field_index[fieldname]] = values
+
+    def to_records(self) -> List[Dict]:
+        return list(self)
+
+    def to_numpy(self, fieldname: str, dtype: Optional[Any] = None) -> Any:
+        """Return a column as a numpy array. Requires numpy"""
+        if not HAVE_NUMPY:
+            raise AEMOParserException("Columnar arrays require the numpy library")
+
+        return numpy.asarray(self.column(fieldname), dtype=dtype)
+
+
 AEMO_ROW_HEADER_TYPES = ["C", "I", "D"]
 
+# default number of records yielded per batch by the streaming parser
+AEMO_PARSER_BATCH_SIZE = 10000
+
+# (table_name, fieldnames, records)
+AEMOTableBatch = Tuple[str, List[str], Union[List[Dict], AEMOColumnarRecords]]
+
 
 def parse_aemo_csv(content: str) -> AEMOTableSet:
     """
@@ -161,6 +270,16 @@ def parse_aemo_csv(content: str) -> AEMOTableSet:
     table_set = AEMOTableSet()
     table_current = None
 
+    # records are validated a table at a time
+    table_records: List[Dict] = []
+
+    def _add_table(table: AEMOTableSchema) -> None:
+        table.add_records(table_records)
+        table.log_errors()
+        table_records.clear()
+
+        table_set.add_table(table)
+
     for row in datacsv:
         if not row or type(row) is not list or len(row) < 1:
             continue
@@ -175,12 +294,12 @@ def parse_aemo_csv(content: str) -> AEMOTableSet:
         if record_type == "C":
             # @TODO csv meta stored in table
             if table_current:
-                table_set.add_table(table_current)
+                _add_table(table_current)
 
         # new table
         elif record_type == "I":
             if table_current:
-                table_set.add_table(table_current)
+                _add_table(table_current)
 
             table_namespace = row[1]
             table_name = row[2]
@@ -215,8 +334,130 @@ def parse_aemo_csv(content: str) -> AEMOTableSet:
                 )
                 continue
 
-            record = dict(zip(table_current.fieldnames, values))
-
-            table_current.add_record(record)
+            table_records.append(dict(zip(table_current.fieldnames, values)))
 
     return table_set
+
+
+def parse_aemo_csv_stream(
+    file_handle: Union[IO[bytes], IO[str]],
+    batch_size: int = AEMO_PARSER_BATCH_SIZE,
+    encoding: str = "utf-8-sig",
+    columnar: bool = False,
+) -> Generator[AEMOTableBatch, None, None]:
+    """
+    Streaming version of the AEMO CSV parser.
+
+    Reads from a binary (or text) file handle, decodes incrementally and
+    yields `(table_name, fieldnames, records)` batches of at most `batch_size`
+    records so that large archives can be processed with bounded memory.
+
+    A table that spans multiple batches or sections is yielded multiple times
+    under the same table name.
+
+    If `columnar` is set the records in each batch are an `AEMOColumnarRecords`
+    instead of a list of dicts.
+    """
+    if batch_size < 1:
+        raise AEMOParserException("Batch size must be at least 1")
+
+    text_handle: IO[str]
+    wrapped = False
+
+    if isinstance(file_handle, io.TextIOBase):
+        text_handle = file_handle
+    else:
+        text_handle = io.TextIOWrapper(
+            file_handle, encoding=encoding, errors="replace", newline=""  # type: ignore
+        )
+        wrapped = True
+
+    table_name: Optional[str] = None
+    fieldnames: List[str] = []
+    batch: Union[List[Dict], AEMOColumnarRecords] = []
+
+    def _new_batch() -> Union[List[Dict], AEMOColumnarRecords]:
+        if columnar:
+            return AEMOColumnarRecords(fieldnames)
+        return []
+
+    try:
+        for row in csv.reader(text_handle):
+            if not row:
+                continue
+
+            record_type = row[0].strip().upper()
+
+            if record_type not in AEMO_ROW_HEADER_TYPES:
+                logger.info("Skipping row, invalid type: {}".format(record_type))
+                continue
+
+            # new table set or new table. flush what we have
+            if record_type in ["C", "I"]:
+                if table_name and batch:
+                    yield table_name, fieldnames, batch
+
+                batch = []
+
+                if record_type == "C":
+                    table_name = None
+                    continue
+
+                table_name = "{}_{}".format(row[1].strip().upper(), row[2].strip().upper())
+                fieldnames = [i.strip() for i in row[4:]]
+                batch = _new_batch()
+
+            # new record
+            elif record_type == "D":
+                if not table_name:
+                    logger.error("Malformed AEMO csv - field records before table definition")
+                    continue
+
+                values = row[4:]
+
+                if len(values) != len(fieldnames):
+                    logger.error(
+                        "Malformed AEMO csv - length mismatch between records and fields"
+                    )
+                    continue
+
+                if columnar:
+                    batch.append(values)  # type: ignore
+                else:
+                    batch.append(dict(zip(fieldnames, values)))  # type: ignore
+
+                if len(batch) >= batch_size:
+                    yield table_name, fieldnames, batch
+                    batch = _new_batch()
+
+        if table_name and batch:
+            yield table_name, fieldnames, batch
+
+    finally:
+        # don't close the underlying handle, it's owned by the caller
+        if wrapped:
+            text_handle.detach()  # type: ignore
+
+
+def parse_aemo_file_stream(
+    file_handle: IO[bytes],
+    batch_size: int = AEMO_PARSER_BATCH_SIZE,
+    encoding: str = "utf-8-sig",
+    columnar: bool = False,
+) -> Generator[AEMOTableBatch, None, None]:
+    """
+    Parse an AEMO CSV file or a zip of them with `parse_aemo_csv_stream`. Zip
+    members, including those in embedded zips, are parsed one at a time as
+    their own text stream. The handle must be seekable
+    """
+    is_zip = zipfile.is_zipfile(file_handle)
+    file_handle.seek(0)
+
+    if not is_zip:
+        yield from parse_aemo_csv_stream(
+            file_handle, batch_size=batch_size, encoding=encoding, columnar=columnar
+        )
+        return
+
+    for _, member_stream in stream_zip_members(file_handle, encoding=encoding):
+        yield from parse_aemo_csv_stream(member_stream, batch_size=batch_size, columnar=columnar)
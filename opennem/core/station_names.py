@@ -1,7 +1,21 @@
+import re
+
 from opennem.core.loader import load_data
 
 STATION_NAME_MAP = load_data("station_name_maps.json")
 
+# lower cased map names matched as a prefix in map order. The first map name
+# wins when two lower case to the same name
+STATION_NAME_PREFIX_MAP = {}
+
+if type(STATION_NAME_MAP) is dict:
+    for _map_name, _mapped_name in STATION_NAME_MAP.items():
+        STATION_NAME_PREFIX_MAP.setdefault(_map_name.lower(), _mapped_name)
+
+__station_name_prefix_regex = re.compile(
+    "|".join(re.escape(map_name) for map_name in STATION_NAME_PREFIX_MAP.keys())
+)
+
 
 def station_map_name(station_name):
     """
@@ -17,8 +31,12 @@ def station_map_name(station_name):
     if station_name in STATION_NAME_MAP:
         return STATION_NAME_MAP[station_name]
 
-    for map_name in STATION_NAME_MAP.keys():
-        if station_name.lower().startswith(map_name.lower()):
-            return STATION_NAME_MAP[map_name]
+    if not STATION_NAME_PREFIX_MAP:
+        return station_name
+
+    prefix_match = __station_name_prefix_regex.match(station_name.lower())
+
+    if prefix_match:
+        return STATION_NAME_PREFIX_MAP[prefix_match.group(0)]
 
     return station_name
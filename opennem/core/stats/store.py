@@ -3,44 +3,24 @@ Methods to store and persist stats in the database or to JSON
 """
 import logging
 
-from sqlalchemy.dialects.postgresql import insert
-
 from opennem.core.loader import get_data_path
 from opennem.core.parsers.cpi import stat_au_cpi
-from opennem.db import SessionLocal, get_database_engine
 from opennem.db.models.opennem import Stats
+from opennem.db.upsert import upsert_records
 from opennem.schema.stats import StatsSet
 
 logger = logging.getLogger("opennem.stats.store")
 
 
 def store_stats_database(statset: StatsSet) -> int:
-    s = SessionLocal()
-
     records_to_store = [i.dict() for i in statset.stats]
 
-    stmt = insert(Stats).values(records_to_store)
-    stmt.bind = get_database_engine()
-    stmt = stmt.on_conflict_do_update(
-        index_elements=[
-            "stat_date",
-            "country",
-            "stat_type",
-        ],
-        set_={
-            "value": stmt.excluded.value,
-        },
-    )
-
     try:
-        s.execute(stmt)
-        s.commit()
+        upsert_records(Stats, records_to_store, update_fields=["value"])
     except Exception as e:
         logger.error("Error inserting records")
         logger.error(e)
         return 0
-    finally:
-        s.close()
 
     num_records = len(records_to_store)
 
@@ -1,11 +1,13 @@
+import asyncio
 import logging
-from typing import Generator
+from typing import Generator, List, Mapping, Optional
 
 from databases import Database
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.engine.base import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql.base import Executable
 
 from opennem.exporter.encoders import opennem_deserialize, opennem_serialize
 from opennem.settings import settings
@@ -15,18 +17,67 @@ DeclarativeBase = declarative_base()
 logger = logging.getLogger(__name__)
 
 
-database = Database(settings.db_url)
+# async connections for the api. Statements are prepared by asyncpg and
+# cached on each pooled connection
+database = Database(
+    settings.db_url,
+    min_size=settings.db_async_pool_min,
+    max_size=settings.db_async_pool_max,
+)
+
+SESSION_TIMEZONE_OPTION = "session_timezone"
+
+SESSION_TIMEZONE_QUERY = text("select set_config('TimeZone', :timezone, true)")
+
+_database_connect_lock: Optional[asyncio.Lock] = None
 
 
 # Methods
 
 
 async def db_connect_async() -> None:
-    await database.connect()
+    """Connect the async database. Does nothing if it's already connected"""
+    global _database_connect_lock
+
+    if database.is_connected:
+        return None
+
+    if _database_connect_lock is None:
+        _database_connect_lock = asyncio.Lock()
+
+    async with _database_connect_lock:
+        if not database.is_connected:
+            await database.connect()
 
 
 async def db_disconnect() -> None:
-    await database.disconnect()
+    if database.is_connected:
+        await database.disconnect()
+
+
+def with_session_timezone(query: Executable, timezone: str) -> Executable:
+    """
+    Run a query in a session timezone. Queries that bucket on the session
+    timezone carry it rather than a SET statement so they can be prepared
+    """
+    return query.execution_options(**{SESSION_TIMEZONE_OPTION: timezone})
+
+
+async def fetch_all_async(query: Executable) -> List[Mapping]:
+    """
+    Run a query on the async database. Queries with a session timezone run
+    in a transaction with the timezone set local to it
+    """
+    await db_connect_async()
+
+    timezone = query.get_execution_options().get(SESSION_TIMEZONE_OPTION)
+
+    if not timezone:
+        return await database.fetch_all(query)
+
+    async with database.transaction():
+        await database.execute(SESSION_TIMEZONE_QUERY.bindparams(timezone=timezone))
+        return await database.fetch_all(query)
 
 
 def db_connect(
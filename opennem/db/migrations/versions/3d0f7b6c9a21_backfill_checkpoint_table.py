@@ -0,0 +1,39 @@
+# pylint: disable=no-member
+"""
+Backfill checkpoint table
+
+Revision ID: 3d0f7b6c9a21
+Revises: fcb509301bda
+Create Date: 2021-02-08 11:24:51.409127
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3d0f7b6c9a21"
+down_revision = "fcb509301bda"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "backfill_checkpoint",
+        sa.Column("created_by", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("table_name", sa.Text(), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("num_records", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("table_name", "month"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("backfill_checkpoint")
@@ -0,0 +1,47 @@
+# pylint: disable=no-member
+"""
+Crawl file table
+
+Revision ID: 8b2e4a1f6d53
+Revises: 3d0f7b6c9a21
+Create Date: 2021-02-09 09:52:17.211046
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8b2e4a1f6d53"
+down_revision = "3d0f7b6c9a21"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "crawl_file",
+        sa.Column("created_by", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("spider_name", sa.Text(), nullable=True),
+        sa.Column("size", sa.Integer(), nullable=True),
+        sa.Column("etag", sa.Text(), nullable=True),
+        sa.Column("last_modified", sa.Text(), nullable=True),
+        sa.Column("content_hash", sa.Text(), nullable=True),
+        sa.Column("status", sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint("url"),
+    )
+    op.create_index(
+        op.f("ix_crawl_file_spider_name"), "crawl_file", ["spider_name"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_crawl_file_spider_name"), table_name="crawl_file")
+    op.drop_table("crawl_file")
@@ -0,0 +1,60 @@
+# pylint: disable=no-member
+"""
+Facility scada bounds table
+
+Revision ID: c5e2a9d4f1b8
+Revises: 8b2e4a1f6d53
+Create Date: 2021-02-11 10:14:36.528904
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c5e2a9d4f1b8"
+down_revision = "8b2e4a1f6d53"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "facility_scada_bounds",
+        sa.Column("created_by", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("network_id", sa.Text(), nullable=False),
+        sa.Column("facility_code", sa.Text(), nullable=False),
+        sa.Column("first_seen", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("last_seen", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["network_id"],
+            ["network.code"],
+            name="fk_facility_scada_bounds_network_code",
+        ),
+        sa.PrimaryKeyConstraint("network_id", "facility_code"),
+    )
+
+    # seed from the existing scada, this is the last full scan that's needed
+    op.execute(
+        """
+        insert into facility_scada_bounds (network_id, facility_code, first_seen, last_seen)
+        select
+            network_id,
+            facility_code,
+            min(trading_interval),
+            max(trading_interval)
+        from facility_scada
+        where is_forecast is False
+        group by 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("facility_scada_bounds")
@@ -754,3 +754,56 @@ class BalancingSummary(Base, BaseModel):
     demand_total = Column(Numeric, nullable=True)
     price = Column(Numeric, nullable=True)
     is_forecast = Column(Boolean, default=False)
+
+
+class BackfillCheckpoint(Base, BaseModel):
+    """
+    Archive table months that have been backfilled
+
+    see opennem.importer.mms_backfill
+    """
+
+    __tablename__ = "backfill_checkpoint"
+
+    table_name = Column(Text, primary_key=True)
+    month = Column(Date, primary_key=True)
+    num_records = Column(Integer, nullable=True)
+
+
+class CrawlFile(Base, BaseModel):
+    """
+    Files downloaded by crawlers and whether they have been ingested
+
+    see opennem.core.crawl_index
+    """
+
+    __tablename__ = "crawl_file"
+
+    url = Column(Text, primary_key=True)
+    spider_name = Column(Text, nullable=True, index=True)
+    size = Column(Integer, nullable=True)
+    etag = Column(Text, nullable=True)
+    last_modified = Column(Text, nullable=True)
+    content_hash = Column(Text, nullable=True)
+    status = Column(Text, nullable=False)
+
+
+class FacilityScadaBounds(Base, BaseModel):
+    """
+    First and last interval in facility_scada for each facility. Forecasts
+    aren't included
+
+    see opennem.core.facility_scada
+    """
+
+    __tablename__ = "facility_scada_bounds"
+
+    network_id = Column(
+        Text,
+        ForeignKey("network.code", name="fk_facility_scada_bounds_network_code"),
+        primary_key=True,
+        nullable=False,
+    )
+    facility_code = Column(Text, primary_key=True, nullable=False)
+    first_seen = Column(TIMESTAMP(timezone=True), nullable=False)
+    last_seen = Column(TIMESTAMP(timezone=True), nullable=False)
@@ -0,0 +1,127 @@
+"""
+    Batched upserts
+
+    Inserts records with `INSERT ... VALUES ... ON CONFLICT` in pages of
+    `settings.upsert_batch_size` rows using psycopg2 `execute_values`. The
+    statement is built once so large record sets don't compile a bind parameter
+    per value like `insert(table).values(records)` does
+
+"""
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from psycopg2.extras import execute_values
+from sqlalchemy.sql.schema import Column
+
+from opennem.db import get_database_engine
+from opennem.settings import settings
+from opennem.utils.dedup import table_primary_keys
+
+logger = logging.getLogger(__name__)
+
+UPSERT_QUERY = """
+    INSERT INTO {table_name} ({column_names})
+    VALUES %s
+    ON CONFLICT {on_conflict}
+"""
+
+UPSERT_CONFLICT_UPDATE = """
+    ({pk_columns}) DO UPDATE set {update_values}
+"""
+
+
+def _get_column_name(column: Union[str, Column]) -> str:
+    if isinstance(column, Column):
+        return column.name
+
+    return column.strip()
+
+
+def get_upsert_columns(table: Any, records: List[Dict]) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Get the columns to insert in table order for the fields in the records along
+    with the python side scalar defaults for columns that the records don't set
+    which `insert` would otherwise fill in
+    """
+    record_field_names = set(records[0].keys())
+    column_names = []
+    column_defaults = {}
+
+    for column in table.__table__.columns.values():
+        if column.name in record_field_names:
+            column_names.append(column.name)
+        elif column.default is not None and column.default.is_scalar:
+            column_names.append(column.name)
+            column_defaults[column.name] = column.default.arg
+
+    for field_name in record_field_names:
+        if field_name not in table.__table__.columns:
+            raise Exception("Column name not found: {}".format(field_name))
+
+    return column_names, column_defaults
+
+
+def build_upsert_query(
+    table: Any,
+    column_names: Sequence[str],
+    update_fields: Optional[Sequence[Union[str, Column]]] = None,
+) -> str:
+    on_conflict = "DO NOTHING"
+
+    if update_fields:
+        update_col_names = [_get_column_name(c) for c in update_fields]
+
+        on_conflict = UPSERT_CONFLICT_UPDATE.format(
+            pk_columns=",".join(table_primary_keys(table)),
+            update_values=", ".join([f"{n} = EXCLUDED.{n}" for n in update_col_names]),
+        )
+
+    return UPSERT_QUERY.format(
+        table_name=table.__table__.name,
+        column_names=",".join(column_names),
+        on_conflict=on_conflict,
+    )
+
+
+def upsert_records(
+    table: Any,
+    records: List[Dict],
+    update_fields: Optional[Sequence[Union[str, Column]]] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """
+    Upsert a list of dict records into a table model updating update_fields on
+    primary key conflicts. All the records are written in one transaction.
+
+    Records should be de-duplicated on primary key first. Returns the
+    number of records
+    """
+    if not records:
+        return 0
+
+    if not batch_size:
+        batch_size = settings.upsert_batch_size
+
+    column_names, column_defaults = get_upsert_columns(table, records)
+    query = build_upsert_query(table, column_names, update_fields)
+
+    rows = (
+        tuple(
+            record[c] if c in record else column_defaults.get(c) for c in column_names
+        )
+        for record in records
+    )
+
+    conn = get_database_engine().raw_connection()
+
+    try:
+        cursor = conn.cursor()
+        execute_values(cursor, query, rows, page_size=batch_size)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return len(records)
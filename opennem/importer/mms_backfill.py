@@ -0,0 +1,211 @@
+"""
+    Backfill AEMO MMSDM archive tables in parallel
+
+    Each (table, month) archive is downloaded to a temporary file, streamed
+    through the nested zips and parsed a batch at a time by the table processors
+    with the records written using the bulk inserter. Archives are fanned out
+    across a process pool and each completed (table, month) is checkpointed in
+    `backfill_checkpoint` so a run can be resumed after a failure.
+
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime
+from tempfile import TemporaryFile
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from scrapy import Spider
+
+from opennem.db import SessionLocal, get_database_engine
+from opennem.db.models.opennem import BackfillCheckpoint
+from opennem.db.upsert import upsert_records
+from opennem.pipelines.bulk_insert import BulkInsertPipeline
+from opennem.pipelines.nem.opennem import process_table_stream
+from opennem.spiders.aemo.mms import MMS_URL
+from opennem.utils.dates import get_date_component, month_series
+from opennem.utils.http import http
+
+logger = logging.getLogger("opennem.importer.mms_backfill")
+
+BACKFILL_SPIDER_NAME = "au.mms.archive.backfill"
+
+BACKFILL_DEFAULT_TABLES = ["DISPATCH_UNIT_SCADA"]
+
+# size of chunks archives are downloaded in
+BACKFILL_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def get_archive_url(table_name: str, month: datetime) -> str:
+    url_params = {
+        "month": get_date_component("%m", dt=month),
+        "year": get_date_component("%Y", dt=month),
+        "table": table_name.upper(),
+    }
+
+    return MMS_URL.format(**url_params)
+
+
+def get_backfill_checkpoints(table_names: List[str]) -> Set[Tuple[str, date]]:
+    """
+    Get the (table, month) pairs that have already been backfilled
+    """
+    session = SessionLocal()
+
+    try:
+        checkpoints = (
+            session.query(BackfillCheckpoint.table_name, BackfillCheckpoint.month)
+            .filter(BackfillCheckpoint.table_name.in_(table_names))
+            .all()
+        )
+    finally:
+        session.close()
+
+    return set((table_name, month) for table_name, month in checkpoints)
+
+
+def store_backfill_checkpoint(table_name: str, month: datetime, num_records: int) -> None:
+    upsert_records(
+        BackfillCheckpoint,
+        [
+            {
+                "created_by": BACKFILL_SPIDER_NAME,
+                "table_name": table_name,
+                "month": month.date(),
+                "num_records": num_records,
+            }
+        ],
+        update_fields=["num_records"],
+    )
+
+
+def store_record_item(record_item: Dict[str, Any], bulk_inserter: BulkInsertPipeline) -> int:
+    """
+    Store the output of a table processor. Processors either write their
+    records themselves or return them for the bulk inserter
+    """
+    if "table_schema" in record_item and record_item.get("records"):
+        result = bulk_inserter.bulk_insert_record_set(record_item)
+
+        # fail the archive so that it isn't checkpointed
+        if result["num_errors"]:
+            raise Exception(
+                "Error bulk inserting {}".format(record_item["table_schema"].__table__.name)
+            )
+
+        return result["num_records"]
+
+    # processors that store their own records flag failed upserts
+    if record_item.get("num_errors"):
+        raise Exception("Error storing records from table processor")
+
+    num_records = record_item.get("num_records", 0)
+
+    if isinstance(num_records, int):
+        return num_records
+
+    return 0
+
+
+def backfill_archive(table_name: str, month: datetime) -> int:
+    """
+    Download, parse and store a single archive table month and checkpoint it.
+    Any processor or storage error raises before the checkpoint is stored.
+    Runs in a worker process
+    """
+    url = get_archive_url(table_name, month)
+    spider = Spider(name=BACKFILL_SPIDER_NAME)
+    bulk_inserter = BulkInsertPipeline()
+    num_records = 0
+
+    logger.info("Backfilling %s from %s", table_name, url)
+
+    with TemporaryFile() as archive_file:
+        with http.get(url, stream=True) as response:
+            response.raise_for_status()
+
+            for chunk in response.iter_content(chunk_size=BACKFILL_DOWNLOAD_CHUNK_SIZE):
+                archive_file.write(chunk)
+
+        archive_file.seek(0)
+
+        try:
+            # zip members are parsed one at a time
+            for record_item in process_table_stream(archive_file, spider=spider):
+                num_records += store_record_item(record_item, bulk_inserter)
+        finally:
+            bulk_inserter.close_spider(spider)
+
+    store_backfill_checkpoint(table_name, month, num_records)
+
+    return num_records
+
+
+def run_backfill(
+    start: datetime,
+    end: datetime,
+    table_names: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> Dict[str, int]:
+    """
+    Backfill archive tables for each month from start to end across a pool of
+    worker processes. Months that have a checkpoint are skipped unless force is
+    set. Returns counts of completed and failed archives and records stored
+    """
+    if not table_names:
+        table_names = BACKFILL_DEFAULT_TABLES
+
+    table_names = [t.upper() for t in table_names]
+
+    if not workers:
+        workers = os.cpu_count() or 1
+
+    checkpoints: Set[Tuple[str, date]] = set()
+
+    if not force:
+        checkpoints = get_backfill_checkpoints(table_names)
+
+    tasks = [
+        (table_name, month)
+        for month in month_series(start, end)
+        for table_name in table_names
+        if (table_name, month.date()) not in checkpoints
+    ]
+
+    logger.info(
+        "Backfilling %d archives with %d workers (%d already done)",
+        len(tasks),
+        workers,
+        len(checkpoints),
+    )
+
+    results = {"completed": 0, "failed": 0, "num_records": 0}
+
+    if not tasks:
+        return results
+
+    # close the pooled connections so they aren't shared with the forked workers
+    get_database_engine().dispose()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(backfill_archive, table_name, month): (table_name, month)
+            for table_name, month in tasks
+        }
+
+        for future in as_completed(futures):
+            table_name, month = futures[future]
+
+            try:
+                num_records = future.result()
+            except Exception as e:
+                logger.error("Error backfilling %s %s: %s", table_name, month.date(), e)
+                results["failed"] += 1
+                continue
+
+            logger.info("Backfilled %s %s: %d records", table_name, month.date(), num_records)
+            results["completed"] += 1
+            results["num_records"] += num_records
+
+    return results
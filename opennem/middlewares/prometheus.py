@@ -1,7 +1,7 @@
 import logging
 
 from prometheus_client.twisted import MetricsResource
-from prometheus_client import Counter, Summary, Gauge
+from prometheus_client import Counter, Summary, Gauge, Histogram
 from twisted.web.server import Site
 from twisted.web import server, resource
 from twisted.internet import task
@@ -9,11 +9,16 @@ from scrapy.exceptions import NotConfigured
 from scrapy.utils.reactor import listen_tcp
 from scrapy import signals
 
+# registers the pipeline step and table metrics served alongside the spider metrics
+import opennem.utils.metrics  # noqa: F401
+
 logger = logging.getLogger(__name__)
 
 
 class WebService(Site):
     """
+        Serves spider stats along with the pipeline step and table metrics
+        from `opennem.utils.metrics` on a prometheus metrics endpoint
 
     """
     def __init__(self, crawler):
@@ -82,6 +87,10 @@ class WebService(Site):
         self.spr_request_depth_max = Gauge(
             'spr_request_depth_max', '...', ['spider'])
 
+        self.spr_download_latency = Histogram(
+            'spr_download_latency_seconds', 'Spider response download time',
+            ['spider'])
+
         root = resource.Resource()
         self.promtheus = None
         root.putChild(self.path.encode('utf-8'), MetricsResource())
@@ -128,9 +137,15 @@ class WebService(Site):
     def item_scraped(self, item, spider):
         self.spr_item_scraped.labels(spider=self.name).inc()
 
-    def response_received(self, spider):
+    def response_received(self, response, spider):
         self.spr_response_received.labels(spider=self.name).inc()
 
+        latency = response.meta.get('download_latency')
+
+        if latency is not None:
+            self.spr_download_latency.labels(
+                spider=spider.name).observe(latency)
+
     def item_dropped(self, item, spider, exception):
         self.spr_item_scraped.labels(spider=self.name).inc()
 
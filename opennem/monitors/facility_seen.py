@@ -28,16 +28,18 @@ def get_facility_first_seen() -> List[FacilitySeen]:
     """Run this and it'll check if there are new facilities in
     scada data and let you know which ones
 
-    The query can be an expensive one so don't run to often.
+    Reads the facility_scada_bounds table so it's cheap to run
     """
 
     engine = get_database_engine()
 
     __query = """
         select
-            distinct fs.facility_code,
-            fs.network_id
-        from facility_scada fs
+            fs.facility_code,
+            fs.network_id,
+            fs.first_seen,
+            fs.last_seen
+        from facility_scada_bounds fs
         where
             fs.facility_code not in (select distinct code from facility);
     """
@@ -46,7 +48,9 @@ def get_facility_first_seen() -> List[FacilitySeen]:
         logger.debug(__query)
         row = list(c.execute(__query))
 
-    records: List[FacilitySeen] = [FacilitySeen(code=r[0], network_id=r[1]) for r in row]
+    records: List[FacilitySeen] = [
+        FacilitySeen(code=r[0], network_id=r[1], seen_first=r[2], seen_last=r[3]) for r in row
+    ]
 
     return records
 
@@ -1,14 +1,15 @@
 import logging
 from datetime import datetime
 
-from sqlalchemy.dialects.postgresql import insert
-
+from opennem.core.facility_scada import facility_scada_stored
 from opennem.core.networks import network_from_state
-from opennem.db import SessionLocal, get_database_engine
+from opennem.db import SessionLocal
 from opennem.db.models.opennem import Facility, FacilityScada
+from opennem.db.upsert import upsert_records
 from opennem.importer.rooftop import ROOFTOP_CODE
 from opennem.schema.network import NetworkNEM
 from opennem.utils.dates import parse_date
+from opennem.utils.dedup import dedup_table_records
 from opennem.utils.pipelines import check_spider_pipeline
 
 logger = logging.getLogger(__name__)
@@ -58,7 +59,6 @@ class APVIStoreData(object):
         postcode_capacity = records["postcodeCapacity"]
         installations = records["installations"]
 
-        engine = get_database_engine()
         session = SessionLocal()
 
         records_to_store = []
@@ -142,21 +142,16 @@ class APVIStoreData(object):
         if len(records_to_store) < 1:
             return 0
 
-        stmt = insert(FacilityScada).values(records_to_store)
-        stmt.bind = engine
-        stmt = stmt.on_conflict_do_update(
-            index_elements=["trading_interval", "network_id", "facility_code", "is_forecast"],
-            set_={
-                "generated": stmt.excluded.generated,
-                "created_by": stmt.excluded.created_by,
-            },
-        )
+        records_to_store = dedup_table_records(records_to_store, FacilityScada)
 
         try:
-            session.execute(stmt)
-            session.commit()
+            upsert_records(
+                FacilityScada, records_to_store, update_fields=["generated", "created_by"]
+            )
         except Exception as e:
             logger.error("Error: {}".format(e))
+        else:
+            facility_scada_stored(records_to_store)
         finally:
             session.close()
 
@@ -0,0 +1,295 @@
+"""
+    Take records generated from previous pipeline steps and encode them
+    into the postgres binary COPY format in the shape of the database table
+    schema so they can be used with bulk_insert.
+
+    This is the binary alternative to `RecordsToCSVPipeline` and avoids
+    formatting every value as a string and having postgres parse it back.
+    Numeric columns are encoded as float8 and staged into a double precision
+    column which postgres casts on insert. The cast keeps 15 significant
+    digits so values with more digits than that (or Decimal values that
+    need exact precision) lose precision and should use the CSV path. The
+    scada and price values from AEMO and BOM are well inside this.
+
+    Naive datetimes are taken as UTC, as they are by the CSV path. Records
+    from the parsers are localized to the network timezone before they get
+    here.
+
+    See: https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+
+"""
+import logging
+import struct
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from scrapy import Spider
+from sqlalchemy import Boolean, DateTime, Integer, Numeric, String, Text
+from sqlalchemy.sql.schema import Column, Table
+
+from opennem.pipelines.csv import RecordCopyStream
+from opennem.utils.pipelines import check_spider_pipeline
+
+logger = logging.getLogger(__name__)
+
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+
+COPY_BINARY_TRAILER = struct.pack("!h", -1)
+
+COPY_BINARY_NULL = struct.pack("!i", -1)
+
+_float8_struct = struct.Struct("!id")
+
+# postgres timestamps are microseconds since this epoch
+POSTGRES_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+# string values accepted for boolean columns
+COPY_BINARY_BOOL_VALUES = {
+    "true": True,
+    "t": True,
+    "yes": True,
+    "1": True,
+    "false": False,
+    "f": False,
+    "no": False,
+    "0": False,
+}
+
+
+class BinaryCopyException(Exception):
+    pass
+
+
+def _encode_text(value: Any) -> bytes:
+    value_bytes = str(value).encode("utf-8")
+    return struct.pack("!i", len(value_bytes)) + value_bytes
+
+
+def _encode_float8(value: Any) -> bytes:
+    # native floats from the batch generators go straight through
+    if type(value) is float:
+        return _float8_struct.pack(8, value)
+
+    if isinstance(value, str):
+        value = value.strip()
+
+        if value == "":
+            return COPY_BINARY_NULL
+
+    return _float8_struct.pack(8, float(value))
+
+
+def _encode_int8(value: Any) -> bytes:
+    return struct.pack("!iq", 8, int(value))
+
+
+def _encode_bool(value: Any) -> bytes:
+    if isinstance(value, str):
+        value_bool = COPY_BINARY_BOOL_VALUES.get(value.strip().lower())
+
+        if value_bool is None:
+            raise BinaryCopyException("Invalid boolean value: {}".format(value))
+
+        value = value_bool
+
+    return struct.pack("!i?", 1, bool(value))
+
+
+def _encode_timestamptz(value: datetime) -> bytes:
+    # don't leave naive datetimes to the process local timezone
+    if not value.tzinfo:
+        value = value.replace(tzinfo=timezone.utc)
+
+    delta = value.astimezone(timezone.utc) - POSTGRES_EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+    return struct.pack("!iq", 8, micros)
+
+
+# Maps column types to the encoder and the type they're staged as
+COPY_BINARY_ENCODERS = [
+    (DateTime, _encode_timestamptz, None),
+    (Boolean, _encode_bool, None),
+    (Integer, _encode_int8, "bigint"),
+    (Numeric, _encode_float8, "double precision"),
+    (Text, _encode_text, None),
+    (String, _encode_text, None),
+]
+
+
+def get_column_encoder(column: Column) -> Callable[[Any], bytes]:
+    for column_type, encoder, _ in COPY_BINARY_ENCODERS:
+        if isinstance(column.type, column_type):
+            return encoder
+
+    raise BinaryCopyException(
+        "No binary copy encoder for column {} of type {}".format(column.name, column.type)
+    )
+
+
+def get_column_staging_types(table: Table, column_names: List[str]) -> Dict[str, str]:
+    """
+    Get the columns that need to be staged as a different type than
+    the table defines so that they match the binary encoding
+    """
+    staging_types = {}
+    columns = table.__table__.columns  # type: ignore
+
+    for column_name in column_names:
+        column = columns[column_name]
+
+        for column_type, _, staging_type in COPY_BINARY_ENCODERS:
+            if isinstance(column.type, column_type):
+                if staging_type:
+                    staging_types[column_name] = staging_type
+                break
+
+    return staging_types
+
+
+def get_row_encoder(
+    table: Table, column_names: List[str]
+) -> Callable[[Dict], bytes]:
+    """
+    Build a function that encodes a record into a binary COPY tuple
+    for the columns in column_names
+    """
+    table_columns = table.__table__.columns  # type: ignore
+
+    for column_name in column_names:
+        if column_name not in table_columns:
+            raise Exception("Column name not found: {}".format(column_name))
+
+    encoders = [get_column_encoder(table_columns[c]) for c in column_names]
+    field_count = struct.pack("!h", len(column_names))
+
+    # text and timestamp values repeat a lot (codes, intervals) so memoize them
+    encoded_values: List[Optional[Dict[Any, bytes]]] = [
+        None if e in [_encode_float8, _encode_int8] else {} for e in encoders
+    ]
+    columns = list(zip(column_names, encoders, encoded_values))
+
+    def encode_row(record: Dict) -> bytes:
+        row = [field_count]
+
+        for column_name, encoder, encoded in columns:
+            value = record.get(column_name)
+
+            if value is None:
+                row.append(COPY_BINARY_NULL)
+            elif encoded is None:
+                row.append(encoder(value))
+            else:
+                if value not in encoded:
+                    encoded[value] = encoder(value)
+
+                row.append(encoded[value])
+
+        return b"".join(row)
+
+    return encode_row
+
+
+class BinaryCopyRecordStream(RecordCopyStream):
+    """
+    Lazily encodes records into the binary COPY format
+    """
+
+    empty = b""
+
+    def __init__(
+        self,
+        table: Table,
+        records: Iterable[Dict],
+        column_names: List[str],
+        row_limit: int = 0,
+    ) -> None:
+        self._encode_row = get_row_encoder(table, column_names)
+
+        super().__init__(records, row_limit=row_limit)
+
+    def serialize_header(self) -> bytes:
+        return COPY_BINARY_HEADER
+
+    def serialize_record(self, record: Dict) -> bytes:
+        return self._encode_row(record)
+
+    def serialize_trailer(self) -> bytes:
+        return COPY_BINARY_TRAILER
+
+
+def generate_binary_copy_from_records(
+    table: Table, records: List[Dict], column_names: Optional[List[str]] = None
+) -> BytesIO:
+    """
+    Take a list of dict records and a table schema and generate a
+    binary COPY buffer to be used in bulk_insert
+
+    Columns not in column_names are left to the table defaults
+    """
+    if len(records) < 1:
+        raise Exception("No records")
+
+    if not column_names:
+        column_names = list(records[0].keys())
+
+    encode_row = get_row_encoder(table, column_names)
+
+    copy_buffer = BytesIO()
+    copy_buffer.write(COPY_BINARY_HEADER)
+
+    for record in records:
+        copy_buffer.write(encode_row(record))
+
+    copy_buffer.write(COPY_BINARY_TRAILER)
+
+    # rewind it back to the start
+    copy_buffer.seek(0)
+
+    return copy_buffer
+
+
+class RecordsToBinaryCopyPipeline(object):
+    """
+    Pipeline that adapts the binary COPY generator and bulk inserter. Use in
+    place of `RecordsToCSVPipeline` in a spiders pipelines
+
+    """
+
+    @check_spider_pipeline
+    def process_item(
+        self, item: Union[List[Dict], Dict], spider: Optional[Spider] = None
+    ) -> List[Dict]:
+
+        # if it's a single item put it in a list
+        if not isinstance(item, list):
+            item = [item]
+
+        for record_set in item:
+            if not isinstance(record_set, dict):
+                logger.error("Invalid record_set passed to binary copy pipeline: %s", record_set)
+                return record_set
+
+            if "table_schema" not in record_set:
+                logger.error("No table model passed to binary copy generator")
+                logger.error(record_set)
+                return item
+
+            table = record_set["table_schema"]
+
+            if "records" not in record_set:
+                logger.error("No records to generate binary copy from")
+                return item
+
+            records = record_set["records"]
+
+            if not records:
+                continue
+
+            column_names = list(records[0].keys())
+
+            record_set["copy_binary"] = BinaryCopyRecordStream(table, records, column_names)
+            record_set["copy_columns"] = column_names
+
+        return item
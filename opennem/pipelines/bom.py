@@ -1,10 +1,9 @@
 import logging
 
 import pytz
-from sqlalchemy.dialects.postgresql import insert
 
-from opennem.db import SessionLocal, get_database_engine
 from opennem.db.models.opennem import BomObservation
+from opennem.db.upsert import upsert_records
 from opennem.utils.dates import parse_date
 from opennem.utils.pipelines import check_spider_pipeline
 
@@ -29,9 +28,6 @@ class StoreBomObservation(object):
     @check_spider_pipeline
     def process_item(self, item, spider):
 
-        session = SessionLocal()
-        engine = get_database_engine()
-
         records_to_store = []
 
         if "records" not in item:
@@ -86,30 +82,24 @@ class StoreBomObservation(object):
         if not len(records_to_store):
             return 0
 
-        stmt = insert(BomObservation).values(records_to_store)
-        stmt.bind = engine
-        stmt = stmt.on_conflict_do_update(
-            index_elements=["observation_time", "station_id"],
-            set_={
-                "temp_apparent": stmt.excluded.temp_apparent,
-                "temp_air": stmt.excluded.temp_air,
-                "press_qnh": stmt.excluded.press_qnh,
-                "wind_dir": stmt.excluded.wind_dir,
-                "wind_spd": stmt.excluded.wind_spd,
-                "wind_gust": stmt.excluded.wind_gust,
-                "cloud": stmt.excluded.cloud,
-                "cloud_type": stmt.excluded.cloud_type,
-                "humidity": stmt.excluded.humidity,
-            },
-        )
-
         try:
-            session.execute(stmt)
-            session.commit()
+            upsert_records(
+                BomObservation,
+                records_to_store,
+                update_fields=[
+                    "temp_apparent",
+                    "temp_air",
+                    "press_qnh",
+                    "wind_dir",
+                    "wind_spd",
+                    "wind_gust",
+                    "cloud",
+                    "cloud_type",
+                    "humidity",
+                ],
+            )
         except Exception as e:
             logger.error("Error: {}".format(e))
             return 0
-        finally:
-            session.close()
 
         return len(records_to_store)
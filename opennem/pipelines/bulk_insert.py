@@ -3,69 +3,159 @@ OpenNEM Bulk Insert Pipeline
 
 Bulk inserts records using temporary tables and CSV imports with copy_from
 
+The pipeline holds a pooled connection from `open_spider` to `close_spider` and
+reuses a staging temp table per table in that session
+
 This is by far the fastest way to bulk insert large records sets of consistent width
 and supports on conflict upserts with postgres
 
 This should be the last step of the pipeline and requires `RecordsToCSVPipeline`
-from `csv.py`
+from `csv.py` or `RecordsToBinaryCopyPipeline` from `binary_copy.py` for COPY in
+binary format
+
+Records are streamed into the COPY as they are serialized and large record sets
+are split into transactions of `settings.bulk_insert_row_limit` records which a
+spider can override with a `bulk_insert_row_limit` attribute
 
 @TODO use pydantic throughout to tidy up the schema that is passed through the pipeline
 
 """
 import logging
-from datetime import datetime
-from io import StringIO
-from typing import Any, List, Optional, Union
+import zlib
+from io import BytesIO, StringIO
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 # from sqlalchemy.exc import StatementError
 from sqlalchemy.sql.schema import Column, Table
 
+from opennem.api.stats.cache import invalidate_stats_cache_for_records
+from opennem.core.crawl_index import mark_crawl_files_ingested
+from opennem.core.facility_scada import facility_scada_stored
 from opennem.db import get_database_engine
-from opennem.utils.pipelines import check_spider_pipeline
+from opennem.pipelines.binary_copy import BinaryCopyRecordStream, get_column_staging_types
+from opennem.pipelines.csv import CSVRecordStream, RecordCopyStream, get_csv_column_names
+from opennem.settings import settings
+from opennem.utils.pipelines import check_spider_pipeline, spider_has_pipeline
 
 logger = logging.getLogger(__name__)
 
-BULK_INSERT_QUERY = """
-    CREATE TEMP TABLE __tmp_{table_name}_{tmp_table_name}
+# staging tables are session temp tables so they are unlogged, private to the
+# connection and are emptied on each commit rather than dropped
+BULK_INSERT_STAGING_QUERY = """
+    CREATE TEMP TABLE IF NOT EXISTS {staging_table_name}
     (LIKE {table_name} INCLUDING DEFAULTS)
-    ON COMMIT DROP;
+    ON COMMIT DELETE ROWS;
+
+    {alter_staging_types}
+"""
 
-    COPY __tmp_{table_name}_{tmp_table_name} FROM STDIN WITH (FORMAT CSV, HEADER TRUE, DELIMITER ',');
+BULK_INSERT_COPY_QUERY = """
+    COPY {staging_table_name} FROM STDIN WITH (FORMAT CSV, HEADER TRUE, DELIMITER ',');
 
     INSERT INTO {table_name}
         SELECT *
-        FROM __tmp_{table_name}_{tmp_table_name}
+        FROM {staging_table_name}
     ON CONFLICT {on_conflict}
 """
 
+BULK_INSERT_BINARY_COPY_QUERY = """
+    COPY {staging_table_name} ({column_names}) FROM STDIN WITH (FORMAT BINARY);
+
+    INSERT INTO {table_name}
+        SELECT *
+        FROM {staging_table_name}
+    ON CONFLICT {on_conflict}
+"""
+
+BULK_INSERT_ALTER_STAGING_TYPES = """
+    ALTER TABLE {staging_table_name} {alter_columns};
+"""
+
 BULK_INSERT_CONFLICT_UPDATE = """
     ({pk_columns}) DO UPDATE set {update_values}
 """
 
+# tables the stats api responses are built from
+STATS_CACHE_TABLES = frozenset(["facility_scada", "balancing_summary"])
 
-def build_insert_query(
+# built copy queries keyed on table, update fields and copy columns
+_copy_query_cache: Dict[Tuple, str] = {}
+
+
+def get_staging_table_name(table: Table, staging_types: Optional[Dict[str, str]] = None) -> str:
+    """
+    Name of the staging table for a table. Binary copies stage some columns
+    as a different type so get their own staging table
+    """
+    staging_table_name = "__tmp_{}".format(table.__table__.name)
+
+    if staging_types:
+        staging_key = ",".join(sorted(staging_types.keys())).encode("utf-8")
+        staging_table_name += "_{:08x}".format(zlib.crc32(staging_key))
+
+    return staging_table_name
+
+
+def build_staging_query(table: Table, staging_types: Optional[Dict[str, str]] = None) -> str:
+    """
+    Builds the query that creates the staging table for a table if it doesn't
+    already exist in the session
+    """
+    staging_table_name = get_staging_table_name(table, staging_types)
+    alter_staging_types = ""
+
+    if staging_types:
+        alter_staging_types = BULK_INSERT_ALTER_STAGING_TYPES.format(
+            staging_table_name=staging_table_name,
+            alter_columns=", ".join(
+                [f"ALTER COLUMN {n} TYPE {t}" for n, t in staging_types.items()]
+            ),
+        )
+
+    return BULK_INSERT_STAGING_QUERY.format(
+        table_name=table.__table__.name,
+        staging_table_name=staging_table_name,
+        alter_staging_types=alter_staging_types,
+    )
+
+
+def _get_column_name(column: Union[str, Column]) -> str:
+    if isinstance(column, Column) and hasattr(column, "name"):
+        return column.name
+    if isinstance(column, str):
+        return column.strip()
+    return ""
+
+
+def build_copy_query(
     table: Table,
     update_cols: List[Union[str, Column]] = None,
+    binary_columns: Optional[List[str]] = None,
+    staging_types: Optional[Dict[str, str]] = None,
 ) -> str:
     """
-    Builds the bulk insert query
+    Builds the query that copies into the staging table and upserts from
+    it into the table. Queries are cached as they only depend on the arguments
     """
-    on_conflict = "DO NOTHING"
-
-    def get_column_name(column: Union[str, Column]) -> str:
-        if isinstance(column, Column) and hasattr(column, "name"):
-            return column.name
-        if isinstance(column, str):
-            return column.strip()
-        return ""
-
     update_col_names = []
 
     if update_cols:
-        update_col_names = [get_column_name(c) for c in update_cols]
+        update_col_names = [_get_column_name(c) for c in update_cols]
 
     update_col_names = list(filter(lambda c: c, update_col_names))
 
+    cache_key = (
+        table.__table__.name,
+        tuple(update_col_names),
+        tuple(binary_columns) if binary_columns else None,
+        tuple(sorted(staging_types.items())) if staging_types else None,
+    )
+
+    if cache_key in _copy_query_cache:
+        return _copy_query_cache[cache_key]
+
+    on_conflict = "DO NOTHING"
+
     primary_key_columns = [c.name for c in table.__table__.primary_key.columns.values()]
 
     if len(update_col_names):
@@ -74,22 +164,133 @@ def build_insert_query(
             update_values=", ".join([f"{n} = EXCLUDED.{n}" for n in update_col_names]),
         )
 
-    query = BULK_INSERT_QUERY.format(
-        table_name=table.__table__.name,
-        on_conflict=on_conflict,
-        tmp_table_name=datetime.strftime(datetime.now(), "%Y%m%d%H%M%S"),
-    )
+    table_name = table.__table__.name
+    staging_table_name = get_staging_table_name(table, staging_types)
+
+    if binary_columns:
+        query = BULK_INSERT_BINARY_COPY_QUERY.format(
+            table_name=table_name,
+            on_conflict=on_conflict,
+            staging_table_name=staging_table_name,
+            column_names=",".join(binary_columns),
+        )
+    else:
+        query = BULK_INSERT_COPY_QUERY.format(
+            table_name=table_name,
+            on_conflict=on_conflict,
+            staging_table_name=staging_table_name,
+        )
 
     logger.debug(query)
 
+    _copy_query_cache[cache_key] = query
+
     return query
 
 
+def build_insert_query(
+    table: Table,
+    update_cols: List[Union[str, Column]] = None,
+    binary_columns: Optional[List[str]] = None,
+    staging_types: Optional[Dict[str, str]] = None,
+) -> str:
+    """
+    Builds the bulk insert query including creating the staging table so
+    it can be run on any connection
+
+    If binary_columns is passed the query copies those columns in binary
+    format with the column types in staging_types overriden in the temp table
+    """
+    return build_staging_query(table, staging_types) + build_copy_query(
+        table, update_cols, binary_columns=binary_columns, staging_types=staging_types
+    )
+
+
+def get_row_limit(spider: Any = None) -> int:
+    """Number of records to copy per transaction for a spider"""
+    if spider and hasattr(spider, "bulk_insert_row_limit"):
+        return spider.bulk_insert_row_limit
+
+    return settings.bulk_insert_row_limit
+
+
 class BulkInsertPipeline(object):
+    """
+    Holds a pooled connection for the life of the spider along with the
+    staging tables that have been created in its session
+    """
+
+    def __init__(self) -> None:
+        self.conn: Any = None
+        self.staging_tables: Set[str] = set()
+
+    def open_spider(self, spider: Any) -> None:
+        if spider_has_pipeline(self, spider):
+            self.get_connection()
+
+    def close_spider(self, spider: Any) -> None:
+        if self.conn is not None:
+            # returns it to the pool
+            self.conn.close()
+
+        self.conn = None
+        self.staging_tables = set()
+
+    def get_connection(self) -> Any:
+        if self.conn is None:
+            self.conn = get_database_engine().raw_connection()
+            self.staging_tables = set()
+
+        return self.conn
+
+    def prepare_staging_table(
+        self, cursor: Any, table: Table, staging_types: Optional[Dict[str, str]] = None
+    ) -> None:
+        staging_table_name = get_staging_table_name(table, staging_types)
+
+        if staging_table_name in self.staging_tables:
+            return None
+
+        cursor.execute(build_staging_query(table, staging_types))
+        self.staging_tables.add(staging_table_name)
+
     @check_spider_pipeline
     def process_item(self, item: List[dict], spider):
+        return self.bulk_insert(item, spider)
+
+    def bulk_insert_record_set(
+        self, record_set: Dict[str, Any], spider: Any = None, binary: bool = False
+    ) -> Dict[str, int]:
+        """
+        Encode a single record set from a table processor and insert it. Used
+        to store streamed files a batch at a time
+        """
+        records = record_set.get("records")
+
+        if not records:
+            return {"num_records": 0, "num_errors": 0}
+
+        table = record_set["table_schema"]
+
+        if binary:
+            column_names = list(records[0].keys())
+
+            record_set["copy_binary"] = BinaryCopyRecordStream(table, records, column_names)
+            record_set["copy_columns"] = column_names
+        else:
+            record_set["csv"] = CSVRecordStream(records, get_csv_column_names(table, records))
+
+        return self.bulk_insert([record_set], spider)
+
+    def bulk_insert(self, item: List[dict], spider: Any = None) -> Any:
+        """
+        Insert the record sets in item. Can be called outside of a crawl
+        """
         num_records = 0
-        conn = get_database_engine().raw_connection()
+        num_errors = 0
+        links = []
+        conn = self.get_connection()
+        row_limit = get_row_limit(spider)
 
         if not isinstance(item, list):
             spider_name = "unknown"
@@ -104,37 +305,93 @@ class BulkInsertPipeline(object):
             return {"num_records": "ERROR"}
 
         for single_item in item:
-            if "csv" not in single_item:
+            # nothing to copy for record sets that are empty
+            if "records" in single_item and not single_item["records"]:
+                continue
+
+            if "csv" not in single_item and "copy_binary" not in single_item:
                 logger.error("No csv record passed to bulk inserter")
                 return 0
 
-            csv_content: StringIO = single_item["csv"]
-
             if "table_schema" not in single_item:
                 logger.error("No table model passed to bulk inserter")
                 return item
 
             table: Table = single_item["table_schema"]
 
+            if "link" in single_item:
+                links.append(single_item["link"])
+
             update_fields: Optional[List[Union[str, Column[Any]]]] = None
 
             if "update_fields" in single_item:
                 update_fields = single_item["update_fields"]
 
-            sql_query = build_insert_query(table, update_fields)
+            staging_types: Optional[Dict[str, str]] = None
+
+            if "copy_binary" in single_item:
+                copy_content: Union[StringIO, BytesIO, RecordCopyStream] = single_item[
+                    "copy_binary"
+                ]
+                copy_columns: List[str] = single_item["copy_columns"]
+                staging_types = get_column_staging_types(table, copy_columns)
+
+                sql_query = build_copy_query(
+                    table,
+                    update_fields,
+                    binary_columns=copy_columns,
+                    staging_types=staging_types,
+                )
+            else:
+                copy_content = single_item["csv"]
+                sql_query = build_copy_query(table, update_fields)
+
+            if isinstance(copy_content, RecordCopyStream):
+                copy_content.row_limit = row_limit
 
             try:
                 cursor = conn.cursor()
-                cursor.copy_expert(sql_query, csv_content)
+                self.prepare_staging_table(cursor, table, staging_types)
+                cursor.copy_expert(sql_query, copy_content)
                 conn.commit()
+
+                # each segment of a stream is copied in its own transaction
+                while isinstance(copy_content, RecordCopyStream) and copy_content.next_segment():
+                    cursor.copy_expert(sql_query, copy_content)
+                    conn.commit()
+
+                if table.__table__.name == "facility_scada" and single_item.get("records"):
+                    facility_scada_stored(single_item["records"])
+                elif table.__table__.name in STATS_CACHE_TABLES and single_item.get("records"):
+                    invalidate_stats_cache_for_records(single_item["records"])
             except Exception as generic_error:
                 if hasattr(generic_error, "hide_parameters"):
                     generic_error.hide_parameters = True
                 logger.error(generic_error)
+                num_errors += 1
+
+                # staging tables created in the failed transaction are gone
+                self.staging_tables = set()
+
+                try:
+                    conn.rollback()
+                except Exception:
+                    # connection is unusable so drop it from the pool and start again
+                    conn.invalidate()
+                    self.conn = None
+                    conn = self.get_connection()
 
             try:
-                num_records += len(csv_content.getvalue().split("\n")) - 1
+                if isinstance(copy_content, RecordCopyStream):
+                    num_records += copy_content.num_records
+                elif "copy_binary" in single_item:
+                    num_records += len(single_item["records"])
+                else:
+                    num_records += len(copy_content.getvalue().split("\n")) - 1
             except Exception:
                 pass
 
-        return {"num_records": num_records}
+        if links and not num_errors and getattr(spider, "skip_seen", False):
+            mark_crawl_files_ingested(links)
+
+        return {"num_records": num_records, "num_errors": num_errors}
@@ -3,11 +3,18 @@
     dicts) and prep them into CSV in the shape of the database table
     schema so they can be used with bulk_insert
 
+    Records are serialized lazily by `CSVRecordStream` as the COPY reads
+    them so the CSV is never held in memory in full
+
+    Naive datetimes are written as UTC the same as the binary COPY path
+    rather than being left to the timezone of the database session
+
 """
 import csv
 import logging
+from datetime import datetime, timezone
 from io import StringIO
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 from scrapy import Spider
 from sqlalchemy.sql.schema import Table
@@ -17,19 +24,146 @@ from opennem.utils.pipelines import check_spider_pipeline
 logger = logging.getLogger(__name__)
 
 
-def generate_csv_from_records(
-    table: Table, records: List[Dict], column_names: Optional[List[str]] = None
-) -> StringIO:
+# marks the end of the records in a stream
+_RECORDS_END = object()
+
+
+def _csv_record(record: Dict) -> Dict:
+    """Mark naive datetimes as UTC so postgres doesn't read them in the session timezone"""
+    return {
+        k: v.replace(tzinfo=timezone.utc) if isinstance(v, datetime) and not v.tzinfo else v
+        for k, v in record.items()
+    }
+
+
+class RecordCopyStream(object):
     """
-    Take a list of dict records and a table schema and generate a csv
-    buffer to be used in bulk_insert
+    File-like adapter that lazily serializes records into COPY data as it is
+    read by `cursor.copy_expert`, tracking the number of records as it goes.
+
+    If `row_limit` is set the stream ends after that many records and
+    `next_segment` starts another segment for the next COPY so that large
+    record sets can be split across transactions.
 
+    Subclasses implement the serialize methods for each COPY format
+    """
+
+    empty: Any = ""
+
+    def __init__(self, records: Iterable[Dict], row_limit: int = 0) -> None:
+        self.row_limit = row_limit
+        self.num_records = 0
+        self.segment_records = 0
+
+        self._records = iter(records)
+        self._next_record = next(self._records, _RECORDS_END)
+        self._chunks: List[Any] = []
+        self._chunks_size = 0
+        self._segment_started = False
+        self._segment_finished = False
+
+    def serialize_header(self) -> Any:
+        return self.empty
+
+    def serialize_record(self, record: Dict) -> Any:
+        raise NotImplementedError()
+
+    def serialize_trailer(self) -> Any:
+        return self.empty
+
+    @property
+    def has_more(self) -> bool:
+        """There are records left for another segment"""
+        return self._next_record is not _RECORDS_END
+
+    def next_segment(self) -> bool:
+        if not self.has_more:
+            return False
+
+        self.segment_records = 0
+        self._chunks = []
+        self._chunks_size = 0
+        self._segment_started = False
+        self._segment_finished = False
+
+        return True
+
+    def _write(self, chunk: Any) -> None:
+        if chunk:
+            self._chunks.append(chunk)
+            self._chunks_size += len(chunk)
+
+    def _fill(self, size: int) -> None:
+        if not self._segment_started:
+            self._write(self.serialize_header())
+            self._segment_started = True
+
+        while not self._segment_finished and (size < 0 or self._chunks_size < size):
+            if not self.has_more or (self.row_limit and self.segment_records >= self.row_limit):
+                self._write(self.serialize_trailer())
+                self._segment_finished = True
+                break
+
+            self._write(self.serialize_record(self._next_record))  # type: ignore
+            self.num_records += 1
+            self.segment_records += 1
+            self._next_record = next(self._records, _RECORDS_END)
+
+    def read(self, size: int = -1) -> Any:
+        self._fill(size)
+
+        data = self.empty.join(self._chunks)
+        rest = self.empty
+
+        if size >= 0 and len(data) > size:
+            data, rest = data[:size], data[size:]
+
+        self._chunks = [rest] if rest else []
+        self._chunks_size = len(rest)
+
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+
+class CSVRecordStream(RecordCopyStream):
+    """
+    Lazily serializes records into CSV with a header row
+    """
+
+    def __init__(
+        self, records: Iterable[Dict], column_names: List[str], row_limit: int = 0
+    ) -> None:
+        self._line = StringIO()
+        self._csvwriter = csv.DictWriter(self._line, fieldnames=column_names)
+
+        super().__init__(records, row_limit=row_limit)
+
+    def _pop_line(self) -> str:
+        line = self._line.getvalue()
+        self._line.seek(0)
+        self._line.truncate()
+
+        return line
+
+    def serialize_header(self) -> str:
+        self._csvwriter.writeheader()
+        return self._pop_line()
+
+    def serialize_record(self, record: Dict) -> str:
+        self._csvwriter.writerow(_csv_record(record))
+        return self._pop_line()
+
+
+def get_csv_column_names(table: Table, records: List[Dict]) -> List[str]:
+    """
+    Check that the records match the table schema and return the
+    column names in the order of the records fields
     """
     if len(records) < 1:
         raise Exception("No records")
 
-    csv_buffer = StringIO()
-
     table_column_names = [c.name for c in table.__table__.columns.values()]  # type: ignore
 
     # sanity check the records we received to make sure
@@ -49,10 +183,22 @@ def generate_csv_from_records(
                     "Missing value for column {}".format(column_name)
                 )
 
-        column_names = record_field_names
+        return record_field_names
 
-    if not column_names:
-        column_names = table_column_names
+    return table_column_names
+
+
+def generate_csv_from_records(
+    table: Table, records: List[Dict], column_names: Optional[List[str]] = None
+) -> StringIO:
+    """
+    Take a list of dict records and a table schema and generate a csv
+    buffer to be used in bulk_insert
+
+    """
+    csv_buffer = StringIO()
+
+    column_names = get_csv_column_names(table, records)
 
     csvwriter = csv.DictWriter(csv_buffer, fieldnames=column_names)
     csvwriter.writeheader()
@@ -60,7 +206,7 @@ def generate_csv_from_records(
     # @TODO put the columns in the correct order ..
     # @NOTE do we need to ?!
     for record in records:
-        csvwriter.writerow(record)
+        csvwriter.writerow(_csv_record(record))
 
     # rewind it back to the start
     csv_buffer.seek(0)
@@ -103,8 +249,12 @@ class RecordsToCSVPipeline(object):
 
             records = record_set["records"]
 
-            csv_content = generate_csv_from_records(table, records)
+            # incremental crawls can skip every record
+            if not records:
+                continue
+
+            column_names = get_csv_column_names(table, records)
 
-            record_set["csv"] = csv_content
+            record_set["csv"] = CSVRecordStream(records, column_names)
 
         return item
@@ -1,81 +1,221 @@
+import hashlib
 import logging
 import os
 from io import BytesIO
-from zipfile import ZipFile
+from typing import IO, Any, Dict, Generator, Optional, Tuple
 
 from requests import RequestException
-
-from opennem.utils.handlers import _handle_zip, chain_streams, open
+from scrapy.exceptions import DropItem
+
+from opennem.core.crawl_index import (
+    CrawlFileStatus,
+    crawl_file_is_ingested,
+    get_conditional_headers,
+    get_crawl_file,
+    store_crawl_file,
+)
+from opennem.utils.archive import read_zip_contents, spool_chunks
+from opennem.utils.handlers import open
 from opennem.utils.http import http
 from opennem.utils.mime import decode_bytes, mime_from_content, mime_from_url
 from opennem.utils.pipelines import check_spider_pipeline
 
 logger = logging.getLogger(__name__)
 
+# downloads are kept in memory up to this size before spilling to disk
+DOWNLOAD_SPOOL_SIZE = 32 * 1024 * 1024
 
-def _fallback_download_handler(url: str) -> bytes:
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _read_download(url: str, content: IO[bytes]) -> bytes:
     """
-    This was previously a fallback download handler
-    but the name is redundant as it's now the primary
-    and takes precedence over the legacy downloader
+    Read a download. Zip files including embedded zips are read a member
+    at a time and joined
+    """
+    file_mime = mime_from_content(content)  # type: ignore
+    content.seek(0)
 
+    if not file_mime:
+        file_mime = mime_from_url(url)
+
+    if file_mime == "application/zip":
+        return read_zip_contents(content)
 
+    return content.read()
+
+
+def _conditional_download_handler(
+    url: str, crawl_file: Optional[Dict[str, Any]] = None
+) -> Tuple[Optional[IO[bytes]], Dict[str, Any]]:
     """
-    r = http.get(url)
+    Download a link to a temporary file and return it seekable along with
+    the size, ETag, Last-Modified and content hash of the download.
+
+    If crawl_file from the crawl index has an ingested download of the link
+    the request is conditional and no stream is returned if it's not modified
+    """
+    r = http.get(url, stream=True, headers=get_conditional_headers(crawl_file))
+
+    if r.status_code == 304:
+        return None, {}
 
     if not r.ok:
         raise Exception("Bad link returned {}: {}".format(r.status_code, url))
 
-    content = BytesIO(r.content)
+    content_hash = hashlib.sha1()
 
-    file_mime = mime_from_content(content)
+    def _hash_chunks() -> Generator[bytes, None, None]:
+        for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            content_hash.update(chunk)
+            yield chunk
 
-    if not file_mime:
-        file_mime = mime_from_url(url)
+    content = spool_chunks(_hash_chunks(), max_size=DOWNLOAD_SPOOL_SIZE)
 
-    # @TODO handle all this in utils/archive.py
-    # and make it all generic to handle other
-    # mime types
-    if file_mime == "application/zip":
-        with ZipFile(content) as zf:
-            if len(zf.namelist()) == 1:
-                return zf.open(zf.namelist()[0]).read()
+    content_size = content.seek(0, os.SEEK_END)
+    content.seek(0)
+
+    download_meta = {
+        "size": content_size,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "content_hash": content_hash.hexdigest(),
+    }
+
+    return content, download_meta
 
-            c = []
-            stream_count = 0
 
-            for filename in zf.namelist():
-                if filename.endswith(".zip"):
-                    c.append(_handle_zip(zf.open(filename), "r"))
-                    stream_count += 1
-                else:
-                    c.append(zf.open(filename))
+def _stream_download_handler(url: str) -> IO[bytes]:
+    """
+    Download a link to a temporary file and return it seekable
+    """
+    content, _ = _conditional_download_handler(url)
 
-            return chain_streams(c).read()
+    if not content:
+        raise Exception("No content for {}".format(url))
 
-    return content.getvalue()
+    return content
+
+
+def _fallback_download_handler(url: str) -> bytes:
+    """
+    This was previously a fallback download handler
+    but the name is redundant as it's now the primary
+    and takes precedence over the legacy downloader
+
+
+    """
+    with _stream_download_handler(url) as fh:
+        return _read_download(url, fh)
 
 
 class LinkExtract(object):
     """
     Parse and extracts links in items.
 
-    If the pipeline item has a "link" it'll download the content
-    and attach it to the item as "content" along with some
-    basic metadata.
+    If the pipeline item has a "link" it'll attach the content
+    to the item as "content" along with some basic metadata. Items
+    from `DirlistingSpider` have the "body" already fetched by the
+    scrapy downloader, otherwise the link is downloaded here.
+
+    Spiders that set `stream_content` get a seekable "file_handle" to
+    the download instead, with zips left for the parser to read a
+    member at a time. If they also set `skip_seen`
+    links are checked against the crawl index and dropped if unchanged
+    since they were ingested
 
     """
 
+    def check_crawl_index(
+        self,
+        item: Dict[str, Any],
+        spider: Any,
+        crawl_file: Optional[Dict[str, Any]],
+        download_meta: Dict[str, Any],
+    ) -> None:
+        if not getattr(spider, "skip_seen", False):
+            return None
+
+        if crawl_file_is_ingested(crawl_file, content_hash=download_meta["content_hash"]):
+            raise DropItem("Already ingested: {}".format(item["link"]))
+
+        store_crawl_file(item["link"], spider.name, CrawlFileStatus.downloaded, **download_meta)
+
+    def process_body(self, item: Dict[str, Any], spider: Any) -> Dict[str, Any]:
+        """
+        Process a link body that was fetched by the scrapy downloader
+        """
+        url = item["link"]
+        body: bytes = item.pop("body")
+        _, file_extension = os.path.splitext(url)
+
+        download_meta = {
+            "size": len(body),
+            "etag": item.pop("etag", None),
+            "last_modified": item.pop("last_modified", None),
+            "content_hash": hashlib.sha1(body).hexdigest(),
+        }
+
+        self.check_crawl_index(item, spider, item.pop("crawl_file", None), download_meta)
+
+        file_handle = BytesIO(body)
+
+        # streamed zips are parsed a member at a time by ExtractCSV
+        if getattr(spider, "stream_content", False):
+            item["file_handle"] = file_handle
+        else:
+            item["content"] = decode_bytes(_read_download(url, file_handle))
+
+        item["extension"] = file_extension
+
+        return item
+
+    def stream_link(self, item: Dict[str, Any], spider: Any) -> Dict[str, Any]:
+        url = item["link"]
+        _, file_extension = os.path.splitext(url)
+
+        crawl_file = None
+
+        if getattr(spider, "skip_seen", False):
+            crawl_file = get_crawl_file(url)
+
+        file_handle, download_meta = _conditional_download_handler(url, crawl_file)
+
+        if not file_handle:
+            raise DropItem("Not modified: {}".format(url))
+
+        try:
+            self.check_crawl_index(item, spider, crawl_file, download_meta)
+        except DropItem:
+            file_handle.close()
+            raise
+
+        item["file_handle"] = file_handle
+        item["extension"] = file_extension
+
+        return item
+
     @check_spider_pipeline
     def process_item(self, item, spider):
         if "link" not in item:
             return item
 
+        if "body" in item:
+            return self.process_body(item, spider)
+
         url = item["link"]
         fh = None
         content = None
         _, file_extension = os.path.splitext(url)
 
+        if getattr(spider, "stream_content", False):
+            try:
+                return self.stream_link(item, spider)
+            except DropItem:
+                raise
+            except Exception as e:
+                logger.error(e)
+
         try:
             _bytes_obj = _fallback_download_handler(url)
             content = decode_bytes(_bytes_obj)
@@ -4,6 +4,7 @@ import zipfile
 
 from sqlalchemy.orm import sessionmaker
 
+from opennem.core.parsers.aemo import parse_aemo_file_stream
 from opennem.db import db_connect
 from opennem.utils.pipelines import check_spider_pipeline
 
@@ -68,12 +69,25 @@ class ReadStringHandle(object):
 
 
 class ExtractCSV(object):
+    """
+    Extracts AEMO CSV tables from an item. Takes either decoded
+    "content" or a "file_handle" to a CSV file or zip of them which
+    is parsed as a stream a member at a time without decoding the
+    entire file into memory first. Streamed
+    files are set as "table_batches", a generator of per-table
+    batches that hold their records in columnar form
+
+    """
+
     @check_spider_pipeline
     def process_item(self, item, spider):
         if not item:
             logger.error("No item to parse")
             return None
 
+        if "content" not in item and "file_handle" in item:
+            return self.process_file_handle(item, spider)
+
         if "content" not in item:
             logger.error("No content in item to parse")
             return item
@@ -130,6 +144,26 @@ class ExtractCSV(object):
 
         return item
 
+    def process_file_handle(self, item, spider):
+        fh = item["file_handle"]
+        del item["file_handle"]
+
+        item["table_batches"] = self.stream_table_batches(fh)
+
+        return item
+
+    @staticmethod
+    def stream_table_batches(fh):
+        """
+        Yields per-table record batches from the stream as they are parsed
+        so that the whole file isn't held in memory
+        """
+        try:
+            for table_name, fields, records in parse_aemo_file_stream(fh, columnar=True):
+                yield {"name": table_name, "fields": fields, "records": records}
+        finally:
+            fh.close()
+
 
 class DatabaseStore(object):
     def __init__(self):
@@ -7,21 +7,33 @@ NEMWEB Data ingress into OpenNEM format
 
 import logging
 from datetime import datetime
-from itertools import groupby
-from typing import Any, Dict, List, Optional
+from time import perf_counter
+from typing import IO, Any, Dict, Generator, List, Optional
 
 from scrapy import Spider
-from sqlalchemy.dialects.postgresql import insert
 
+from opennem.api.stats.cache import invalidate_stats_cache_for_records
+from opennem.core.crawl_index import mark_crawl_files_ingested
+from opennem.core.facility_scada import facility_scada_stored
 from opennem.core.networks import NetworkNEM
-from opennem.core.normalizers import clean_float, normalize_duid
-from opennem.db import SessionLocal, get_database_engine
+from opennem.core.normalizers import clean_float, clean_float_column, normalize_duid
+from opennem.core.parsers.aemo import (
+    AEMO_PARSER_BATCH_SIZE,
+    AEMOColumnarRecords,
+    parse_aemo_file_stream,
+)
+from opennem.db import SessionLocal
 from opennem.db.models.opennem import BalancingSummary, Facility, FacilityScada
+from opennem.db.upsert import upsert_records
 from opennem.importer.rooftop import rooftop_remap_regionids
+from opennem.pipelines.binary_copy import RecordsToBinaryCopyPipeline
+from opennem.pipelines.bulk_insert import BulkInsertPipeline
 from opennem.schema.network import NetworkSchema
-from opennem.utils.dates import parse_date
+from opennem.utils.dates import DateColumnParser
+from opennem.utils.dedup import DedupPolicy, dedup_table_records
+from opennem.utils.metrics import count_item_records, record_table_step
 from opennem.utils.numbers import float_to_str
-from opennem.utils.pipelines import check_spider_pipeline
+from opennem.utils.pipelines import check_spider_pipeline, get_spider_pipelines
 
 logger = logging.getLogger(__name__)
 
@@ -44,9 +56,10 @@ def unit_scada_generate_facility_scada(
     created_by: str = None,
     limit: int = 0,
     duid: str = None,
+    dedup_policy: DedupPolicy = DedupPolicy.last,
 ) -> List[Dict]:
     created_at = datetime.now()
-    primary_keys = []
+    primary_keys = set()
     return_records = []
 
     created_by = ""
@@ -54,14 +67,11 @@ def unit_scada_generate_facility_scada(
     if spider and hasattr(spider, "name"):
         created_by = spider.name
 
+    date_parser = DateColumnParser(network=network, dayfirst=False, date_format=date_format)
+
     for row in records:
 
-        trading_interval = parse_date(
-            row[interval_field],
-            network=network,
-            dayfirst=False,
-            date_format=date_format,
-        )
+        trading_interval = date_parser.parse(row[interval_field])
 
         # if facility_code_field not in row:
         # logger.error("Invalid row no facility_code")
@@ -78,7 +88,7 @@ def unit_scada_generate_facility_scada(
             if pkey in primary_keys:
                 continue
 
-            primary_keys.append(pkey)
+            primary_keys.add(pkey)
 
         generated = None
 
@@ -116,22 +126,118 @@ def unit_scada_generate_facility_scada(
     if not groupby_filter:
         return return_records
 
-    return_records_grouped = {}
+    return dedup_table_records(return_records, FacilityScada, policy=dedup_policy)
+
+
+def _column_values(records: Any, field_name: Optional[str]) -> Optional[List[Any]]:
+    """Get all the values for a field from either columnar records or a list of dicts"""
+    if not field_name:
+        return None
+
+    if isinstance(records, AEMOColumnarRecords):
+        if not records.has_column(field_name):
+            return None
+        return records.column(field_name)
+
+    if not records or field_name not in records[0]:
+        return None
+
+    return [r[field_name] for r in records]
+
+
+def unit_scada_generate_facility_scada_batch(
+    records,
+    spider=None,
+    network: NetworkSchema = NetworkNEM,
+    interval_field: str = "SETTLEMENTDATE",
+    facility_code_field: str = "DUID",
+    date_format: Optional[str] = None,
+    power_field: Optional[str] = None,
+    energy_field: Optional[str] = None,
+    is_forecast: bool = False,
+    groupby_filter: bool = True,
+    limit: int = 0,
+    duid: str = None,
+    dedup_policy: DedupPolicy = DedupPolicy.last,
+    native_floats: bool = False,
+) -> List[Dict]:
+    """
+    Batch version of `unit_scada_generate_facility_scada` that works a column at
+    a time. Interval dates are parsed once per unique value, duids are
+    normalized through a lookup table and values are cleaned once per unique
+    value. Duplicate primary keys are removed with `dedup_policy`
+
+    Values are formatted as strings for CSV unless native_floats is set, which
+    leaves them as floats for the binary COPY encoder
+
+    Takes either a list of record dicts or `AEMOColumnarRecords`
+    """
+    created_at = datetime.now()
+    created_by = ""
+
+    if spider and hasattr(spider, "name"):
+        created_by = spider.name
+
+    if not isinstance(records, (list, AEMOColumnarRecords)):
+        records = list(records)
+
+    intervals = _column_values(records, interval_field)
+    facility_codes = _column_values(records, facility_code_field)
+
+    if not intervals or not facility_codes:
+        return []
 
-    for pk_values, rec_value in groupby(
-        return_records,
-        key=lambda r: (
-            r.get("network_id"),
-            r.get("trading_interval"),
-            r.get("facility_code"),
-        ),
+    date_parser = DateColumnParser(network=network, dayfirst=False, date_format=date_format)
+
+    interval_lookup: Dict[str, Optional[datetime]] = {
+        i: date_parser.parse(i) for i in set(intervals)
+    }
+
+    facility_code_lookup: Dict[str, str] = {f: normalize_duid(f) for f in set(facility_codes)}
+
+    def _clean_value_column(field_name: Optional[str]) -> List[Any]:
+        values = _column_values(records, field_name)
+
+        if values is None:
+            return [None] * len(intervals)  # type: ignore
+
+        return clean_float_column(values, as_str=not native_floats)
+
+    generated_values = _clean_value_column(power_field)
+    energy_values = _clean_value_column(energy_field)
+
+    return_records: List[Dict] = []
+
+    for interval_value, facility_code_value, generated, energy in zip(
+        intervals, facility_codes, generated_values, energy_values
     ):
-        if pk_values not in return_records_grouped:
-            return_records_grouped[pk_values] = list(rec_value).pop()
+        trading_interval = interval_lookup[interval_value]
+        facility_code = facility_code_lookup[facility_code_value]
 
-    return_records = list(return_records_grouped.values())
+        if duid and facility_code != duid:
+            continue
 
-    return return_records
+        __rec = {
+            "created_by": created_by,
+            "created_at": created_at,
+            "updated_at": None,
+            "network_id": network.code,
+            "trading_interval": trading_interval,
+            "facility_code": facility_code,
+            "generated": generated,
+            "eoi_quantity": energy,
+            "is_forecast": is_forecast,
+        }
+
+        return_records.append(__rec)
+
+        if limit > 0 and len(return_records) >= limit:
+            break
+
+    if not groupby_filter:
+        return return_records
+
+    return dedup_table_records(return_records, FacilityScada, policy=dedup_policy)
 
 
 def generate_balancing_summary(
@@ -152,9 +258,11 @@ def generate_balancing_summary(
     if spider and hasattr(spider, "name"):
         created_by = spider.name
 
+    date_parser = DateColumnParser(network=network, dayfirst=False)
+
     for row in records:
 
-        trading_interval = parse_date(row[interval_field], network=network, dayfirst=False)
+        trading_interval = date_parser.parse(row[interval_field])
 
         network_region = None
 
@@ -202,15 +310,13 @@ def get_interconnector_facility(facility_code: str) -> Facility:
 
 
 def process_dispatch_interconnectorres(table: Dict, spider: Spider) -> Dict:
-    session = SessionLocal()
-    engine = get_database_engine()
-
     if "records" not in table:
         raise Exception("Invalid table no records")
 
     records = table["records"]
 
     records_to_store = []
+    date_parser = DateColumnParser(network=NetworkNEM, dayfirst=False)
 
     for record in records:
         ti_value = None
@@ -224,7 +330,7 @@ def process_dispatch_interconnectorres(table: Dict, spider: Spider) -> Dict:
         if not ti_value:
             raise Exception("Require a trading interval")
 
-        trading_interval = parse_date(ti_value, network=NetworkNEM, dayfirst=False)
+        trading_interval = date_parser.parse(ti_value)
 
         if not trading_interval:
             continue
@@ -243,38 +349,17 @@ def process_dispatch_interconnectorres(table: Dict, spider: Spider) -> Dict:
         )
 
     # remove duplicates
-    return_records_grouped = {}
-
-    for pk_values, rec_value in groupby(
-        records_to_store,
-        key=lambda r: (
-            r.get("trading_interval"),
-            r.get("network_id"),
-            r.get("facility_code"),
-        ),
-    ):
-        if pk_values not in return_records_grouped:
-            return_records_grouped[pk_values] = list(rec_value).pop()
-
-    records_to_store = list(return_records_grouped.values())
+    records_to_store = dedup_table_records(records_to_store, FacilityScada)
 
     # insert
-    stmt = insert(FacilityScada).values(records_to_store)
-    stmt.bind = engine
-    stmt = stmt.on_conflict_do_update(
-        index_elements=["trading_interval", "network_id", "facility_code", "is_forecast"],
-        set_={"generated": stmt.excluded.generated},
-    )
-
     try:
-        session.execute(stmt)
-        session.commit()
+        upsert_records(FacilityScada, records_to_store, update_fields=["generated"])
     except Exception as e:
         logger.error("Error inserting records")
         logger.error(e)
-        return {"num_records": 0}
-    finally:
-        session.close()
+        return {"num_records": 0, "num_errors": 1}
+
+    facility_scada_stored(records_to_store)
 
     return {"num_records": len(records_to_store)}
 
@@ -284,9 +369,6 @@ def process_case_solutions(table: Dict, spider: Spider):
 
 
 def process_trading_price(table: Dict, spider: Spider) -> Dict[str, Any]:
-    session = SessionLocal()
-    engine = get_database_engine()
-
     if "records" not in table:
         raise Exception("Invalid table no records")
 
@@ -295,26 +377,16 @@ def process_trading_price(table: Dict, spider: Spider) -> Dict[str, Any]:
     limit = None
     records_to_store = []
     records_processed = 0
-    primary_keys = []
+    date_parser = DateColumnParser(
+        network=NetworkNEM, dayfirst=False, date_format="%Y/%m/%d %H:%M:%S"
+    )
 
     for record in records:
-        trading_interval = parse_date(
-            record["SETTLEMENTDATE"],
-            network=NetworkNEM,
-            dayfirst=False,
-            date_format="%Y/%m/%d %H:%M:%S",
-        )
+        trading_interval = date_parser.parse(record["SETTLEMENTDATE"])
 
         if not trading_interval:
             continue
 
-        _pk = set([trading_interval, record["REGIONID"]])
-
-        if _pk in primary_keys:
-            continue
-
-        primary_keys.append(_pk)
-
         price = None
 
         if "RRP" in record:
@@ -336,30 +408,23 @@ def process_trading_price(table: Dict, spider: Spider) -> Dict[str, Any]:
             logger.info("Reached limit of: {} {}".format(limit, records_processed))
             break
 
-    stmt = insert(BalancingSummary).values(records_to_store)
-    stmt.bind = engine
-    stmt = stmt.on_conflict_do_update(
-        index_elements=["trading_interval", "network_id", "network_region"],
-        set_={"price": stmt.excluded.price},
+    records_to_store = dedup_table_records(
+        records_to_store, BalancingSummary, policy=DedupPolicy.first
     )
 
     try:
-        session.execute(stmt)
-        session.commit()
+        upsert_records(BalancingSummary, records_to_store, update_fields=["price"])
     except Exception as e:
         logger.error("Error inserting records")
         logger.error(e)
-        return {"num_records": 0}
-    finally:
-        session.close()
+        return {"num_records": 0, "num_errors": 1}
+
+    invalidate_stats_cache_for_records(records_to_store)
 
     return {"num_records": len(records_to_store)}
 
 
 def process_dispatch_regionsum(table: Dict[str, Any], spider: Spider) -> Dict:
-    session = SessionLocal()
-    engine = get_database_engine()
-
     if "records" not in table:
         raise Exception("Invalid table no records")
 
@@ -368,26 +433,16 @@ def process_dispatch_regionsum(table: Dict[str, Any], spider: Spider) -> Dict:
     limit = None
     records_to_store = []
     records_processed = 0
-    primary_keys = []
+    date_parser = DateColumnParser(
+        network=NetworkNEM, dayfirst=False, date_format="%Y/%m/%d %H:%M:%S"
+    )
 
     for record in records:
-        trading_interval = parse_date(
-            record["SETTLEMENTDATE"],
-            network=NetworkNEM,
-            dayfirst=False,
-            date_format="%Y/%m/%d %H:%M:%S",
-        )
+        trading_interval = date_parser.parse(record["SETTLEMENTDATE"])
 
         if not trading_interval:
             continue
 
-        _pk = set([trading_interval, record["REGIONID"]])
-
-        if _pk in primary_keys:
-            continue
-
-        primary_keys.append(_pk)
-
         net_interchange = None
 
         if "NETINTERCHANGE" in record:
@@ -415,34 +470,27 @@ def process_dispatch_regionsum(table: Dict[str, Any], spider: Spider) -> Dict:
             logger.info("Reached limit of: {} {}".format(limit, records_processed))
             break
 
-    stmt = insert(BalancingSummary).values(records_to_store)
-    stmt.bind = engine
-    stmt = stmt.on_conflict_do_update(
-        index_elements=["trading_interval", "network_id", "network_region"],
-        set_={
-            "net_interchange": stmt.excluded.net_interchange,
-            "demand_total": stmt.excluded.demand_total,
-        },
+    records_to_store = dedup_table_records(
+        records_to_store, BalancingSummary, policy=DedupPolicy.first
     )
 
     try:
-        session.execute(stmt)
-        session.commit()
+        upsert_records(
+            BalancingSummary,
+            records_to_store,
+            update_fields=["net_interchange", "demand_total"],
+        )
     except Exception as e:
         logger.error("Error inserting records")
         logger.error(e)
-        return {"num_records": 0}
+        return {"num_records": 0, "num_errors": 1}
 
-    finally:
-        session.close()
+    invalidate_stats_cache_for_records(records_to_store)
 
     return {"num_records": len(records_to_store)}
 
 
 def process_trading_regionsum(table: Dict[str, Any], spider: Spider) -> Dict:
-    session = SessionLocal()
-    engine = get_database_engine()
-
     if "records" not in table:
         raise Exception("Invalid table no records")
 
@@ -451,26 +499,16 @@ def process_trading_regionsum(table: Dict[str, Any], spider: Spider) -> Dict:
     limit = None
     records_to_store = []
     records_processed = 0
-    primary_keys = []
+    date_parser = DateColumnParser(
+        network=NetworkNEM, dayfirst=False, date_format="%Y/%m/%d %H:%M:%S"
+    )
 
     for record in records:
-        trading_interval = parse_date(
-            record["SETTLEMENTDATE"],
-            network=NetworkNEM,
-            dayfirst=False,
-            date_format="%Y/%m/%d %H:%M:%S",
-        )
+        trading_interval = date_parser.parse(record["SETTLEMENTDATE"])
 
         if not trading_interval:
             continue
 
-        _pk = set([trading_interval, record["REGIONID"]])
-
-        if _pk in primary_keys:
-            continue
-
-        primary_keys.append(_pk)
-
         demand_total = None
 
         if "TOTALDEMAND" in record:
@@ -492,25 +530,18 @@ def process_trading_regionsum(table: Dict[str, Any], spider: Spider) -> Dict:
             logger.info("Reached limit of: {} {}".format(limit, records_processed))
             break
 
-    stmt = insert(BalancingSummary).values(records_to_store)
-    stmt.bind = engine
-    stmt = stmt.on_conflict_do_update(
-        index_elements=["trading_interval", "network_id", "network_region"],
-        set_={
-            "demand_total": stmt.excluded.demand_total,
-        },
+    records_to_store = dedup_table_records(
+        records_to_store, BalancingSummary, policy=DedupPolicy.first
     )
 
     try:
-        session.execute(stmt)
-        session.commit()
+        upsert_records(BalancingSummary, records_to_store, update_fields=["demand_total"])
     except Exception as e:
         logger.error("Error inserting records")
         logger.error(e)
-        return {"num_records": 0}
+        return {"num_records": 0, "num_errors": 1}
 
-    finally:
-        session.close()
+    invalidate_stats_cache_for_records(records_to_store)
 
     return {"num_records": len(records_to_store)}
 
@@ -524,12 +555,13 @@ def process_unit_scada(table: Dict[str, Any], spider: Spider) -> Dict:
 
     item["table_schema"] = FacilityScada
     item["update_fields"] = ["generated"]
-    item["records"] = unit_scada_generate_facility_scada(
+    item["records"] = unit_scada_generate_facility_scada_batch(
         records,
         spider,
         power_field="SCADAVALUE",
         network=NetworkNEM,
         date_format="%Y/%m/%d %H:%M:%S",
+        native_floats=RecordsToBinaryCopyPipeline in get_spider_pipelines(spider),
     )
     item["content"] = ""
 
@@ -567,7 +599,7 @@ def process_meter_data_gen_duid(table: Dict[str, Any], spider: Spider) -> Dict:
 
     item["table_schema"] = FacilityScada
     item["update_fields"] = ["generated"]
-    item["records"] = unit_scada_generate_facility_scada(
+    item["records"] = unit_scada_generate_facility_scada_batch(
         records,
         spider,
         network=NetworkNEM,
@@ -668,7 +700,90 @@ TABLE_PROCESSOR_MAP = {
 }
 
 
+def process_table(table: Dict[str, Any], spider: Optional[Spider] = None) -> Optional[Dict]:
+    """
+    Run a single AEMO table through its processor from TABLE_PROCESSOR_MAP
+    """
+    if "name" not in table:
+        logger.info("Invalid table found")
+        return None
+
+    table_name = table["name"]
+
+    if table_name not in TABLE_PROCESSOR_MAP:
+        logger.info("No processor for table %s", table_name)
+        return None
+
+    process_meth = TABLE_PROCESSOR_MAP[table_name]
+
+    if process_meth not in globals():
+        logger.info("Invalid processing function %s", process_meth)
+        return None
+
+    logger.info("processing table {}".format(table_name))
+
+    try:
+        record_item = globals()[process_meth](table, spider=spider)
+    except Exception:
+        # flagged as failed so the file isn't marked ingested
+        logger.exception("Error processing table %s", table_name)
+        return {"num_records": 0, "num_errors": 1}
+
+    return record_item
+
+
+def process_table_stream(
+    file_handle: IO[bytes],
+    spider: Optional[Spider] = None,
+    batch_size: int = AEMO_PARSER_BATCH_SIZE,
+) -> Generator[Dict, None, None]:
+    """
+    Streams an AEMO CSV file or zip handle through the table processors a
+    batch at a time, yielding the processed record items as they are generated
+    so that large archives can be stored with bounded memory.
+    """
+    for table_name, fields, records in parse_aemo_file_stream(
+        file_handle, batch_size=batch_size, columnar=True
+    ):
+        table = {"name": table_name, "fields": fields, "records": records}
+
+        record_item = process_table(table, spider=spider)
+
+        if record_item:
+            yield record_item
+
+
 class NemwebUnitScadaOpenNEMStorePipeline(object):
+    """
+    Runs the tables in an item through the table processors. Tables that fail
+    are logged and the remaining tables are still processed.
+
+    Streamed files are stored a batch at a time as the batches are processed
+    so that the whole file isn't held in memory. Other items return the record
+    sets for the bulk inserter
+
+    """
+
+    def __init__(self) -> None:
+        self.bulk_inserter = BulkInsertPipeline()
+
+    def close_spider(self, spider: Spider) -> None:
+        self.bulk_inserter.close_spider(spider)
+
+    def store_batch(self, record_item: Dict[str, Any], spider: Spider) -> Dict[str, Any]:
+        """
+        Bulk insert a record set from a streamed batch. Returns the record
+        counts in place of the records
+        """
+        spider_pipelines = get_spider_pipelines(spider)
+
+        if BulkInsertPipeline not in spider_pipelines:
+            return {"num_records": 0}
+
+        return self.bulk_inserter.bulk_insert_record_set(
+            record_item, spider, binary=RecordsToBinaryCopyPipeline in spider_pipelines
+        )
+
     @check_spider_pipeline
     def process_item(self, item, spider=None):
         if not item:
@@ -678,45 +793,52 @@ class NemwebUnitScadaOpenNEMStorePipeline(object):
             logger.error("No item in pipeline: {}".format(msg))
             return {}
 
-        if "tables" not in item:
-            print(item)
-            raise Exception("Invalid item - no tables located")
+        streamed = "table_batches" in item
 
-        if not isinstance(item["tables"], dict):
+        # streamed files are passed through as per-table record batches
+        if streamed:
+            tables = item["table_batches"]
+        elif isinstance(item.get("tables"), dict):
+            tables = item["tables"].values()
+        else:
             raise Exception("Invalid item - no tables located")
 
-        tables = item["tables"]
-
         ret = []
+        num_errors = 0
 
-        for table in tables.values():
-            if "name" not in table:
-                logger.info("Invalid table found")
-                continue
+        for table in tables:
+            start = perf_counter()
+
+            record_item = process_table(table, spider=spider)
 
-            table_name = table["name"]
+            record_table_step(
+                table.get("name") or "unknown",
+                spider,
+                perf_counter() - start,
+                count_item_records(record_item),
+            )
 
-            if table_name not in TABLE_PROCESSOR_MAP:
-                logger.info("No processor for table %s", table_name)
+            if not record_item:
                 continue
 
-            process_meth = TABLE_PROCESSOR_MAP[table_name]
+            if streamed and "table_schema" in record_item:
+                record_item = self.store_batch(record_item, spider)
 
-            if process_meth not in globals():
-                logger.info("Invalid processing function %s", process_meth)
-                continue
+            # processors that store their own records flag failed upserts
+            num_errors += record_item.get("num_errors") or 0
 
-            logger.info("processing table {}".format(table_name))
+            if not streamed:
+                ret.append(record_item)
 
-            record_item = None
+        # links with failed tables are left to be fetched again
+        if "link" in item and getattr(spider, "skip_seen", False) and not num_errors:
+            bulk_items = [i for i in ret if isinstance(i, dict) and "table_schema" in i]
 
-            try:
-                record_item = globals()[process_meth](table, spider=spider)
-            except Exception as e:
-                print("error running command")
-                # logger.error(e)
+            # the bulk inserter marks the link ingested once the records are stored
+            for bulk_item in bulk_items:
+                bulk_item["link"] = item["link"]
 
-            if record_item:
-                ret.append(record_item)
+            if not bulk_items:
+                mark_crawl_files_ingested([item["link"]])
 
         return ret
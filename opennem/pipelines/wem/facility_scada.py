@@ -2,19 +2,58 @@ import csv
 import logging
 from datetime import datetime, timedelta
 
-from sqlalchemy.dialects.postgresql import insert
-
+from opennem.core.facility_scada import (
+    facility_scada_stored,
+    filter_revision_window,
+    get_revision_cutoff,
+)
 from opennem.core.normalizers import normalize_duid
-from opennem.db import SessionLocal, get_database_engine
 from opennem.db.models.opennem import FacilityScada
+from opennem.db.upsert import upsert_records
 from opennem.pipelines.nem.opennem import unit_scada_generate_facility_scada
 from opennem.schema.network import NetworkWEM
 from opennem.utils.dates import parse_date
+from opennem.utils.dedup import dedup_table_records
 from opennem.utils.pipelines import check_spider_pipeline
 
 logger = logging.getLogger(__name__)
 
 
+def filter_incremental(item, spider=None):
+    """
+    Incremental spiders only write records inside the revision window of the
+    latest stored interval. The spider can set `revision_window` in minutes
+    and `incremental_field` to use the latest interval with that field set
+    """
+    if not getattr(spider, "incremental", False):
+        return item
+
+    cutoff = get_revision_cutoff(
+        NetworkWEM,
+        getattr(spider, "revision_window", None),
+        field=getattr(spider, "incremental_field", None),
+    )
+
+    records, num_skipped = filter_revision_window(item["records"], cutoff)
+
+    item["records"] = records
+    item["num_skipped"] = num_skipped
+
+    stats = getattr(getattr(spider, "crawler", None), "stats", None)
+
+    if stats:
+        stats.inc_value("facility_scada/written", len(records), spider=spider)
+        stats.inc_value("facility_scada/skipped", num_skipped, spider=spider)
+
+    logger.info(
+        "{}: writing {} records, skipped {} before {}".format(
+            getattr(spider, "name", "facility scada"), len(records), num_skipped, cutoff
+        )
+    )
+
+    return item
+
+
 class WemStoreFacilityScada(object):
     @check_spider_pipeline
     def process_item(self, item, spider=None):
@@ -37,7 +76,7 @@ class WemStoreFacilityScada(object):
         )
         item["content"] = None
 
-        return item
+        return filter_incremental(item, spider)
 
 
 class WemStoreFacilityIntervals(object):
@@ -61,7 +100,7 @@ class WemStoreFacilityIntervals(object):
         )
         item["content"] = None
 
-        return item
+        return filter_incremental(item, spider)
 
 
 class WemStoreLiveFacilityScada(object):
@@ -75,9 +114,6 @@ class WemStoreLiveFacilityScada(object):
     @check_spider_pipeline
     def process_item(self, item, spider=None):
 
-        session = SessionLocal()
-        engine = get_database_engine()
-
         csvreader = csv.DictReader(item["content"].split("\n"))
 
         records_to_store = []
@@ -128,23 +164,14 @@ class WemStoreLiveFacilityScada(object):
                     }
                 )
 
-        stmt = insert(FacilityScada).values(records_to_store)
-        stmt.bind = engine
-        stmt = stmt.on_conflict_do_update(
-            index_elements=["trading_interval", "network_id", "facility_code", "is_forecast"],
-            set_={
-                # "updated_by": stmt.excluded.created_by,
-                "eoi_quantity": stmt.excluded.eoi_quantity,
-            },
-        )
+        records_to_store = dedup_table_records(records_to_store, FacilityScada)
 
         try:
-            session.execute(stmt)
-            session.commit()
+            upsert_records(FacilityScada, records_to_store, update_fields=["eoi_quantity"])
         except Exception as e:
             logger.error("Error inserting records")
             logger.error(e)
-        finally:
-            session.close()
+        else:
+            facility_scada_stored(records_to_store)
 
         return len(records_to_store)
@@ -45,9 +45,34 @@ class OpennemSettings(BaseSettings):
     # show database debug
     db_debug: bool = False
 
+    # connection pool for async api queries
+    # see opennem.db
+    db_async_pool_min: int = 2
+    db_async_pool_max: int = 20
+
     # cache scada values for
     cache_scada_values_ttl_sec: int = 60 * 5
 
+    # cache stats api responses in process and share them through redis at
+    # cache_url if it's enabled. ingest invalidations only reach the api
+    # through redis, without it responses are cached briefly in process
+    # see opennem.api.stats.cache
+    cache_stats_enabled: bool = True
+    cache_redis_enabled: bool = False
+
+    # minutes before the latest stored interval that incremental scada crawls
+    # still write since they can be revised
+    # see opennem.core.facility_scada
+    scada_revision_window_min: int = 60 * 2
+
+    # number of records copied per transaction in bulk inserts
+    # see opennem.pipelines.bulk_insert
+    bulk_insert_row_limit: int = 100000
+
+    # number of records per statement in batched upserts
+    # see opennem.db.upsert
+    upsert_batch_size: int = 5000
+
     # asgi server settings
     server_host: str = "0.0.0.0"
     server_port: int = 8000
@@ -120,6 +145,13 @@ class OpennemSettings(BaseSettings):
             "server_port": {"env": "PORT"},
             "server_host": {"env": "HOST"},
             "cache_scada_values_ttl_sec": {"env": "CACHE_SCADA_TTL"},
+            "cache_stats_enabled": {"env": "CACHE_STATS"},
+            "cache_redis_enabled": {"env": "CACHE_REDIS"},
             "db_debug": {"env": "DB_DEBUG"},
+            "db_async_pool_min": {"env": "DB_ASYNC_POOL_MIN"},
+            "db_async_pool_max": {"env": "DB_ASYNC_POOL_MAX"},
             "http_cache_local": {"env": "HTTP_CACHE_LOCAL"},
+            "bulk_insert_row_limit": {"env": "BULK_INSERT_ROW_LIMIT"},
+            "upsert_batch_size": {"env": "UPSERT_BATCH_SIZE"},
+            "scada_revision_window_min": {"env": "SCADA_REVISION_WINDOW"},
         }
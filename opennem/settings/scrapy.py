@@ -82,6 +82,7 @@ ITEM_PIPELINES = {
     "opennem.pipelines.nem.mms.NemStoreMMSParticipant": 555,
     # DB bulk Inserterers
     "opennem.pipelines.csv.RecordsToCSVPipeline": 610,
+    "opennem.pipelines.binary_copy.RecordsToBinaryCopyPipeline": 611,
     "opennem.pipelines.bulk_insert.BulkInsertPipeline": 620,
 }
 
@@ -92,3 +93,12 @@ HTTPCACHE_ENABLED = False
 RETRY_ENABLED = True
 RETRY_TIMES = 9
 RETRY_HTTP_CODES = [400, 403, 500, 502, 503, 504, 522, 524, 408, 429]
+
+# Prometheus metrics endpoint for spider stats and pipeline step timings.
+# Enable with -s PROMETHEUS_ENABLED=1
+EXTENSIONS = {
+    "opennem.middlewares.prometheus.WebService": 500,
+}
+
+PROMETHEUS_ENABLED = False
+PROMETHEUS_PORT = [9410]
@@ -2,7 +2,6 @@ import logging
 from datetime import datetime
 from io import BytesIO
 from typing import Dict, Generator
-from zipfile import ZipFile
 
 import scrapy
 
@@ -11,8 +10,7 @@ from opennem.pipelines.csv import RecordsToCSVPipeline
 from opennem.pipelines.nem import ExtractCSV
 from opennem.pipelines.nem.opennem import NemwebUnitScadaOpenNEMStorePipeline
 from opennem.utils.dates import get_date_component, month_series
-from opennem.utils.handlers import _handle_zip, chain_streams
-from opennem.utils.mime import decode_bytes, mime_from_content, mime_from_url
+from opennem.utils.mime import mime_from_content, mime_from_url
 
 logger = logging.getLogger(__name__)
 
@@ -50,40 +48,15 @@ class MMSArchiveBulkSpider(scrapy.Spider):
                 yield scrapy.Request(req_url)
 
     def parse(self, response) -> Generator[Dict, None, None]:
-        content = None
-
         file_mime = mime_from_content(response.body)
 
         if not file_mime:
             file_mime = mime_from_url(response.url)
 
-        if file_mime == "application/zip":
-            with ZipFile(BytesIO(response.body)) as zf:
-                if len(zf.namelist()) == 1:
-                    content = zf.open(zf.namelist()[0]).read()
-
-                c = []
-                stream_count = 0
-
-                for filename in zf.namelist():
-                    if filename.endswith(".zip"):
-                        c.append(_handle_zip(zf.open(filename), "r"))
-                        stream_count += 1
-                    else:
-                        c.append(zf.open(filename))
-
-                content = chain_streams(c).read()
-        else:
-            content = response.body.getvalue()
-
-        if not content:
-            logger.info("No content from scrapy request")
-            return None
-
-        content = decode_bytes(content)
-
         item = {}
-        item["content"] = content
+
+        # zips are parsed a member at a time by ExtractCSV
+        item["file_handle"] = BytesIO(response.body)
         item["extension"] = ".csv"
         item["mime_type"] = file_mime
 
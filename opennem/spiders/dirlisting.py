@@ -8,6 +8,11 @@ from urllib.parse import ParseResult, urlparse
 import scrapy
 from scrapy import Spider
 
+from opennem.core.crawl_index import (
+    crawl_file_is_ingested,
+    get_conditional_headers,
+    get_crawl_files,
+)
 from opennem.schema.network import NetworkNEM
 from opennem.utils.dates import parse_date
 
@@ -28,13 +33,15 @@ def parse_dirlisting(raw_string: str) -> Dict[str, Any]:
     will parse and return both the date and listing type
 
     @param raw_string - the raw directory listing string
-    @return dict of the date in iso format and the type (file or directory)
+    @return dict of the date in iso format, the type (file or directory)
+        and the size of files
     """
     components = raw_string.split(" " * PADDING_WIDTH)
     components = [i.strip() for i in components]
     components = list(filter(lambda x: x != "", components))
 
     _ltype = "dir"
+    _size = None
 
     if not components or len(components) < 2:
         logging.debug(components)
@@ -46,6 +53,7 @@ def parse_dirlisting(raw_string: str) -> Dict[str, Any]:
 
     if is_number(components[1]):
         _ltype = "file"
+        _size = int(components[1])
 
     dt = parse_date(components[0], network=NetworkNEM)
 
@@ -59,6 +67,7 @@ def parse_dirlisting(raw_string: str) -> Dict[str, Any]:
     return {
         "date": dt.isoformat(),
         "type": _ltype,
+        "size": _size,
     }
 
 
@@ -92,6 +101,9 @@ class DirlistingSpider(Spider):
 
     custom_settings: Optional[Dict] = {}
 
+    # skip files in the crawl index that have been ingested
+    skip_seen: bool = False
+
     def start_requests(self) -> Generator[scrapy.Request, None, None]:
         starts = []
 
@@ -112,6 +124,26 @@ class DirlistingSpider(Spider):
         for url in starts:
             yield scrapy.Request(url)
 
+    def get_listing_sizes(self, response) -> Dict[str, Optional[int]]:
+        """
+        Get the file sizes from the listing text preceding each link
+        """
+        sizes: Dict[str, Optional[int]] = {}
+
+        for anchor in response.xpath("//body/pre/a"):
+            link = anchor.xpath("@href").get()
+            listing = anchor.xpath("preceding-sibling::text()[1]").get()
+
+            if not link or not listing:
+                continue
+
+            try:
+                sizes[response.urljoin(link)] = parse_dirlisting(listing)["size"]
+            except Exception:
+                sizes[response.urljoin(link)] = None
+
+        return sizes
+
     def parse(self, response) -> Generator[Dict[str, Any], None, None]:
         links = list(
             reversed([i.get() for i in response.xpath("//body/pre/a/@href")])
@@ -119,6 +151,13 @@ class DirlistingSpider(Spider):
 
         parsed = 0
 
+        sizes: Dict[str, Optional[int]] = {}
+        crawl_files: Dict[str, Dict[str, Any]] = {}
+
+        if self.skip_seen:
+            sizes = self.get_listing_sizes(response)
+            crawl_files = get_crawl_files([response.urljoin(link) for link in links])
+
         if self.limit > 0 and self.skip > 0:
             self.limit = self.limit + self.skip
 
@@ -159,6 +198,37 @@ class DirlistingSpider(Spider):
                 )
                 continue
 
+            # checked after the limit and skip so that they select the same
+            # files whether or not they've been seen
+            if self.skip_seen and crawl_file_is_ingested(
+                crawl_files.get(link), size=sizes.get(link)
+            ):
+                self.log(f"Already ingested {link}", logging.DEBUG)
+                continue
+
             self.log("Getting {}".format(link), logging.INFO)
 
-            yield {"link": link}
+            crawl_file = crawl_files.get(link)
+
+            yield scrapy.Request(
+                link,
+                callback=self.parse_link,
+                headers=get_conditional_headers(crawl_file),
+                meta={"link": link, "crawl_file": crawl_file},
+            )
+
+    def parse_link(self, response) -> Generator[Dict[str, Any], None, None]:
+        """
+        Pass the downloaded link on to LinkExtract. Unmodified links
+        (304) are filtered out by the downloader
+        """
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        yield {
+            "link": response.meta["link"],
+            "body": response.body,
+            "etag": etag.decode() if etag else None,
+            "last_modified": last_modified.decode() if last_modified else None,
+            "crawl_file": response.meta["crawl_file"],
+        }
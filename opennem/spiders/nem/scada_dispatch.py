@@ -1,3 +1,4 @@
+from opennem.pipelines.binary_copy import RecordsToBinaryCopyPipeline
 from opennem.pipelines.bulk_insert import BulkInsertPipeline
 from opennem.pipelines.csv import RecordsToCSVPipeline
 from opennem.pipelines.nem.opennem import NemwebUnitScadaOpenNEMStorePipeline
@@ -37,11 +38,12 @@ class NemwebArchiveDispatchScada(NemwebSpider):
     name = "au.nem.archive.dispatch_scada"
     start_url = "http://www.nemweb.com.au/Reports/ARCHIVE/Dispatch_SCADA/"
 
+    # archives are copied in the binary format
     pipelines_extra = set(
         [
             NemwebUnitScadaOpenNEMStorePipeline,
             BulkInsertPipeline,
-            RecordsToCSVPipeline,
+            RecordsToBinaryCopyPipeline,
         ]
     )
 
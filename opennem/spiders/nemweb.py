@@ -6,3 +6,9 @@ from opennem.spiders.dirlisting import DirlistingSpider
 class NemwebSpider(DirlistingSpider):
     allowed_domains = ["nemweb.com.au"]
     pipelines = set([LinkExtract, ExtractCSV])
+
+    # ExtractCSV parses the downloaded file as a stream
+    stream_content = True
+
+    # only fetch files that haven't been ingested
+    skip_seen = True
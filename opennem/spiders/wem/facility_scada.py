@@ -21,6 +21,9 @@ class WemLiveFacilityIntervals(WemCurrentSpider):
         [WemStoreFacilityIntervals, RecordsToCSVPipeline, BulkInsertPipeline]
     )
 
+    # only write intervals that can still be revised
+    incremental = True
+
     start_url = "https://aemo.com.au/aemo/data/wa/infographic/facility-intervals-last96.csv"
 
 
@@ -30,7 +33,16 @@ class WemCurrentFacilityScada(WemCurrentSpider):
         [WemStoreFacilityScada, RecordsToCSVPipeline, BulkInsertPipeline]
     )
 
-    start_url = "http://data.wa.aemo.com.au/public/public-data/datafiles/facility-scada/facility-scada-{year}-{month}.csv"
+    # only write intervals that can still be revised. The live intervals
+    # spider writes later intervals without eoi_quantity which only comes
+    # from this file
+    incremental = True
+    incremental_field = "eoi_quantity"
+
+    start_url = (
+        "http://data.wa.aemo.com.au/public/public-data/datafiles/facility-scada/"
+        "facility-scada-{year}-{month}.csv"
+    )
 
 
 class WemHistoricFacilityScada(WemHistoricSpider):
@@ -1,17 +1,27 @@
 """
     Module to handle zip files
 
+    Archives are read a member at a time with embedded zips opened as they
+    are reached so the decompressed contents are never held in memory. Parsers
+    take each member as its own stream
 
 """
 import io
 from io import BytesIO
-from typing import IO
+from tempfile import TemporaryFile
+from typing import IO, Generator, Iterable, Tuple
 from zipfile import ZipFile
 
 # limit how many zips within zips we'll parse
 # 0 means all
 ZIP_LIMIT = 0
 
+# embedded zips are copied out to be seekable and are kept in memory up
+# to this size before spilling to disk
+ZIP_SPOOL_SIZE = 32 * 1024 * 1024
+
+ZIP_CHUNK_SIZE = 1024 * 1024
+
 
 def chain_streams(streams, buffer_size=io.DEFAULT_BUFFER_SIZE):
     """
@@ -88,29 +98,97 @@ def fix_central_directory(zfile: BytesIO) -> BytesIO:
     return zfile
 
 
-def stream_zip_contents(file_obj: IO[bytes], mode: str = "w"):
+def iter_zip_members(file_obj: IO[bytes]) -> Generator[Tuple[str, IO[bytes]], None, None]:
     """
-    Steram out the entire contents of a zipfile
-    handling embedded zips
-
-    mode param is to compat with external libs like smart_open
+    Yield the name and a binary stream for each file in a zip one at a
+    time, descending into embedded zips. Each stream is closed once the
+    next member is requested
     """
     with ZipFile(file_obj) as zf:
-        # If there is only one file in the archive return it
-        if len(zf.namelist()) == 1:
-            return zf.open(zf.namelist()[0])
-
-        c = []
         stream_count = 0
 
-        for filename in zf.namelist():
-            if filename.endswith(".zip"):
+        for member in zf.infolist():
+            if member.is_dir():
+                continue
+
+            if member.filename.lower().endswith(".zip"):
                 if ZIP_LIMIT > 0 and stream_count >= ZIP_LIMIT:
                     continue
 
-                c.append(stream_zip_contents(zf.open(filename), mode))
                 stream_count += 1
-            else:
-                c.append(zf.open(filename))
 
-        return chain_streams(c)
+                # seeking within a compressed member restarts decompression
+                # so copy the embedded zip out first
+                with zf.open(member) as member_stream:
+                    embedded_zip = spool_chunks(
+                        iter(lambda: member_stream.read(ZIP_CHUNK_SIZE), b"")
+                    )
+
+                with embedded_zip:
+                    yield from iter_zip_members(embedded_zip)
+
+                continue
+
+            with zf.open(member) as member_stream:
+                yield member.filename, member_stream
+
+
+def spool_chunks(chunks: Iterable[bytes], max_size: int = ZIP_SPOOL_SIZE) -> IO[bytes]:
+    """
+    Write chunks to a seekable buffer that is kept in memory up to max_size
+    and moved to a temporary file past that. Returned rewound to the start
+    """
+    spool: IO[bytes] = BytesIO()
+    size = 0
+
+    for chunk in chunks:
+        size += len(chunk)
+
+        if size > max_size and isinstance(spool, BytesIO):
+            spool_file = TemporaryFile()
+            spool_file.write(spool.getvalue())
+            spool = spool_file  # type: ignore
+
+        spool.write(chunk)
+
+    spool.seek(0)
+
+    return spool
+
+
+def stream_zip_members(
+    file_obj: IO[bytes], encoding: str = "utf-8-sig"
+) -> Generator[Tuple[str, IO[str]], None, None]:
+    """
+    Yield the name and a text stream for each file in a zip including
+    those in embedded zips
+    """
+    for filename, member_stream in iter_zip_members(file_obj):
+        text_stream = io.TextIOWrapper(
+            member_stream, encoding=encoding, errors="replace", newline=""  # type: ignore
+        )
+
+        try:
+            yield filename, text_stream
+        finally:
+            # don't close the member stream, iter_zip_members does that
+            text_stream.detach()
+
+
+def read_zip_contents(file_obj: IO[bytes]) -> bytes:
+    """
+    Read the contents of every file in a zip including those in embedded
+    zips. Each member is ended with a newline so that the last line of one
+    isn't joined to the first line of the next
+    """
+    contents = []
+
+    for _, member_stream in iter_zip_members(file_obj):
+        content = member_stream.read()
+
+        if content and not content.endswith(b"\n"):
+            content += b"\n"
+
+        contents.append(content)
+
+    return b"".join(contents)
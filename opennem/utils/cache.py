@@ -1,13 +1,36 @@
 """
 OpenNEM cache utilities
 
+Scada ranges (the first and last interval in facility_scada for networks and
+facilities) are cached in redis at `settings.cache_url` so that they're shared
+between the API and task workers if `settings.cache_redis_enabled` is set, with
+a short lived copy kept in process. Without redis they're only cached in
+process.
+
+Misses are single flight: one worker runs the range query while the others
+wait on a lock and read its result. Ingest pipelines push the latest interval
+they wrote with `extend_scada_range_cache` so that cached ranges stay current
+rather than expiring and being queried again.
+
 """
 import logging
+import threading
+from datetime import datetime
 from functools import wraps
-from typing import Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 from cachetools import TTLCache
 
+try:
+    import redis
+    from redis.exceptions import LockError, RedisError
+
+    HAVE_REDIS = True
+except ImportError:
+    HAVE_REDIS = False
+
+    RedisError = LockError = Exception  # type: ignore
+
 from opennem.api.stats.schema import ScadaDateRange
 from opennem.schema.network import NetworkSchema
 from opennem.settings import settings
@@ -16,13 +39,194 @@ logger = logging.getLogger(__name__)
 
 CACHE_AGE = settings.cache_scada_values_ttl_sec
 
-scada_cache: TTLCache = TTLCache(maxsize=100, ttl=CACHE_AGE)
+# ranges are shared through redis so the local copy is only kept briefly
+SCADA_RANGE_LOCAL_AGE = 30
+
+scada_cache: TTLCache = TTLCache(
+    maxsize=1000, ttl=SCADA_RANGE_LOCAL_AGE if settings.cache_redis_enabled else CACHE_AGE
+)
+
+SCADA_RANGE_PREFIX = "opennem:scada_range:"
+
+SCADA_RANGE_INDEX_PREFIX = "opennem:scada_range_index:"
+
+SCADA_RANGE_LOCK_PREFIX = "opennem:scada_range_lock:"
+
+# how long a worker can hold the lock for a range query and how long the
+# others wait on it before querying themselves
+SCADA_RANGE_LOCK_TIMEOUT = 60
+
+SCADA_RANGE_LOCK_WAIT = 30
+
+# shared caches are best effort so don't hold up requests waiting on redis
+REDIS_SOCKET_TIMEOUT = 0.5
+
+_redis_client: Optional[Any] = None
+
+# in process misses are single flight on a fixed set of locks
+_local_locks = [threading.Lock() for _ in range(64)]
+
+
+def get_redis_client() -> Optional[Any]:
+    """
+    Get the shared redis client for `settings.cache_url`. None if redis isn't
+    installed or `settings.cache_redis_enabled` isn't set
+    """
+    global _redis_client
+
+    if not HAVE_REDIS or not settings.cache_redis_enabled:
+        return None
+
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            settings.cache_url,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        )
+
+    return _redis_client
+
+
+def get_scada_range_key(
+    network_codes: Iterable[str], facility_codes: Optional[Iterable[str]] = None
+) -> str:
+    """
+    Key for a scada range. Networks and facilities are sorted so the order
+    they're passed in doesn't matter
+    """
+    return "{}:{}".format(
+        ",".join(sorted(set(network_codes))), ",".join(sorted(set(facility_codes or [])))
+    )
+
+
+def _parse_scada_range_key(key: str) -> List[List[str]]:
+    network_part, facility_part = key.split(":", 1)
+
+    return [network_part.split(","), facility_part.split(",") if facility_part else []]
+
+
+def get_cached_scada_ranges(keys: List[str]) -> Dict[str, ScadaDateRange]:
+    """
+    Get the cached ranges for a list of keys. Keys that aren't cached are
+    left out
+    """
+    scada_ranges = {}
+    keys_missing = []
+
+    for key in keys:
+        scada_range = scada_cache.get(key)
+
+        if scada_range:
+            scada_ranges[key] = scada_range.copy()
+        else:
+            keys_missing.append(key)
+
+    client = get_redis_client()
+
+    if not client or not keys_missing:
+        return scada_ranges
+
+    try:
+        values = client.mget([SCADA_RANGE_PREFIX + k for k in keys_missing])
+    except RedisError as e:
+        logger.error("Could not read scada range cache: {}".format(e))
+        return scada_ranges
+
+    for key, value in zip(keys_missing, values):
+        if value is None:
+            continue
+
+        scada_range = ScadaDateRange.parse_raw(value)
+        scada_cache[key] = scada_range
+        scada_ranges[key] = scada_range.copy()
+
+    return scada_ranges
+
+
+def get_cached_scada_range(key: str) -> Optional[ScadaDateRange]:
+    return get_cached_scada_ranges([key]).get(key)
+
+
+def set_cached_scada_range(key: str, scada_range: ScadaDateRange) -> None:
+    scada_cache[key] = scada_range
+
+    client = get_redis_client()
+
+    if not client:
+        return None
+
+    network_codes, _ = _parse_scada_range_key(key)
+
+    try:
+        pipe = client.pipeline()
+        pipe.set(SCADA_RANGE_PREFIX + key, scada_range.json(), ex=CACHE_AGE)
+
+        # keys are indexed by network so ingest can find the ranges to extend
+        for network_code in network_codes:
+            pipe.sadd(SCADA_RANGE_INDEX_PREFIX + network_code, key)
+
+        pipe.execute()
+    except RedisError as e:
+        logger.error("Could not write scada range cache: {}".format(e))
+
+
+def single_flight(key: str, get_cached: Callable[[], Any], compute: Callable[[], Any]) -> Any:
+    """
+    Compute a missing cache value once across threads and workers. Waiters
+    read the value computed while they were waiting. If the lock can't be
+    had the value is computed anyway
+    """
+    with _local_locks[hash(key) % len(_local_locks)]:
+        value = get_cached()
+
+        if value is not None:
+            return value
+
+        client = get_redis_client()
+        lock = None
+
+        if client:
+            lock = client.lock(
+                SCADA_RANGE_LOCK_PREFIX + key,
+                timeout=SCADA_RANGE_LOCK_TIMEOUT,
+                blocking_timeout=SCADA_RANGE_LOCK_WAIT,
+            )
+
+            try:
+                if not lock.acquire():
+                    logger.warning("Timed out waiting on scada range lock {}".format(key))
+                    lock = None
+            except RedisError as e:
+                logger.error("Could not lock scada range {}: {}".format(key, e))
+                lock = None
+
+            value = get_cached()
+
+            if value is not None:
+                _release_lock(lock)
+                return value
+
+        try:
+            return compute()
+        finally:
+            _release_lock(lock)
+
+
+def _release_lock(lock: Any) -> None:
+    if not lock:
+        return None
+
+    try:
+        lock.release()
+    except (LockError, RedisError) as e:
+        # the lock expired while the query ran
+        logger.debug("Could not release scada range lock: {}".format(e))
 
 
 def cache_scada_result(func: Callable) -> Callable:
     """
-    Caches the scada_range results in memory since they're called so often
-    by wrapping the function.
+    Caches the scada_range results since they're called so often by
+    wrapping the function. Misses are single flight
     """
 
     @wraps(func)
@@ -32,34 +236,109 @@ def cache_scada_result(func: Callable) -> Callable:
         network_region: Optional[str] = None,
         facilities: Optional[List[str]] = None,
     ) -> Optional[ScadaDateRange]:
-        key_list = []
+        network_codes = []
 
         if network:
-            key_list = [network.code]
+            network_codes = [network.code]
 
         if networks:
-            key_list += [n.code for n in networks]
-
-        if facilities:
-            key_list += facilities
+            network_codes += [n.code for n in networks]
 
-        key = frozenset(key_list)
-        ret: Optional[ScadaDateRange] = None
+        key = get_scada_range_key(network_codes, facilities)
 
-        try:
-            _val: Dict = scada_cache[key]
-            ret = ScadaDateRange(**_val)
-
-            logger.debug("scada range HIT at key: {}".format(key))
+        def _compute() -> Optional[ScadaDateRange]:
+            logger.debug("scada range MISS at key: {}".format(key))
 
-            return ret
-        except KeyError:
             ret = func(network, networks, network_region, facilities)
 
-            logger.debug("scada range MISS at key: {}".format(key))
-
             if ret:
-                scada_cache[key] = ret.dict()
+                set_cached_scada_range(key, ret)
+
             return ret
 
+        return single_flight(key, lambda: get_cached_scada_range(key), _compute)
+
     return _cache_scada_wrapper
+
+
+def _extend_scada_range(scada_range: ScadaDateRange, end: datetime) -> Optional[ScadaDateRange]:
+    try:
+        if end <= scada_range.end:
+            return None
+    except TypeError:
+        # can't compare naive and aware dates
+        return None
+
+    return scada_range.copy(update={"end": end})
+
+
+def extend_scada_range_cache(
+    network_code: str, end: datetime, facility_ends: Optional[Dict[str, datetime]] = None
+) -> int:
+    """
+    Move the end of cached ranges for a network up to the latest interval
+    written. Facility ranges are moved up to the latest interval written for
+    each facility in `facility_ends`. Ranges that aren't cached are left to
+    be queried. Returns the number of ranges extended
+    """
+    facility_ends = facility_ends or {}
+    num_extended = 0
+
+    def _get_end(key: str) -> Optional[datetime]:
+        network_codes, facility_codes = _parse_scada_range_key(key)
+
+        if network_code not in network_codes:
+            return None
+
+        if not facility_codes:
+            return end
+
+        ends = [facility_ends[f] for f in facility_codes if f in facility_ends]
+
+        return max(ends) if ends else None
+
+    for key in list(scada_cache.keys()):
+        key_end = _get_end(key)
+        scada_range = scada_cache.get(key)
+
+        if not key_end or not scada_range:
+            continue
+
+        scada_range = _extend_scada_range(scada_range, key_end)
+
+        if scada_range:
+            scada_cache[key] = scada_range
+            num_extended += 1
+
+    client = get_redis_client()
+
+    if not client:
+        return num_extended
+
+    try:
+        index_key = SCADA_RANGE_INDEX_PREFIX + network_code
+        keys = [k.decode("utf-8") for k in client.smembers(index_key)]
+        keys = [k for k in keys if _get_end(k)]
+        values = client.mget([SCADA_RANGE_PREFIX + k for k in keys]) if keys else []
+        pipe = client.pipeline()
+        stale_keys = []
+
+        for key, value in zip(keys, values):
+            if value is None:
+                stale_keys.append(key)
+                continue
+
+            scada_range = _extend_scada_range(ScadaDateRange.parse_raw(value), _get_end(key))
+
+            if scada_range:
+                pipe.set(SCADA_RANGE_PREFIX + key, scada_range.json(), ex=CACHE_AGE)
+                num_extended += 1
+
+        if stale_keys:
+            pipe.srem(index_key, *stale_keys)
+
+        pipe.execute()
+    except RedisError as e:
+        logger.error("Could not extend scada range cache for {}: {}".format(network_code, e))
+
+    return num_extended
@@ -1,8 +1,10 @@
 import logging
 import math
 from datetime import date, datetime, timedelta, timezone
-from typing import Generator, List, Optional, Tuple, Union
+from threading import Lock
+from typing import Dict, Generator, Iterable, List, Optional, Tuple, Union
 
+from cachetools import LRUCache
 from dateutil.parser import ParserError, parse
 
 from opennem.api.stats.schema import ScadaDateRange
@@ -115,6 +117,128 @@ def parse_date(
     return dt_return
 
 
+# Column date parser
+
+# marker for iso formatted date columns
+DATE_FORMAT_ISO = "iso"
+
+# number of parsed dates to memoize
+DATE_PARSER_CACHE_SIZE = 20000
+
+_date_parser_cache: LRUCache = LRUCache(maxsize=DATE_PARSER_CACHE_SIZE)
+_date_parser_cache_lock = Lock()
+
+
+def detect_date_format(date_str: str, date_format: Optional[str] = None) -> Optional[str]:
+    """
+    Detect the format of a date string by trying iso format, then the passed
+    date_format and then the known DATE_FORMATS. Returns None if none match
+    """
+    try:
+        datetime.fromisoformat(date_str.replace("/", "-"))
+        return DATE_FORMAT_ISO
+    except ValueError:
+        pass
+
+    date_str = normalize_whitespace(date_str)
+    date_formats = [date_format] if date_format else []
+
+    for date_format_str in date_formats + DATE_FORMATS:
+        try:
+            datetime.strptime(date_str, date_format_str)
+        except ValueError:
+            continue
+
+        return date_format_str
+
+    return None
+
+
+class DateColumnParser(object):
+    """
+    Parses a column of date strings.
+
+    The format is detected from the first value and reused for the rest of
+    the column, falling back to `parse_date` for values that don't match.
+    Parsed and localized dates are memoized per parser and in a bounded LRU
+    cache shared between parsers since interval columns repeat the same
+    timestamps.
+    """
+
+    def __init__(
+        self,
+        network: Optional[NetworkSchema] = None,
+        date_format: Optional[str] = None,
+        dayfirst: bool = True,
+    ) -> None:
+        self.network = network
+        self.date_format = date_format
+        self.dayfirst = dayfirst
+        self.detected_format: Optional[str] = None
+        self._network_code = network.code if network else None
+        self._cache: Dict[str, Optional[datetime]] = {}
+
+    def _parse_naive(self, date_str: str) -> Optional[datetime]:
+        if self.detected_format is None:
+            self.detected_format = detect_date_format(date_str, self.date_format) or ""
+
+        try:
+            if self.detected_format == DATE_FORMAT_ISO:
+                return datetime.fromisoformat(date_str.replace("/", "-"))
+
+            if self.detected_format:
+                return datetime.strptime(normalize_whitespace(date_str), self.detected_format)
+        except ValueError:
+            pass
+
+        return parse_date(date_str, date_format=self.date_format, dayfirst=self.dayfirst)
+
+    def parse(self, date_str: Union[str, datetime]) -> Optional[datetime]:
+        if isinstance(date_str, datetime):
+            return parse_date(date_str, network=self.network)
+
+        if date_str in self._cache:
+            return self._cache[date_str]
+
+        key = (date_str, self._network_code, self.date_format, self.dayfirst)
+
+        with _date_parser_cache_lock:
+            dt_return = _date_parser_cache.get(key)
+
+        if dt_return:
+            self._cache[date_str] = dt_return
+            return dt_return
+
+        dt_return = self._parse_naive(date_str)
+
+        if dt_return and self.network:
+            dt_return = parse_date(dt_return, network=self.network)
+
+        with _date_parser_cache_lock:
+            _date_parser_cache[key] = dt_return
+
+        self._cache[date_str] = dt_return
+
+        return dt_return
+
+    def parse_many(self, date_strs: Iterable[Union[str, datetime]]) -> List[Optional[datetime]]:
+        return [self.parse(i) for i in date_strs]
+
+
+def parse_date_column(
+    date_strs: Iterable[Union[str, datetime]],
+    date_format: Optional[str] = None,
+    network: Optional[NetworkSchema] = None,
+    dayfirst: bool = True,
+) -> List[Optional[datetime]]:
+    """
+    Batch parse a column of dates. See `DateColumnParser`
+    """
+    parser = DateColumnParser(network=network, date_format=date_format, dayfirst=dayfirst)
+
+    return parser.parse_many(date_strs)
+
+
 def date_series(
     start: Union[datetime, date] = None,
     end: Union[datetime, date] = None,
@@ -166,17 +290,14 @@ def month_series(
     reverse: bool = False,
 ) -> Generator[datetime, None, None]:
     """
-    Generate a series of months
+    Generate a series of months from start to end inclusive in either order
     """
     step = 1
 
     if end < start:
         step = -1
 
-    if start == end:
-        yield datetime(start.year, start.month, 1)
-
-    for tot_m in range(total_months(start) - 1, total_months(end) - 2, step):
+    for tot_m in range(total_months(start) - 1, total_months(end) - 1 + step, step):
         y, m = divmod(tot_m, 12)
         yield datetime(y, m + 1, 1)
 
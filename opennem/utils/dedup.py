@@ -0,0 +1,53 @@
+"""
+    Record de-duplication on primary keys
+
+    Records are indexed in a dict keyed on the primary key values so
+    de-duplication is linear in the number of records. The default policy
+    of the last record winning matches the `ON CONFLICT DO UPDATE` upserts
+    while `first` matches `ON CONFLICT DO NOTHING`
+
+"""
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+
+class DedupPolicy(Enum):
+    first = "first"
+    last = "last"
+
+
+def table_primary_keys(table: Any) -> List[str]:
+    """Get the primary key column names for a table model"""
+    return [c.name for c in table.__table__.primary_key.columns.values()]
+
+
+def dedup_records(
+    records: Iterable[Dict],
+    primary_keys: Sequence[str],
+    policy: DedupPolicy = DedupPolicy.last,
+) -> List[Dict]:
+    """
+    Remove records with duplicate primary keys keeping either the first
+    or the last record seen for each key. Output is in the order each key
+    was first seen
+    """
+    records_indexed: Dict[Tuple, Dict] = {}
+
+    for record in records:
+        pk = tuple(record.get(k) for k in primary_keys)
+
+        if policy == DedupPolicy.first and pk in records_indexed:
+            continue
+
+        records_indexed[pk] = record
+
+    return list(records_indexed.values())
+
+
+def dedup_table_records(
+    records: Iterable[Dict],
+    table: Any,
+    policy: DedupPolicy = DedupPolicy.last,
+) -> List[Dict]:
+    """Remove records with duplicate primary keys for a table model"""
+    return dedup_records(records, table_primary_keys(table), policy=policy)
@@ -0,0 +1,172 @@
+"""
+    metrics module - prometheus metrics for the crawl pipelines
+
+    Pipeline steps wrapped in `check_spider_pipeline` record their duration
+    and the records and bytes they take in and put out per pipeline class. The
+    table store records counts and timings per AEMO table. The metrics are
+    registered on the default registry so they're served by the scrapy
+    `WebService` metrics endpoint.
+
+    Recording is a no-op if prometheus_client isn't installed.
+
+"""
+import functools
+import logging
+from typing import Any, Optional, Tuple
+
+try:
+    from prometheus_client import Counter, Histogram
+
+    HAVE_PROMETHEUS = True
+except ImportError:
+    HAVE_PROMETHEUS = False
+
+logger = logging.getLogger(__name__)
+
+# pipeline steps range from sub-millisecond to minutes for large bulk inserts
+PIPELINE_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+PIPELINE_RECORD_BUCKETS = (0, 1, 10, 100, 1000, 10000, 50000, 100000, 500000, 1000000)
+
+PIPELINE_BYTES_BUCKETS = (1024, 10240, 102400, 1048576, 10485760, 104857600, 1073741824)
+
+if HAVE_PROMETHEUS:
+    pipeline_duration = Histogram(
+        "opennem_pipeline_duration_seconds",
+        "Time spent in a pipeline step",
+        ["spider", "pipeline"],
+        buckets=PIPELINE_DURATION_BUCKETS,
+    )
+    pipeline_records_in = Histogram(
+        "opennem_pipeline_records_in",
+        "Records passed into a pipeline step",
+        ["spider", "pipeline"],
+        buckets=PIPELINE_RECORD_BUCKETS,
+    )
+    pipeline_records_out = Histogram(
+        "opennem_pipeline_records_out",
+        "Records returned from a pipeline step",
+        ["spider", "pipeline"],
+        buckets=PIPELINE_RECORD_BUCKETS,
+    )
+    pipeline_bytes_in = Histogram(
+        "opennem_pipeline_bytes_in",
+        "Bytes of downloaded content passed into a pipeline step",
+        ["spider", "pipeline"],
+        buckets=PIPELINE_BYTES_BUCKETS,
+    )
+    pipeline_errors = Counter(
+        "opennem_pipeline_errors",
+        "Exceptions raised by a pipeline step",
+        ["spider", "pipeline"],
+    )
+    table_records = Counter(
+        "opennem_table_records",
+        "Records generated by the table processors",
+        ["spider", "table"],
+    )
+    table_duration = Counter(
+        "opennem_table_duration_seconds",
+        "Time spent in the table processors",
+        ["spider", "table"],
+    )
+
+
+def count_item_records(item: Any) -> int:
+    """
+    Count the records in a pipeline item. Items are either lists of record
+    sets, record sets with a list of records or parsed files with tables
+    """
+    if isinstance(item, list):
+        return sum(count_item_records(i) if isinstance(i, dict) else 1 for i in item)
+
+    if not isinstance(item, dict):
+        return 0
+
+    if isinstance(item.get("records"), list):
+        return len(item["records"])
+
+    if isinstance(item.get("tables"), dict):
+        return sum(
+            len(t["records"])
+            for t in item["tables"].values()
+            if isinstance(t, dict) and isinstance(t.get("records"), list)
+        )
+
+    if "num_records" in item and isinstance(item["num_records"], int):
+        return item["num_records"]
+
+    return 0
+
+
+def count_item_bytes(item: Any) -> Optional[int]:
+    """
+    Size of downloaded content in an item if it has any
+    """
+    if not isinstance(item, dict):
+        return None
+
+    for field in ["body", "content"]:
+        if isinstance(item.get(field), (bytes, str)):
+            return len(item[field])
+
+    return None
+
+
+def _get_spider_name(spider: Any) -> str:
+    return getattr(spider, "name", None) or "unknown"
+
+
+@functools.lru_cache(maxsize=None)
+def _get_pipeline_metrics(spider_name: str, pipeline_name: str) -> Tuple:
+    """Labelled metrics are looked up once per spider and pipeline"""
+    metrics = [pipeline_duration, pipeline_records_in, pipeline_records_out, pipeline_bytes_in]
+
+    return tuple(metric.labels(spider=spider_name, pipeline=pipeline_name) for metric in metrics)
+
+
+def record_pipeline_step(
+    pipeline_name: str,
+    spider: Any,
+    duration: float,
+    item_in: Any,
+    item_out: Any,
+    records_in: Optional[int] = None,
+    bytes_in: Optional[int] = None,
+) -> None:
+    """
+    Record a pipeline step. The input counts are taken before the step runs
+    since pipelines modify items in place
+    """
+    if not HAVE_PROMETHEUS:
+        return None
+
+    pipeline_metrics = _get_pipeline_metrics(_get_spider_name(spider), pipeline_name)
+    duration_metric, records_in_metric, records_out_metric, bytes_in_metric = pipeline_metrics
+
+    if records_in is None:
+        records_in = count_item_records(item_in)
+
+    duration_metric.observe(duration)
+    records_in_metric.observe(records_in)
+    records_out_metric.observe(count_item_records(item_out))
+
+    if bytes_in is not None:
+        bytes_in_metric.observe(bytes_in)
+
+
+def record_pipeline_error(pipeline_name: str, spider: Any) -> None:
+    if not HAVE_PROMETHEUS:
+        return None
+
+    pipeline_errors.labels(spider=_get_spider_name(spider), pipeline=pipeline_name).inc()
+
+
+def record_table_step(table_name: str, spider: Any, duration: float, num_records: int) -> None:
+    if not HAVE_PROMETHEUS:
+        return None
+
+    spider_name = _get_spider_name(spider)
+
+    table_records.labels(spider=spider_name, table=table_name).inc(num_records)
+    table_duration.labels(spider=spider_name, table=table_name).inc(duration)
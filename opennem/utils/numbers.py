@@ -1,4 +1,3 @@
-import decimal
 from math import floor, log, pow
 from typing import List, Union
 
@@ -8,17 +7,8 @@ __log10 = 2.302585092994046
 
 DEFAULT_PRECISION = settings.precision_default
 
-ctx = decimal.Context()
-ctx.prec = 20
-
-
-def float_to_str(f):
-    """
-    Convert the given float to a string,
-    without resorting to scientific notation
-    """
-    d1 = ctx.create_decimal(repr(f))
-    return format(d1, "f")
+# postgres numeric spellings of the non-finite floats
+FLOAT_SPECIAL_STRINGS = {"nan": "NaN", "inf": "Infinity", "-inf": "-Infinity"}
 
 
 def cast_number(number: any) -> float:
@@ -90,13 +80,46 @@ def human2bytes(s: str) -> int:
     return int(num * prefix[letter])
 
 
+def _expand_exponent(f_repr: str) -> str:
+    """
+    Expand a repr in scientific notation into positional notation
+    """
+    mantissa, exponent = f_repr.split("e")
+    sign = ""
+
+    if mantissa.startswith("-"):
+        sign, mantissa = "-", mantissa[1:]
+
+    int_part, _, frac_part = mantissa.partition(".")
+    digits = int_part + frac_part
+    point = len(int_part) + int(exponent)
+
+    if point <= 0:
+        return "{}0.{}{}".format(sign, "0" * -point, digits)
+
+    if point >= len(digits):
+        return "{}{}{}".format(sign, digits, "0" * (point - len(digits)))
+
+    return "{}{}.{}".format(sign, digits[:point], digits[point:])
+
+
 def float_to_str(f: float) -> str:
     """
     Convert the given float to a string,
     without resorting to scientific notation
+
+    repr gives the shortest string that round trips so only reprs in
+    scientific notation need rewriting
     """
-    d1 = ctx.create_decimal(repr(f))
-    return format(d1, "f")
+    f_repr = repr(f)
+
+    if "e" in f_repr:
+        return _expand_exponent(f_repr)
+
+    if f_repr in FLOAT_SPECIAL_STRINGS:
+        return FLOAT_SPECIAL_STRINGS[f_repr]
+
+    return f_repr
 
 
 def cast_trailing_nulls(series: List) -> List:
@@ -1,33 +1,123 @@
 import functools
 import logging
-from typing import Any, Callable, Dict
+from time import perf_counter
+from typing import Any, Callable, Dict, FrozenSet, Optional, Set
 
+from scrapy.exceptions import DropItem
 from scrapy.spiders import Spider
 
+from opennem.utils.metrics import (
+    count_item_bytes,
+    count_item_records,
+    record_pipeline_error,
+    record_pipeline_step,
+)
+
+
+# cached on the spider as (pipelines, pipelines_extra, enabled pipeline classes)
+SPIDER_PIPELINES_ATTR = "_opennem_pipelines"
+
+# cached on the pipeline as (spider, is enabled)
+PIPELINE_DISPATCH_ATTR = "_opennem_dispatch"
+
+
+def _get_pipeline_set(spider: Spider, attr: str) -> Optional[Set]:
+    pipelines = getattr(spider, attr, None)
+
+    if type(pipelines) is set:
+        return pipelines
+
+    return None
+
+
+def get_spider_pipelines(spider: Spider) -> FrozenSet[type]:
+    """
+    Get the pipeline classes enabled on a spider. The set is cached on the
+    spider until its pipelines or pipelines_extra are reassigned
+    """
+    pipelines = _get_pipeline_set(spider, "pipelines")
+    pipelines_extra = _get_pipeline_set(spider, "pipelines_extra")
+
+    cached = getattr(spider, SPIDER_PIPELINES_ATTR, None)
+
+    if cached and cached[0] is pipelines and cached[1] is pipelines_extra:
+        return cached[2]
+
+    enabled: Set[type] = set()
+
+    if pipelines:
+        enabled |= pipelines
+
+    if pipelines_extra:
+        enabled |= pipelines_extra
+
+    enabled_pipelines = frozenset(enabled)
+
+    try:
+        setattr(spider, SPIDER_PIPELINES_ATTR, (pipelines, pipelines_extra, enabled_pipelines))
+    except AttributeError:
+        pass
+
+    return enabled_pipelines
+
+
+def spider_has_pipeline(pipeline: Any, spider: Spider) -> bool:
+    """Check if a pipeline is enabled in the spiders pipelines"""
+    return pipeline.__class__ in get_spider_pipelines(spider)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_step_message(pipeline_name: str) -> str:
+    return "Executing {} pipeline step".format(pipeline_name)
+
 
 def check_spider_pipeline(process_item_method: Callable) -> Callable:
     @functools.wraps(process_item_method)
     def wrapper(self, item: Dict, spider: Spider) -> Any:  # type: ignore
 
-        # message template for debugging
-        msg = "%%s %s pipeline step" % (self.__class__.__name__,)
+        # the enabled decision is made once per spider and kept on the pipeline
+        dispatch = getattr(self, PIPELINE_DISPATCH_ATTR, None)
 
-        pipelines = set([])
+        if dispatch is None or dispatch[0] is not spider:
+            dispatch = (spider, spider_has_pipeline(self, spider))
 
-        if hasattr(spider, "pipelines"):
-            if type(spider.pipelines) is set:
-                pipelines |= spider.pipelines
+            try:
+                setattr(self, PIPELINE_DISPATCH_ATTR, dispatch)
+            except AttributeError:
+                pass
 
-        if hasattr(spider, "pipelines_extra"):
-            if type(spider.pipelines_extra) is set:
-                pipelines |= spider.pipelines_extra
+        # disabled pipelines pass the item straight through
+        if not dispatch[1]:
+            return item
 
-        if self.__class__ in pipelines:
-            spider.log(msg % "Executing", level=logging.INFO)
-            return process_item_method(self, item, spider)
+        pipeline_name = self.__class__.__name__
 
-        else:
-            # spider.log(msg % "skipping", level=logging.DEBUG)
-            return item
+        spider.log(_get_step_message(pipeline_name), level=logging.INFO)
+
+        # counted up front since pipelines modify items in place
+        records_in = count_item_records(item)
+        bytes_in = count_item_bytes(item)
+
+        start = perf_counter()
+
+        try:
+            item_out = process_item_method(self, item, spider)
+        except DropItem:
+            raise
+        except Exception:
+            record_pipeline_error(pipeline_name, spider)
+            raise
+
+        record_pipeline_step(
+            pipeline_name,
+            spider,
+            perf_counter() - start,
+            item,
+            item_out,
+            records_in=records_in,
+            bytes_in=bytes_in,
+        )
+
+        return item_out
 
     return wrapper
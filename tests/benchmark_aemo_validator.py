@@ -0,0 +1,42 @@
+import csv
+from pathlib import Path
+
+import pytest
+
+from opennem.schema.aemo.mms import MarketConfigInterconnector
+from opennem.schema.aemo.validator import AEMORecordValidator
+
+INTERCONNECTOR_PATH = Path("opennem/data/mms/PUBLIC_DVD_INTERCONNECTOR_202006010000.CSV")
+
+
+def load_interconnector_records(num_records: int = 10000):
+    with INTERCONNECTOR_PATH.open() as fh:
+        rows = [r for r in csv.reader(fh) if r[0] in ["I", "D"]]
+
+    fieldnames = rows[0][4:]
+    records = [dict(zip(fieldnames, r[4:])) for r in rows[1:]]
+
+    return [records[i % len(records)] for i in range(num_records)]
+
+
+test_interconnector_records = load_interconnector_records()
+
+
+def validate_pydantic(records):
+    return [MarketConfigInterconnector(**r) for r in records]
+
+
+def validate_compiled(records):
+    return AEMORecordValidator(MarketConfigInterconnector).validate(records)
+
+
+@pytest.mark.benchmark(
+    group="aemo_record_validator", min_rounds=10,
+)
+@pytest.mark.parametrize(
+    "validator", [validate_pydantic, validate_compiled],
+)
+def test_benchmark_aemo_record_validator(benchmark, validator):
+    subject = benchmark(validator, test_interconnector_records)
+
+    assert len(subject) == len(test_interconnector_records)
@@ -0,0 +1,28 @@
+import pytest
+from benchmark_facility_scada_generate import load_wem_scada_records
+
+from opennem.db.models.opennem import FacilityScada
+from opennem.pipelines.binary_copy import generate_binary_copy_from_records
+from opennem.pipelines.csv import generate_csv_from_records
+from opennem.pipelines.nem.opennem import unit_scada_generate_facility_scada
+from opennem.schema.network import NetworkWEM
+
+test_wem_facility_scada_records = unit_scada_generate_facility_scada(
+    load_wem_scada_records(limit=10000),
+    network=NetworkWEM,
+    interval_field="Trading Interval",
+    facility_code_field="Facility Code",
+    energy_field="Energy Generated (MWh)",
+    power_field="EOI Quantity (MW)",
+)
+
+
+@pytest.mark.benchmark(
+    group="bulk_insert_encode", min_rounds=20,
+)
+@pytest.mark.parametrize(
+    "encoder",
+    [generate_csv_from_records, generate_binary_copy_from_records],
+)
+def test_benchmark_bulk_insert_encode(benchmark, encoder):
+    benchmark(encoder, FacilityScada, test_wem_facility_scada_records)
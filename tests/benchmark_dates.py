@@ -2,7 +2,8 @@ from datetime import datetime
 
 import pytest
 
-from opennem.utils.dates import parse_date
+from opennem.schema.network import NetworkNEM
+from opennem.utils.dates import parse_date, parse_date_column
 
 
 @pytest.mark.benchmark(
@@ -38,3 +39,26 @@ def test_benchmark_dateparser_optimized(benchmark, date_str, date_dt):
     )
     assert date_subject_dt == date_dt
 
+
+DATE_COLUMN = [
+    "2020/10/07 {:02d}:{:02d}:00".format(h, m) for h in range(24) for m in range(0, 60, 5)
+]
+
+# each interval repeats once per unit like in a dispatch file
+DATE_COLUMN_REPEATED = [i for i in DATE_COLUMN for _ in range(20)]
+
+
+@pytest.mark.benchmark(
+    group="date_parser_column", min_rounds=10,
+)
+def test_benchmark_dateparser_column_rows(benchmark):
+    benchmark(
+        lambda: [parse_date(i, network=NetworkNEM, dayfirst=False) for i in DATE_COLUMN_REPEATED]
+    )
+
+
+@pytest.mark.benchmark(
+    group="date_parser_column", min_rounds=10,
+)
+def test_benchmark_dateparser_column(benchmark):
+    benchmark(parse_date_column, DATE_COLUMN_REPEATED, network=NetworkNEM, dayfirst=False)
@@ -4,7 +4,10 @@ from pathlib import Path
 
 import pytest
 
-from opennem.pipelines.nem.opennem import unit_scada_generate_facility_scada
+from opennem.pipelines.nem.opennem import (
+    unit_scada_generate_facility_scada,
+    unit_scada_generate_facility_scada_batch,
+)
 from opennem.schema.network import NetworkWEM
 
 RECORDS_PATH = Path("data/wem/facility-scada-2020-10.csv")
@@ -65,3 +68,26 @@ def test_benchmark_generate_facility_scada_base(
         groupby_filter=groupby_filter,
         primary_key_track=primary_key_track,
     )
+
+
+@pytest.mark.benchmark(
+    group="facility_scada_parser", min_rounds=50,
+)
+@pytest.mark.parametrize(
+    "records,groupby_filter",
+    [
+        (test_wem_scada_records, False),
+        (test_wem_scada_records, True),
+    ],
+)
+def test_benchmark_generate_facility_scada_batch(benchmark, records, groupby_filter):
+    benchmark(
+        unit_scada_generate_facility_scada_batch,
+        records,
+        network=NetworkWEM,
+        interval_field="Trading Interval",
+        facility_code_field="Facility Code",
+        energy_field="Energy Generated (MWh)",
+        power_field="EOI Quantity (MW)",
+        groupby_filter=groupby_filter,
+    )
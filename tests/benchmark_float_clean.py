@@ -0,0 +1,74 @@
+"""
+    Float cleaning and formatting over a full day of DISPATCH_UNIT_SCADA values
+    (288 intervals for 400 units)
+
+"""
+import decimal
+import random
+
+import pytest
+
+from opennem.core.normalizers import clean_float, clean_float_column
+from opennem.db.models.opennem import FacilityScada
+from opennem.pipelines.binary_copy import generate_binary_copy_from_records
+
+_ctx = decimal.Context()
+_ctx.prec = 20
+
+random.seed(20210201)
+
+# SCADAVALUE is in MW to up to 5 decimal places with plenty of zeros and blanks
+dispatch_unit_scada_day = [
+    random.choice(["0", "", str(round(random.uniform(-50, 700), random.randint(0, 5)))])
+    for _ in range(288 * 400)
+]
+
+
+def decimal_float_to_str(f: float) -> str:
+    """The Decimal based formatter for comparison"""
+    return format(_ctx.create_decimal(repr(f)), "f")
+
+
+def clean_values_decimal(values):
+    cleaned = []
+
+    for value in values:
+        value = clean_float(value)
+
+        if value:
+            value = decimal_float_to_str(value)
+
+        cleaned.append(value)
+
+    return cleaned
+
+
+def clean_values_column(values):
+    return clean_float_column(values, as_str=True)
+
+
+@pytest.mark.benchmark(
+    group="float_clean", min_rounds=10,
+)
+@pytest.mark.parametrize(
+    "cleaner", [clean_values_decimal, clean_values_column, clean_float_column],
+)
+def test_benchmark_float_clean(benchmark, cleaner):
+    benchmark(cleaner, dispatch_unit_scada_day)
+
+
+def encode_values(values):
+    records = [{"generated": i} for i in values]
+    return generate_binary_copy_from_records(FacilityScada, records, ["generated"])
+
+
+@pytest.mark.benchmark(
+    group="float_clean_encode", min_rounds=10,
+)
+@pytest.mark.parametrize(
+    "as_str", [True, False], ids=["formatted", "native"],
+)
+def test_benchmark_float_clean_binary_encode(benchmark, as_str):
+    benchmark(
+        lambda: encode_values(clean_float_column(dispatch_unit_scada_day, as_str=as_str))
+    )
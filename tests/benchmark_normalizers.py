@@ -0,0 +1,42 @@
+import pytest
+
+from opennem.core.loader import load_data
+from opennem.core.normalizers import _station_name_cleaner, station_name_cleaner
+from opennem.core.station_names import station_map_name
+
+STATION_NAME_MAP = load_data("station_name_maps.json")
+
+# map names and the names they map to along with the unmapped names imports see
+station_names_corpus = list(STATION_NAME_MAP.keys()) + list(STATION_NAME_MAP.values()) + [
+    "Eastern Creek LFG PS Units 1-4",
+    "Grosvenor 1 Waste Coal Mine Gas Power Station",
+    "Yallourn 'W' Power Station",
+    "Wyndham Waste Disposal Facility",
+    "Tamar Valley Combined Cycle",
+    "Catagunya / Liapootah / Wayatinah Power Station",
+    "Swanbank B Power Station & Swanbank E Gas Turbine",
+    "University of Melbourne Archives Brunswick",
+]
+
+
+def clean_names(cleaner, names):
+    return [cleaner(i) for i in names]
+
+
+@pytest.mark.benchmark(
+    group="station_name_cleaner", min_rounds=50,
+)
+@pytest.mark.parametrize(
+    "cleaner", [_station_name_cleaner, station_name_cleaner], ids=["uncached", "cached"],
+)
+def test_benchmark_station_name_cleaner(benchmark, cleaner):
+    subject = benchmark(clean_names, cleaner, station_names_corpus)
+
+    assert subject == clean_names(_station_name_cleaner, station_names_corpus)
+
+
+@pytest.mark.benchmark(
+    group="station_map_name", min_rounds=50,
+)
+def test_benchmark_station_map_name(benchmark):
+    benchmark(clean_names, station_map_name, station_names_corpus)
@@ -0,0 +1,85 @@
+"""
+    Per item overhead of check_spider_pipeline for a spider with many small
+    items (BOM observations) passing through every registered pipeline
+
+"""
+import functools
+import logging
+
+import pytest
+
+from opennem.pipelines.bom import StoreBomObservation
+from opennem.utils.pipelines import check_spider_pipeline
+
+# one pipeline per entry in settings.scrapy ITEM_PIPELINES
+NUM_PIPELINES = 30
+
+NUM_ITEMS = 1000
+
+
+def legacy_check_spider_pipeline(process_item_method):
+    """The set rebuilding and message formatting wrapper for comparison"""
+
+    @functools.wraps(process_item_method)
+    def wrapper(self, item, spider):
+        msg = "%%s %s pipeline step" % (self.__class__.__name__,)
+
+        pipelines = set([])
+
+        if hasattr(spider, "pipelines"):
+            if type(spider.pipelines) is set:
+                pipelines |= spider.pipelines
+
+        if hasattr(spider, "pipelines_extra"):
+            if type(spider.pipelines_extra) is set:
+                pipelines |= spider.pipelines_extra
+
+        if self.__class__ in pipelines:
+            spider.log(msg % "Executing", level=logging.INFO)
+            return process_item_method(self, item, spider)
+
+        return item
+
+    return wrapper
+
+
+def process_item(self, item, spider=None):
+    return item
+
+
+def build_pipelines(wrapper):
+    return [
+        type("Pipeline{}".format(i), (object,), {"process_item": wrapper(process_item)})()
+        for i in range(NUM_PIPELINES)
+    ]
+
+
+class BomSpider(object):
+    name = "benchmark.bom"
+
+    def __init__(self, enabled_pipeline):
+        self.pipelines = set([StoreBomObservation, enabled_pipeline])
+        self.pipelines_extra = set()
+
+    def log(self, message, level=logging.DEBUG):
+        pass
+
+
+def run_items(pipelines, spider, items):
+    for item in items:
+        for pipeline in pipelines:
+            item = pipeline.process_item(item, spider)
+
+
+@pytest.mark.benchmark(
+    group="pipeline_dispatch", min_rounds=20,
+)
+@pytest.mark.parametrize(
+    "wrapper", [legacy_check_spider_pipeline, check_spider_pipeline],
+)
+def test_benchmark_pipeline_dispatch(benchmark, wrapper):
+    pipelines = build_pipelines(wrapper)
+    spider = BomSpider(pipelines[-1].__class__)
+    items = [{"records": [{"code": "94767", "air_temp": 21.5}]} for _ in range(NUM_ITEMS)]
+
+    benchmark(run_items, pipelines, spider, items)
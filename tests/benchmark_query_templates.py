@@ -0,0 +1,147 @@
+"""
+    Latency of the 7 day facility power query built with str.format and
+    inline literals against the registered template with bound parameters
+
+    The build benchmarks run anywhere. The query benchmarks run the queries
+    against `settings.db_url` and are skipped if it can't be reached. Both
+    report the median and p99 round in `extra_info`
+
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.elements import TextClause
+
+from opennem.api.stats.queries import power_facility_query
+from opennem.api.stats.schema import ScadaDateRange
+from opennem.api.time import human_to_interval, human_to_period
+from opennem.core.normalizers import normalize_duid
+from opennem.schema.network import NetworkNEM
+
+FACILITY_CODES = ["BAYSW1", "BAYSW2", "BAYSW3", "BAYSW4"]
+
+DATE_RANGE = ScadaDateRange(
+    start=datetime(2020, 1, 1, tzinfo=timezone(timedelta(hours=10))),
+    end=datetime(2021, 2, 1, tzinfo=timezone(timedelta(hours=10))),
+    network=NetworkNEM,
+)
+
+INTERVAL = human_to_interval("5m")
+
+PERIOD = human_to_period("7d")
+
+NUM_ROUNDS = 200
+
+DIALECT = postgresql.dialect()
+
+
+def legacy_power_facility_query(facility_codes: List[str], date_range: ScadaDateRange) -> str:
+    """The str.format query with inline literals for comparison"""
+    __query = """
+        select
+            t.trading_interval at time zone '{timezone}',
+            coalesce(avg(t.facility_power), 0),
+            t.facility_code
+        from (
+            select
+                time_bucket_gapfill('{trunc}', fs.trading_interval) AS trading_interval,
+                coalesce(
+                    avg(fs.generated), 0
+                ) as facility_power,
+                fs.facility_code
+            from facility_scada fs
+            join facility f on fs.facility_code = f.code
+            where
+                fs.trading_interval <= '{date_max}' and
+                fs.trading_interval > '{date_min}' and
+                fs.facility_code in ({facility_codes_parsed})
+            group by 1, 3
+        ) as t
+        group by 1, 3
+        order by 1 desc
+    """
+
+    return __query.format(
+        facility_codes_parsed=",".join(
+            ["'{}'".format(i) for i in map(normalize_duid, facility_codes)]
+        ),
+        trunc=INTERVAL.interval_sql,
+        timezone=NetworkNEM.timezone_database,
+        date_max=date_range.get_end(),
+        date_min=date_range.get_end() - timedelta(minutes=PERIOD.period),
+    )
+
+
+def template_power_facility_query(
+    facility_codes: List[str], date_range: ScadaDateRange
+) -> TextClause:
+    return power_facility_query(
+        facility_codes, NetworkNEM, PERIOD, interval=INTERVAL, date_range=date_range
+    )
+
+
+def build_and_compile(build_query) -> str:
+    query = build_query(FACILITY_CODES, DATE_RANGE)
+
+    if isinstance(query, str):
+        return query
+
+    return str(query.compile(dialect=DIALECT))
+
+
+def record_percentiles(benchmark) -> None:
+    data = sorted(benchmark.stats.stats.data)
+
+    benchmark.extra_info["p50"] = data[len(data) // 2]
+    benchmark.extra_info["p99"] = data[min(len(data) - 1, int(len(data) * 0.99))]
+
+
+@pytest.fixture(scope="module")
+def db_connection():
+    from opennem.db import get_database_engine
+
+    try:
+        connection = get_database_engine().connect()
+    except Exception as e:
+        pytest.skip("No database: {}".format(e))
+
+    yield connection
+
+    connection.close()
+
+
+@pytest.mark.benchmark(group="power_facility_7d_build", min_rounds=NUM_ROUNDS)
+@pytest.mark.parametrize(
+    "build_query",
+    [legacy_power_facility_query, template_power_facility_query],
+    ids=["legacy", "template"],
+)
+def test_benchmark_power_facility_7d_build(benchmark, build_query):
+    benchmark(build_and_compile, build_query)
+
+    record_percentiles(benchmark)
+
+
+@pytest.mark.benchmark(group="power_facility_7d_query")
+@pytest.mark.parametrize(
+    "build_query",
+    [legacy_power_facility_query, template_power_facility_query],
+    ids=["legacy", "template"],
+)
+def test_benchmark_power_facility_7d_query(benchmark, db_connection, build_query):
+    # the window moves each round so results aren't served from one plan
+    # with the same literals
+    date_ranges = [
+        DATE_RANGE.copy(update={"end": DATE_RANGE.end - timedelta(minutes=5 * i)})
+        for i in range(NUM_ROUNDS)
+    ]
+
+    def run_query():
+        date_range = date_ranges.pop()
+        return list(db_connection.execute(build_query(FACILITY_CODES, date_range)))
+
+    benchmark.pedantic(run_query, rounds=NUM_ROUNDS, iterations=1, warmup_rounds=0)
+
+    record_percentiles(benchmark)
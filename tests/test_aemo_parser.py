@@ -0,0 +1,176 @@
+from io import BytesIO
+from zipfile import ZipFile
+
+import pytest
+
+from opennem.core.parsers.aemo import (
+    AEMOColumnarRecords,
+    AEMOParserException,
+    AEMOTableSchema,
+    AEMOTableSet,
+    parse_aemo_csv,
+    parse_aemo_csv_stream,
+    parse_aemo_file_stream,
+)
+from opennem.pipelines.nem import ExtractCSV
+
+AEMO_CSV_FIXTURE = (
+    b"C,NEMP.WORLD,DISPATCHSCADA,AEMO,PUBLIC,2020/10/07,10:15:05,0000000327470416,,"
+    b"0000000327470410\n"
+    b"""I,DISPATCH,UNIT_SCADA,1,SETTLEMENTDATE,DUID,SCADAVALUE
+D,DISPATCH,UNIT_SCADA,1,"2020/10/07 10:15:00",BARCSF1,12.5
+D,DISPATCH,UNIT_SCADA,1,"2020/10/07 10:15:00",BUTLERSG,9.1
+D,DISPATCH,UNIT_SCADA,1,"2020/10/07 10:15:00",CALL_B_1,350
+I,DISPATCH,INTERCONNECTORRES,3,SETTLEMENTDATE,INTERCONNECTORID,METEREDMWFLOW
+D,DISPATCH,INTERCONNECTORRES,3,"2020/10/07 10:15:00",N-Q-MNSP1,-20
+D,DISPATCH,INTERCONNECTORRES,3,"2020/10/07 10:15:00",NSW1-QLD1,100,EXTRA
+C,"END OF REPORT",8
+"""
+)
+
+
+class TestAEMOParserStream(object):
+    def test_parse_tables(self):
+        batches = list(parse_aemo_csv_stream(BytesIO(AEMO_CSV_FIXTURE)))
+
+        assert len(batches) == 2, "Two tables"
+
+        table_name, fieldnames, records = batches[0]
+
+        assert table_name == "DISPATCH_UNIT_SCADA"
+        assert fieldnames == ["SETTLEMENTDATE", "DUID", "SCADAVALUE"]
+        assert len(records) == 3
+        assert records[0]["DUID"] == "BARCSF1"
+
+        table_name, _, records = batches[1]
+
+        assert table_name == "DISPATCH_INTERCONNECTORRES"
+        assert len(records) == 1, "Malformed row is skipped"
+
+    def test_parse_batches(self):
+        batches = list(parse_aemo_csv_stream(BytesIO(AEMO_CSV_FIXTURE), batch_size=2))
+
+        assert [(t, len(r)) for t, _, r in batches] == [
+            ("DISPATCH_UNIT_SCADA", 2),
+            ("DISPATCH_UNIT_SCADA", 1),
+            ("DISPATCH_INTERCONNECTORRES", 1),
+        ]
+
+    def test_parse_leaves_handle_open(self):
+        fh = BytesIO(AEMO_CSV_FIXTURE)
+
+        list(parse_aemo_csv_stream(fh))
+
+        assert not fh.closed
+
+    def test_invalid_batch_size(self):
+        with pytest.raises(Exception):
+            list(parse_aemo_csv_stream(BytesIO(AEMO_CSV_FIXTURE), batch_size=0))
+
+    def test_parse_zip_members(self):
+        zip_buffer = BytesIO()
+
+        # the first member has no trailing newline before the next report header
+        with ZipFile(zip_buffer, "w") as zf:
+            zf.writestr("PUBLIC_1.CSV", AEMO_CSV_FIXTURE.rstrip())
+            zf.writestr("PUBLIC_2.CSV", AEMO_CSV_FIXTURE)
+
+        batches = list(parse_aemo_file_stream(zip_buffer))
+
+        assert [(t, len(r)) for t, _, r in batches] == [
+            ("DISPATCH_UNIT_SCADA", 3),
+            ("DISPATCH_INTERCONNECTORRES", 1),
+        ] * 2
+
+    def test_parse_file_not_zip(self):
+        batches = list(parse_aemo_file_stream(BytesIO(AEMO_CSV_FIXTURE)))
+
+        assert len(batches) == 2
+
+    def test_extract_csv_table_batches(self):
+        fh = BytesIO(AEMO_CSV_FIXTURE)
+        item = ExtractCSV().process_file_handle({"file_handle": fh}, None)
+
+        assert "tables" not in item
+        assert not fh.closed, "Parsed as the batches are consumed"
+
+        batches = list(item["table_batches"])
+
+        assert [(t["name"], len(t["records"])) for t in batches] == [
+            ("DISPATCH_UNIT_SCADA", 3),
+            ("DISPATCH_INTERCONNECTORRES", 1),
+        ]
+        assert fh.closed
+
+
+class TestAEMOColumnarRecords(object):
+    def test_parse_columnar(self):
+        batches = list(parse_aemo_csv_stream(BytesIO(AEMO_CSV_FIXTURE), columnar=True))
+
+        table_name, fieldnames, records = batches[0]
+
+        assert isinstance(records, AEMOColumnarRecords)
+        assert len(records) == 3
+        assert records.column("DUID") == ["BARCSF1", "BUTLERSG", "CALL_B_1"]
+        assert records.fieldnames == fieldnames
+
+    def test_columnar_iterates_records(self):
+        batches = list(parse_aemo_csv_stream(BytesIO(AEMO_CSV_FIXTURE), columnar=True))
+        batches_dict = list(parse_aemo_csv_stream(BytesIO(AEMO_CSV_FIXTURE)))
+
+        assert list(batches[0][2]) == batches_dict[0][2]
+
+    def test_columnar_merge(self):
+        batches = list(
+            parse_aemo_csv_stream(BytesIO(AEMO_CSV_FIXTURE), batch_size=2, columnar=True)
+        )
+
+        records = batches[0][2]
+        records += batches[1][2]
+
+        assert len(records) == 3
+        assert records.column("SCADAVALUE") == ["12.5", "9.1", "350"]
+
+    def test_columnar_missing_column(self):
+        records = AEMOColumnarRecords(["DUID"])
+
+        with pytest.raises(AEMOParserException):
+            records.column("SCADAVALUE")
+
+
+def _table(namespace: str, name: str, records):
+    table = AEMOTableSchema(namespace=namespace, name=name, fieldnames=["A"])
+    table.add_records(records)
+    return table
+
+
+class TestAEMOTableSet(object):
+    def test_lookup(self):
+        table_set = parse_aemo_csv(AEMO_CSV_FIXTURE.decode("utf-8"))
+
+        assert table_set.has_table("dispatch_unit_scada") is True
+        assert table_set.has_table("DISPATCH_PRICE") is False
+        assert len(table_set.get_table("DISPATCH_UNIT_SCADA").records) == 3
+
+        with pytest.raises(Exception) as excinfo:
+            table_set.get_table("DISPATCH_PRICE")
+
+        assert "Table not found: DISPATCH_PRICE" in str(excinfo)
+
+    def test_merge_repeated_sections(self):
+        table_set = AEMOTableSet()
+
+        table_set.add_table(_table("dispatch", "unit_scada", [{"A": 1}]))
+        table_set.add_table(_table("dispatch", "price", [{"A": 2}]))
+        table_set.add_table(_table("dispatch", "unit_scada", [{"A": 3}]))
+
+        assert table_set.table_names == ["DISPATCH_UNIT_SCADA", "DISPATCH_PRICE"]
+        assert table_set.get_table("DISPATCH_UNIT_SCADA").records == [{"A": 1}, {"A": 3}]
+
+    def test_iteration_source_order(self):
+        tables = [_table("b", "second", []), _table("a", "first", []), _table("b", "second", [])]
+
+        table_set = AEMOTableSet(tables=tables)
+
+        assert [t.full_name for t in table_set.iter_tables()] == ["B_SECOND", "A_FIRST"]
+        assert table_set.has_table("a_first") is True
@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import root_validator
+
+from opennem.core.parsers.aemo import parse_aemo_csv
+from opennem.schema.aemo.mms import (
+    MarketConfigInterconnector,
+    MMSBase,
+    ParticipantMNSPInterconnector,
+)
+from opennem.schema.aemo.validator import AEMORecordValidator, compile_schema
+
+MNSP_RECORD = {
+    "LINKID": " BLNKTAS ",
+    "EFFECTIVEDATE": "2020/01/01 00:00:00",
+    "INTERCONNECTORID": "T-V-MNSP1",
+    "FROMREGION": "TAS1",
+    "TOREGION": "VIC1",
+    "MAXCAPACITY": "478",
+    "AUTHORISEDDATE": "2020/01/01 00:00:00",
+}
+
+INTERCONNECTOR_CSV = """C,SETP.WORLD,DVD_INTERCONNECTOR,AEMO,PUBLIC,2020/07/09,00:15:14,1,,1
+I,MARKET_CONFIG,INTERCONNECTOR,1,INTERCONNECTORID,REGIONFROM,RSOID,REGIONTO,DESCRIPTION,LASTCHANGED
+D,MARKET_CONFIG,INTERCONNECTOR,1,V-SA,VIC1,,SA1,"VICTORIA TO SA","2004/06/11 10:43:06"
+D,MARKET_CONFIG,INTERCONNECTOR,1,T-V-MNSP1,TAS1,,VIC1,"Basslink DC","2008/09/30 14:50:56"
+D,MARKET_CONFIG,INTERCONNECTOR,1,BAD,TAS1,,VIC1,"Bad date","not a date"
+C,"END OF REPORT",5
+"""
+
+
+class RootValidatedSchema(MMSBase):
+    name: str
+
+    @root_validator
+    def validate_all(cls, values):
+        return values
+
+
+class OptionalSchema(MMSBase):
+    name: str
+    value: Optional[float]
+
+
+class TestAEMORecordValidator(object):
+    def test_compiled_matches_pydantic(self):
+        validator = AEMORecordValidator(ParticipantMNSPInterconnector)
+
+        subject = validator.validate([MNSP_RECORD, MNSP_RECORD])
+
+        assert validator.is_compiled is True
+        assert subject == [ParticipantMNSPInterconnector(**MNSP_RECORD)] * 2
+        assert subject[0].linkid == "BLNKTAS"
+        assert subject[0].maxcapacity == 478.0
+        assert validator.num_fallback == 0
+
+    def test_invalid_records_counted(self):
+        validator = AEMORecordValidator(ParticipantMNSPInterconnector)
+        invalid_record = dict(MNSP_RECORD, MAXCAPACITY="0")
+
+        subject = validator.validate([MNSP_RECORD, invalid_record, invalid_record])
+
+        assert len(subject) == 1
+        assert validator.num_records == 3
+        assert validator.num_fallback == 2
+        assert validator.num_invalid == 2
+        assert validator.errors[("MAXCAPACITY", "Not a valid capacity: 0")] == 2
+
+    def test_fallback_row_is_valid(self):
+        validator = AEMORecordValidator(MarketConfigInterconnector)
+        record = {
+            "INTERCONNECTORID": "V-SA",
+            "REGIONFROM": "VIC1",
+            "REGIONTO": "SA1",
+            "DESCRIPTION": "VICTORIA TO SA",
+            "LASTCHANGED": datetime(2004, 6, 11),
+        }
+
+        # a description that isn't a string fails the fast path but pydantic coerces it
+        subject = validator.validate([record, dict(record, DESCRIPTION=1)])
+
+        assert validator.num_fallback == 1
+        assert validator.num_invalid == 0
+        assert subject[1].description == "1"
+
+    def test_optional_values(self):
+        validator = AEMORecordValidator(OptionalSchema)
+
+        subject = validator.validate([{"NAME": "a", "VALUE": "1.5"}, {"NAME": "b"}])
+
+        assert validator.is_compiled is True
+        assert [i.value for i in subject] == [1.5, None]
+        assert validator.num_fallback == 1
+
+    def test_uncompiled_schemas(self):
+        assert compile_schema(RootValidatedSchema) is None
+
+        validator = AEMORecordValidator(RootValidatedSchema)
+
+        assert validator.validate([{"NAME": "test"}]) == [RootValidatedSchema(name="test")]
+        assert validator.num_fallback == 1
+
+    def test_parse_aemo_csv(self):
+        table_set = parse_aemo_csv(INTERCONNECTOR_CSV)
+
+        records = table_set.get_table("MARKET_CONFIG_INTERCONNECTOR").get_records()
+
+        assert [i.interconnectorid for i in records] == ["V-SA", "T-V-MNSP1"]
+        assert records[0].description == "Victoria to sa"
@@ -0,0 +1,50 @@
+from io import BytesIO
+from zipfile import ZipFile
+
+from opennem.utils.archive import iter_zip_members, read_zip_contents, stream_zip_members
+
+
+def _zip(files):
+    buf = BytesIO()
+
+    with ZipFile(buf, "w") as zf:
+        for filename, content in files:
+            zf.writestr(filename, content)
+
+    return buf.getvalue()
+
+
+NESTED_ZIP = _zip(
+    [
+        ("a.csv", b"a,1\n"),
+        ("inner.zip", _zip([("b.csv", b"b,2\n"), ("c.csv", b"c,3\n")])),
+        ("d.csv", b"d,4\n"),
+    ]
+)
+
+
+class TestArchive(object):
+    def test_iter_members_nested(self):
+        subject = [name for name, _ in iter_zip_members(BytesIO(NESTED_ZIP))]
+
+        assert subject == ["a.csv", "b.csv", "c.csv", "d.csv"]
+
+    def test_read_contents(self):
+        subject = read_zip_contents(BytesIO(NESTED_ZIP))
+
+        assert subject == b"a,1\nb,2\nc,3\nd,4\n"
+
+    def test_stream_members_text(self):
+        subject = [(name, fh.read()) for name, fh in stream_zip_members(BytesIO(NESTED_ZIP))]
+
+        assert subject[1] == ("b.csv", "b,2\n")
+
+    def test_read_single_member(self):
+        subject = read_zip_contents(BytesIO(_zip([("a.csv", b"a,1\n")])))
+
+        assert subject == b"a,1\n"
+
+    def test_read_members_not_joined(self):
+        subject = read_zip_contents(BytesIO(_zip([("a.csv", b"a,1"), ("b.csv", b"b,2\n")])))
+
+        assert subject == b"a,1\nb,2\n", "Member without a trailing newline isn't joined"
@@ -0,0 +1,110 @@
+import struct
+from datetime import datetime
+
+import pytest
+import pytz
+
+from opennem.db.models.opennem import FacilityScada
+from opennem.pipelines.binary_copy import (
+    COPY_BINARY_HEADER,
+    BinaryCopyException,
+    COPY_BINARY_TRAILER,
+    BinaryCopyRecordStream,
+    generate_binary_copy_from_records,
+    get_column_staging_types,
+)
+from opennem.pipelines.bulk_insert import build_insert_query
+
+RECORDS = [
+    {
+        "network_id": "NEM",
+        "trading_interval": datetime(2000, 1, 1, 0, 0, 1, tzinfo=pytz.utc),
+        "facility_code": "BARCSF1",
+        "generated": "12.5",
+        "is_forecast": False,
+    },
+    {
+        "network_id": "NEM",
+        "trading_interval": datetime(2000, 1, 1, 10, 0, 0, tzinfo=pytz.timezone("Etc/GMT-10")),
+        "facility_code": "BARCSF1",
+        "generated": None,
+        "is_forecast": True,
+    },
+]
+
+
+class TestBinaryCopy(object):
+    def test_binary_copy_framing(self):
+        subject = generate_binary_copy_from_records(FacilityScada, RECORDS).getvalue()
+
+        assert subject.startswith(COPY_BINARY_HEADER)
+        assert subject.endswith(COPY_BINARY_TRAILER)
+
+    def test_binary_copy_row(self):
+        subject = generate_binary_copy_from_records(FacilityScada, RECORDS[:1]).getvalue()
+        row = subject[len(COPY_BINARY_HEADER) : -len(COPY_BINARY_TRAILER)]
+
+        expected = b"".join(
+            [
+                struct.pack("!h", 5),
+                struct.pack("!i", 3) + b"NEM",
+                struct.pack("!iq", 8, 1000000),
+                struct.pack("!i", 7) + b"BARCSF1",
+                struct.pack("!id", 8, 12.5),
+                struct.pack("!i?", 1, False),
+            ]
+        )
+
+        assert row == expected
+
+    def test_binary_copy_null_and_timezone(self):
+        subject = generate_binary_copy_from_records(FacilityScada, RECORDS[1:]).getvalue()
+
+        assert struct.pack("!iq", 8, 0) in subject, "Interval is converted to UTC"
+        assert struct.pack("!i", -1) in subject, "None is encoded as NULL"
+
+    def test_binary_copy_query(self):
+        columns = list(RECORDS[0].keys())
+        staging_types = get_column_staging_types(FacilityScada, columns)
+
+        assert staging_types == {"generated": "double precision"}
+
+        query = build_insert_query(
+            FacilityScada, ["generated"], binary_columns=columns, staging_types=staging_types
+        )
+
+        assert "FORMAT BINARY" in query
+        assert "ALTER COLUMN generated TYPE double precision" in query
+
+    def test_binary_copy_stream(self):
+        columns = list(RECORDS[0].keys())
+        stream = BinaryCopyRecordStream(FacilityScada, iter(RECORDS), columns)
+
+        subject = b"".join(iter(lambda: stream.read(7), b""))
+
+        assert subject == generate_binary_copy_from_records(FacilityScada, RECORDS).getvalue()
+        assert stream.num_records == 2
+
+    def test_binary_copy_naive_utc(self):
+        records = [{**RECORDS[0], "trading_interval": datetime(2000, 1, 1, 0, 0, 1)}]
+
+        subject = generate_binary_copy_from_records(FacilityScada, records).getvalue()
+
+        assert struct.pack("!iq", 8, 1000000) in subject, "Naive interval is taken as UTC"
+
+    @pytest.mark.parametrize(
+        "value,expected",
+        [("False", False), ("f", False), ("0", False), (" TRUE ", True), (True, True)],
+    )
+    def test_binary_copy_bool(self, value, expected):
+        records = [{**RECORDS[0], "is_forecast": value}]
+
+        subject = generate_binary_copy_from_records(FacilityScada, records).getvalue()
+
+        assert subject.endswith(struct.pack("!i?", 1, expected) + COPY_BINARY_TRAILER)
+
+    def test_binary_copy_bool_invalid(self):
+        records = [{**RECORDS[0], "is_forecast": "maybe"}]
+
+        with pytest.raises(BinaryCopyException):
+            generate_binary_copy_from_records(FacilityScada, records)
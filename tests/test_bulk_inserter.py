@@ -0,0 +1,97 @@
+from opennem.db.models.opennem import FacilityScada
+from opennem.pipelines.bulk_insert import (
+    BulkInsertPipeline,
+    build_copy_query,
+    build_insert_query,
+    get_staging_table_name,
+)
+from opennem.pipelines.csv import CSVRecordStream
+
+RECORDS = [
+    {"network_id": "NEM", "facility_code": "BARCSF1", "generated": i} for i in range(5)
+]
+
+
+class FakeCursor(object):
+    def __init__(self, queries):
+        self.queries = queries
+
+    def execute(self, query):
+        self.queries.append(query)
+
+    def copy_expert(self, query, content):
+        self.queries.append(query)
+        content.read()
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.queries = []
+        self.commits = 0
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self.queries)
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSpider(object):
+    name = "test"
+    pipelines = set([BulkInsertPipeline])
+    bulk_insert_row_limit = 2
+
+    def log(self, *args, **kwargs):
+        pass
+
+
+class TestBulkInsertQuery(object):
+    def test_insert_query_staging_table(self):
+        query = build_insert_query(FacilityScada, ["generated"])
+
+        assert "CREATE TEMP TABLE IF NOT EXISTS __tmp_facility_scada" in query
+        assert "ON COMMIT DELETE ROWS" in query
+        assert "generated = EXCLUDED.generated" in query
+
+    def test_copy_query_cached(self):
+        subject = build_copy_query(FacilityScada, ["generated"])
+
+        assert subject is build_copy_query(FacilityScada, ["generated"])
+        assert subject is not build_copy_query(FacilityScada)
+
+    def test_staging_table_name_binary(self):
+        staging_types = {"generated": "double precision"}
+
+        assert get_staging_table_name(FacilityScada) == "__tmp_facility_scada"
+        assert get_staging_table_name(FacilityScada, staging_types) != "__tmp_facility_scada"
+
+
+class TestBulkInsertPipeline(object):
+    def test_connection_reused(self):
+        pipeline = BulkInsertPipeline()
+        conn = pipeline.conn = FakeConnection()
+        spider = FakeSpider()
+
+        for _ in range(2):
+            item = [
+                {
+                    "table_schema": FacilityScada,
+                    "csv": CSVRecordStream(iter(RECORDS), list(RECORDS[0].keys())),
+                }
+            ]
+
+            assert pipeline.process_item(item, spider) == {"num_records": 5, "num_errors": 0}
+
+        staging_queries = [q for q in conn.queries if "CREATE TEMP TABLE" in q]
+
+        assert len(staging_queries) == 1, "Staging table is created once"
+        assert conn.commits == 6, "Records are committed in segments of the row limit"
+
+        pipeline.close_spider(spider)
+
+        assert conn.closed
+        assert pipeline.conn is None
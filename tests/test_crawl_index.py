@@ -0,0 +1,195 @@
+import pytest
+from scrapy.http import HtmlResponse
+
+from opennem.core.crawl_index import CrawlFileStatus, crawl_file_is_ingested
+from opennem.db.models.opennem import FacilityScada
+from opennem.pipelines.nem import opennem as nem_pipelines
+from opennem.pipelines.bulk_insert import BulkInsertPipeline
+from opennem.pipelines.nem.opennem import NemwebUnitScadaOpenNEMStorePipeline
+from opennem.spiders import dirlisting
+from opennem.spiders.dirlisting import DirlistingSpider, parse_dirlisting
+
+CRAWL_FILE = {
+    "url": "http://nemweb.com.au/Reports/Current/Next_Day_Dispatch/PUBLIC_NEXT_DAY_DISPATCH.zip",
+    "spider_name": "au.nem.current.dispatch",
+    "size": 1043,
+    "etag": None,
+    "last_modified": None,
+    "content_hash": "abc",
+    "status": CrawlFileStatus.ingested.value,
+}
+
+DIRLISTING = b"""<html><body><pre><A HREF="/Reports/">[To Parent Directory]</A><br><br>
+ Tuesday, February 9, 2021  4:05 AM         1043 <A HREF="/Reports/Current/Next_Day_Dispatch/PUBLIC_NEXT_DAY_DISPATCH.zip">PUBLIC_NEXT_DAY_DISPATCH.zip</A><br>
+</pre></body></html>"""
+
+LISTING_URL = "http://nemweb.com.au/Reports/Archive/Next_Day_Dispatch/"
+
+# newest last as in the nemweb listings
+LISTING_FILES = ["PUBLIC_1.zip", "PUBLIC_2.zip", "PUBLIC_3.zip"]
+
+LISTING = "<html><body><pre>{}</pre></body></html>".format(
+    "".join(
+        ' Tuesday, February 9, 2021  4:05 AM         1043 <A HREF="{}">{}</A><br>'.format(
+            LISTING_URL + i, i
+        )
+        for i in LISTING_FILES
+    )
+).encode()
+
+
+class SeenSpider(DirlistingSpider):
+    name = "test.seen"
+    skip_seen = True
+    pipelines = set([NemwebUnitScadaOpenNEMStorePipeline])
+
+
+class SeenBulkSpider(SeenSpider):
+    name = "test.seen.bulk"
+    pipelines = set([NemwebUnitScadaOpenNEMStorePipeline, BulkInsertPipeline])
+
+
+class FakeBulkInserter(object):
+    def __init__(self, events):
+        self.events = events
+
+    def bulk_insert_record_set(self, record_set, spider=None, binary=False):
+        self.events.append("stored")
+        return {"num_records": len(record_set["records"]), "num_errors": 0}
+
+
+def _requested(spider, seen, monkeypatch):
+    monkeypatch.setattr(
+        dirlisting,
+        "get_crawl_files",
+        lambda urls: {LISTING_URL + i: {**CRAWL_FILE, "url": LISTING_URL + i} for i in seen},
+    )
+
+    response = HtmlResponse(url=LISTING_URL, body=LISTING)
+
+    return [r.url.split("/")[-1] for r in spider.parse(response)]
+
+
+class TestCrawlIndex(object):
+    @pytest.mark.parametrize(
+        "crawl_file,size,content_hash,expected",
+        [
+            (CRAWL_FILE, None, None, True),
+            (CRAWL_FILE, 1043, "abc", True),
+            (CRAWL_FILE, 2000, None, False),
+            (CRAWL_FILE, None, "def", False),
+            ({**CRAWL_FILE, "status": CrawlFileStatus.downloaded.value}, None, None, False),
+            (None, None, None, False),
+        ],
+    )
+    def test_crawl_file_is_ingested(self, crawl_file, size, content_hash, expected):
+        subject = crawl_file_is_ingested(crawl_file, size=size, content_hash=content_hash)
+
+        assert subject is expected
+
+    def test_dirlisting_size(self):
+        subject = parse_dirlisting(" Tuesday, February 9, 2021  4:05 AM         1043 ")
+
+        assert subject["type"] == "file"
+        assert subject["size"] == 1043
+
+    def test_listing_sizes(self):
+        response = HtmlResponse(
+            url="http://nemweb.com.au/Reports/Current/Next_Day_Dispatch/", body=DIRLISTING
+        )
+
+        subject = DirlistingSpider(name="test").get_listing_sizes(response)
+
+        assert subject[CRAWL_FILE["url"]] == 1043
+
+    def test_seen_latest(self, monkeypatch):
+        spider = SeenSpider(limit=1)
+
+        assert _requested(spider, ["PUBLIC_3.zip"], monkeypatch) == [], "Latest already seen"
+
+    def test_seen_archive_skip(self, monkeypatch):
+        spider = SeenSpider(skip=1)
+
+        assert _requested(spider, [], monkeypatch) == ["PUBLIC_2.zip", "PUBLIC_1.zip"]
+        assert _requested(SeenSpider(skip=1), ["PUBLIC_2.zip"], monkeypatch) == [
+            "PUBLIC_1.zip"
+        ], "The newest file is skipped whether or not it's been seen"
+
+    @pytest.mark.parametrize(
+        "record_item,marked",
+        [
+            ({"num_records": 5}, [["http://nemweb.com.au/PUBLIC_1.zip"]]),
+            ({"num_records": 0, "num_errors": 1}, []),
+        ],
+    )
+    def test_stored_marked_ingested(self, monkeypatch, record_item, marked):
+        stored = []
+
+        monkeypatch.setattr(nem_pipelines, "process_table", lambda table, spider: record_item)
+        monkeypatch.setattr(nem_pipelines, "mark_crawl_files_ingested", stored.append)
+
+        item = {
+            "link": "http://nemweb.com.au/PUBLIC_1.zip",
+            "table_batches": iter([{"name": "DISPATCH_REGIONSUM", "records": []}]),
+        }
+
+        NemwebUnitScadaOpenNEMStorePipeline().process_item(item, SeenSpider())
+
+        assert stored == marked
+
+    def test_failed_table_continues(self, monkeypatch):
+        stored = []
+        processed = []
+
+        def process_failed(table, spider):
+            raise Exception("Bad table")
+
+        def process_stored(table, spider):
+            processed.append(table["name"])
+            return {"num_records": 3}
+
+        monkeypatch.setattr(nem_pipelines, "process_dispatch_regionsum", process_failed)
+        monkeypatch.setattr(nem_pipelines, "process_trading_price", process_stored)
+        monkeypatch.setattr(nem_pipelines, "mark_crawl_files_ingested", stored.append)
+
+        item = {
+            "link": "http://nemweb.com.au/PUBLIC_1.zip",
+            "table_batches": iter(
+                [
+                    {"name": "DISPATCH_REGIONSUM", "records": []},
+                    {"name": "TRADING_PRICE", "records": []},
+                ]
+            ),
+        }
+
+        NemwebUnitScadaOpenNEMStorePipeline().process_item(item, SeenSpider())
+
+        assert processed == ["TRADING_PRICE"], "Tables after a failed table are processed"
+        assert stored == [], "File with a failed table isn't marked ingested"
+
+    def test_streamed_batches_stored(self, monkeypatch):
+        stored = []
+        events = []
+
+        def table_batches():
+            for _ in range(2):
+                events.append("parsed")
+                yield {"name": "DISPATCH_UNIT_SCADA", "records": []}
+
+        monkeypatch.setattr(
+            nem_pipelines,
+            "process_table",
+            lambda table, spider: {"table_schema": FacilityScada, "records": [{}]},
+        )
+        monkeypatch.setattr(nem_pipelines, "mark_crawl_files_ingested", stored.append)
+
+        pipeline = NemwebUnitScadaOpenNEMStorePipeline()
+        pipeline.bulk_inserter = FakeBulkInserter(events)
+
+        item = {"link": "http://nemweb.com.au/PUBLIC_1.zip", "table_batches": table_batches()}
+
+        subject = pipeline.process_item(item, SeenBulkSpider())
+
+        assert events == ["parsed", "stored", "parsed", "stored"], "Stored as each batch is parsed"
+        assert subject == [], "Stored records aren't held for the bulk inserter"
+        assert stored == [["http://nemweb.com.au/PUBLIC_1.zip"]]
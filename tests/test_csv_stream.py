@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from opennem.db.models.opennem import FacilityScada
+from opennem.pipelines.csv import CSVRecordStream, generate_csv_from_records
+
+RECORDS = [
+    {
+        "created_by": None,
+        "created_at": None,
+        "updated_at": None,
+        "network_id": "NEM",
+        "trading_interval": datetime(2020, 10, 7, 10, i * 5, 0),
+        "facility_code": "BARCSF1",
+        "generated": i,
+        "is_forecast": False,
+        "eoi_quantity": None,
+    }
+    for i in range(5)
+]
+
+COLUMNS = list(RECORDS[0].keys())
+
+
+class TestCSVRecordStream(object):
+    @pytest.mark.parametrize("read_size", [-1, 1, 16, 4096])
+    def test_stream_matches_buffer(self, read_size):
+        stream = CSVRecordStream(iter(RECORDS), COLUMNS)
+
+        subject = "".join(iter(lambda: stream.read(read_size), ""))
+
+        assert subject == generate_csv_from_records(FacilityScada, RECORDS).getvalue()
+        assert stream.num_records == 5
+
+    def test_stream_is_lazy(self):
+        consumed = []
+
+        def records():
+            for record in RECORDS:
+                consumed.append(record)
+                yield record
+
+        stream = CSVRecordStream(records(), COLUMNS)
+        stream.read(1)
+
+        assert len(consumed) < len(RECORDS), "Records are serialized as they are read"
+
+    def test_stream_segments(self):
+        stream = CSVRecordStream(iter(RECORDS), COLUMNS, row_limit=2)
+
+        segments = [stream.read()]
+
+        while stream.next_segment():
+            segments.append(stream.read())
+
+        assert len(segments) == 3
+        assert [len(s.splitlines()) - 1 for s in segments] == [2, 2, 1]
+        assert all(s.startswith(",".join(COLUMNS)) for s in segments), "Each segment has a header"
+        assert stream.num_records == 5
+        assert stream.read() == ""
+
+    def test_stream_empty(self):
+        stream = CSVRecordStream(iter([]), COLUMNS)
+
+        assert stream.read() == ",".join(COLUMNS) + "\r\n"
+        assert stream.next_segment() is False
+
+    def test_stream_naive_utc(self):
+        stream = CSVRecordStream(iter(RECORDS[:1]), COLUMNS)
+
+        stream.read(len(",".join(COLUMNS)) + 2)
+
+        assert stream.read() == ",,,NEM,2020-10-07 10:00:00+00:00,BARCSF1,0,False,\r\n"
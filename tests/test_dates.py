@@ -4,7 +4,14 @@ import pytest
 import pytz
 from pytz import timezone
 
-from opennem.utils.dates import date_series, parse_date
+from opennem.schema.network import NetworkNEM
+from opennem.utils.dates import (
+    DATE_FORMAT_ISO,
+    date_series,
+    detect_date_format,
+    parse_date,
+    parse_date_column,
+)
 from opennem.utils.timezone import is_aware
 
 UTC = pytz.utc
@@ -93,3 +100,28 @@ class TestUtilDates(object):
         assert len(series) == 30, "There are 30 dates"
         assert series[0] == date_today, "First entry is today"
         assert series[29] == date_29_days_ago, "Last entry is 29 days ago"
+
+
+class TestDateColumnParser(object):
+    def test_detect_date_format(self):
+        assert detect_date_format("2020/10/07 10:15:00") == DATE_FORMAT_ISO
+        assert detect_date_format("20201008133000") == "%Y%m%d%H%M%S"
+        assert detect_date_format("not a date") is None
+
+    def test_parse_column(self):
+        subject = parse_date_column(["2020/10/07 10:15:00", "2020/10/07 10:20:00"])
+
+        assert subject == [datetime(2020, 10, 7, 10, 15, 0), datetime(2020, 10, 7, 10, 20, 0)]
+
+    def test_parse_column_matches_parse_date(self):
+        dates = ["1/11/08 0:00", "30/9/19 4:00", "27/9/2019  2:55:00 pm"]
+
+        subject = parse_date_column(dates, network=NetworkNEM)
+
+        assert subject == [parse_date(i, network=NetworkNEM) for i in dates]
+        assert is_aware(subject[0]) is True, "Date has timezone info"
+
+    def test_parse_column_mixed_formats(self):
+        subject = parse_date_column(["20201008133000", "2020/10/08 13:35:00"], dayfirst=False)
+
+        assert subject == [datetime(2020, 10, 8, 13, 30, 0), datetime(2020, 10, 8, 13, 35, 0)]
@@ -1,8 +1,9 @@
 from datetime import datetime
+from typing import List
 
 import pytest
 
-from opennem.utils.dates import get_end_of_last_month
+from opennem.utils.dates import get_end_of_last_month, month_series
 
 
 @pytest.mark.parametrize(
@@ -21,3 +22,19 @@ def test_get_end_of_last_month(dt: str, dt_expected: str) -> None:
     dt_subject = get_end_of_last_month(dtd)
 
     assert dt_subject == dtd_expected, "Date is end of last month"
+
+
+@pytest.mark.parametrize(
+    ["start", "end", "months_expected"],
+    [
+        ("2015-01-01", "2015-04-01", ["2015-01-01", "2015-02-01", "2015-03-01", "2015-04-01"]),
+        ("2015-04-01", "2015-01-01", ["2015-04-01", "2015-03-01", "2015-02-01", "2015-01-01"]),
+        ("2014-12-15", "2015-01-10", ["2014-12-01", "2015-01-01"]),
+        ("2015-03-01", "2015-03-20", ["2015-03-01"]),
+        ("2015-03-01", "2015-03-01", ["2015-03-01"]),
+    ],
+)
+def test_month_series(start: str, end: str, months_expected: List[str]) -> None:
+    months = list(month_series(datetime.fromisoformat(start), datetime.fromisoformat(end)))
+
+    assert months == [datetime.fromisoformat(i) for i in months_expected], "Months inclusive"
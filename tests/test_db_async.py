@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+import opennem.db
+from opennem.db import SESSION_TIMEZONE_QUERY, fetch_all_async, with_session_timezone
+
+
+class FakeTransaction(object):
+    def __init__(self, database):
+        self.database = database
+
+    async def __aenter__(self):
+        self.database.calls.append("begin")
+
+    async def __aexit__(self, *args):
+        self.database.calls.append("commit")
+
+
+class FakeDatabase(object):
+    """Stands in for the async database and records the queries run"""
+
+    def __init__(self):
+        self.is_connected = True
+        self.calls = []
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    async def execute(self, query):
+        self.calls.append(query)
+
+    async def fetch_all(self, query):
+        self.calls.append(query)
+        return [(1,)]
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(opennem.db, "database", database)
+    return database
+
+
+def _run(coroutine):
+    return asyncio.get_event_loop().run_until_complete(coroutine)
+
+
+class TestFetchAllAsync(object):
+    def test_fetch_all(self, database):
+        query = text("select 1")
+
+        assert _run(fetch_all_async(query)) == [(1,)]
+        assert database.calls == [query]
+
+    def test_session_timezone(self, database):
+        query = with_session_timezone(text("select now()"), "+10")
+
+        assert _run(fetch_all_async(query)) == [(1,)]
+        assert database.calls[0] == "begin"
+        assert str(database.calls[1]) == str(SESSION_TIMEZONE_QUERY)
+        assert database.calls[1].compile().params == {"timezone": "+10"}
+        assert database.calls[2:] == [query, "commit"]
@@ -0,0 +1,35 @@
+from opennem.db.models.opennem import BalancingSummary, FacilityScada
+from opennem.utils.dedup import DedupPolicy, dedup_records, dedup_table_records, table_primary_keys
+
+RECORDS = [
+    {"trading_interval": 1, "facility_code": "A", "generated": 1},
+    {"trading_interval": 1, "facility_code": "B", "generated": 2},
+    {"trading_interval": 1, "facility_code": "A", "generated": 3},
+    {"trading_interval": 2, "facility_code": "A", "generated": 4},
+]
+
+
+class TestDedup(object):
+    def test_dedup_last_wins(self):
+        subject = dedup_records(RECORDS, ["trading_interval", "facility_code"])
+
+        assert [i["generated"] for i in subject] == [3, 2, 4]
+
+    def test_dedup_first_wins(self):
+        subject = dedup_records(
+            RECORDS, ["trading_interval", "facility_code"], policy=DedupPolicy.first
+        )
+
+        assert [i["generated"] for i in subject] == [1, 2, 4]
+
+    def test_dedup_table_records(self):
+        records = [dict(i, network_id="NEM") for i in RECORDS]
+
+        subject = dedup_table_records(records, FacilityScada)
+
+        assert len(subject) == 3
+
+    def test_table_primary_keys(self):
+        assert set(table_primary_keys(BalancingSummary)) == set(
+            ["network_id", "trading_interval", "network_region"]
+        )
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from opennem.core.facility_scada import get_facility_scada_bounds
+
+NEM_TZ = timezone(timedelta(hours=10))
+
+INTERVAL = datetime(2021, 2, 1, 12, 0, tzinfo=NEM_TZ)
+
+
+def _record(facility_code: str, minutes: int, network_id: str = "NEM", **kwargs):
+    return {
+        "network_id": network_id,
+        "facility_code": facility_code,
+        "trading_interval": INTERVAL + timedelta(minutes=minutes),
+        **kwargs,
+    }
+
+
+class TestFacilityScadaBounds(object):
+    def test_bounds(self):
+        records = [_record("BAYSW1", m) for m in [10, -5, 0, 20, 5]]
+
+        assert get_facility_scada_bounds(records) == [
+            ("NEM", "BAYSW1", INTERVAL - timedelta(minutes=5), INTERVAL + timedelta(minutes=20))
+        ]
+
+    def test_per_network_and_facility(self):
+        records = [
+            _record("BAYSW1", 0),
+            _record("BAYSW2", 5),
+            _record("BAYSW1", 10, network_id="WEM"),
+        ]
+
+        bounds = get_facility_scada_bounds(records)
+
+        assert len(bounds) == 3
+        interval = records[1]["trading_interval"]
+
+        assert ("NEM", "BAYSW2", interval, interval) in bounds
+
+    def test_skips_forecasts_and_invalid(self):
+        records = [
+            _record("BAYSW1", 0),
+            _record("BAYSW1", 60, is_forecast=True),
+            {"network_id": "NEM", "facility_code": "BAYSW1", "trading_interval": None},
+            {"network_id": None, "facility_code": "BAYSW1", "trading_interval": INTERVAL},
+        ]
+
+        assert get_facility_scada_bounds(records) == [("NEM", "BAYSW1", INTERVAL, INTERVAL)]
+
+    def test_interval_field(self):
+        records = [{"network_id": "NEM", "facility_code": "X", "interval": INTERVAL}]
+
+        assert get_facility_scada_bounds(records, interval_field="interval") == [
+            ("NEM", "X", INTERVAL, INTERVAL)
+        ]
@@ -0,0 +1,70 @@
+from io import BytesIO
+
+from opennem.core.parsers.aemo import parse_aemo_csv_stream
+from opennem.pipelines.nem.opennem import (
+    unit_scada_generate_facility_scada,
+    unit_scada_generate_facility_scada_batch,
+)
+from opennem.schema.network import NetworkNEM
+
+UNIT_SCADA_FIXTURE = b"""I,DISPATCH,UNIT_SCADA,1,SETTLEMENTDATE,DUID,SCADAVALUE
+D,DISPATCH,UNIT_SCADA,1,"2020/10/07 10:15:00",BARCSF1 ,12.5
+D,DISPATCH,UNIT_SCADA,1,"2020/10/07 10:15:00",BUTLERSG,0
+D,DISPATCH,UNIT_SCADA,1,"2020/10/07 10:15:00",BUTLERSG,1.25
+D,DISPATCH,UNIT_SCADA,1,"2020/10/07 10:20:00",BARCSF1,
+D,DISPATCH,UNIT_SCADA,1,"2020/10/07 10:20:00",CALL_B_1,350
+"""
+
+
+def _load_records(columnar: bool = False):
+    _, _, records = next(
+        parse_aemo_csv_stream(BytesIO(UNIT_SCADA_FIXTURE), columnar=columnar)
+    )
+    return records
+
+
+def _strip_created(records):
+    return [{k: v for k, v in r.items() if k != "created_at"} for r in records]
+
+
+class TestFacilityScadaGenerateBatch(object):
+    def test_batch_matches_row_generator(self):
+        records = _load_records()
+
+        subject = unit_scada_generate_facility_scada_batch(
+            records, network=NetworkNEM, power_field="SCADAVALUE"
+        )
+        expected = unit_scada_generate_facility_scada(
+            records, network=NetworkNEM, power_field="SCADAVALUE", groupby_filter=False
+        )
+
+        assert len(subject) == 4, "Duplicate primary key is removed"
+        assert _strip_created(subject) == _strip_created(
+            [expected[0], expected[2], expected[3], expected[4]]
+        ), "Last record wins"
+
+    def test_batch_columnar(self):
+        subject = unit_scada_generate_facility_scada_batch(
+            _load_records(columnar=True), network=NetworkNEM, power_field="SCADAVALUE"
+        )
+        expected = unit_scada_generate_facility_scada_batch(
+            _load_records(), network=NetworkNEM, power_field="SCADAVALUE"
+        )
+
+        assert _strip_created(subject) == _strip_created(expected)
+
+    def test_batch_duid_filter(self):
+        subject = unit_scada_generate_facility_scada_batch(
+            _load_records(), network=NetworkNEM, power_field="SCADAVALUE", duid="BARCSF1"
+        )
+
+        assert len(subject) == 2
+        assert subject[0]["generated"] == "12.5"
+        assert subject[1]["generated"] is None
+
+    def test_batch_native_floats(self):
+        subject = unit_scada_generate_facility_scada_batch(
+            _load_records(), network=NetworkNEM, power_field="SCADAVALUE", native_floats=True
+        )
+
+        assert [i["generated"] for i in subject] == [12.5, 1.25, None, 350.0]
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+
+from opennem.core.facility_scada import (
+    filter_revision_window,
+    get_revision_cutoff,
+    high_water_cache,
+)
+from opennem.pipelines.wem.facility_scada import filter_incremental
+from opennem.schema.network import NetworkWEM
+
+WEM_TZ = timezone(timedelta(hours=8))
+
+HIGH_WATER_MARK = datetime(2020, 10, 1, 12, 0, tzinfo=WEM_TZ)
+
+
+def _records(num_intervals: int = 8):
+    return [
+        {"trading_interval": HIGH_WATER_MARK - timedelta(minutes=30 * i), "facility_code": "X"}
+        for i in range(num_intervals)
+    ]
+
+
+class FakeStats(object):
+    def __init__(self):
+        self.values = {}
+
+    def inc_value(self, key, count=1, spider=None):
+        self.values[key] = self.values.get(key, 0) + count
+
+
+class FakeCrawler(object):
+    def __init__(self):
+        self.stats = FakeStats()
+
+
+class FakeSpider(object):
+    name = "test.wem.facility_scada"
+    incremental = True
+    revision_window = 60
+
+    def __init__(self):
+        self.crawler = FakeCrawler()
+
+
+class TestFacilityScadaIncremental(object):
+    def setup_method(self):
+        high_water_cache[(NetworkWEM.code, None)] = HIGH_WATER_MARK
+
+    def teardown_method(self):
+        high_water_cache.clear()
+
+    def test_revision_cutoff(self):
+        assert get_revision_cutoff(NetworkWEM, 120) == HIGH_WATER_MARK - timedelta(hours=2)
+
+    def test_no_high_water_mark(self):
+        high_water_cache[(NetworkWEM.code, None)] = None
+
+        assert get_revision_cutoff(NetworkWEM, 120) is None
+
+        records, num_skipped = filter_revision_window(_records(), None)
+
+        assert len(records) == 8
+        assert num_skipped == 0
+
+    def test_filter_revision_window(self):
+        records, num_skipped = filter_revision_window(
+            _records(), HIGH_WATER_MARK - timedelta(minutes=60)
+        )
+
+        assert len(records) == 3
+        assert num_skipped == 5
+
+    def test_filter_incremental(self):
+        spider = FakeSpider()
+
+        subject = filter_incremental({"records": _records()}, spider)
+
+        assert len(subject["records"]) == 3
+        assert subject["num_skipped"] == 5
+        assert spider.crawler.stats.values == {
+            "facility_scada/written": 3,
+            "facility_scada/skipped": 5,
+        }
+
+    def test_not_incremental(self):
+        spider = FakeSpider()
+        spider.incremental = False
+
+        subject = filter_incremental({"records": _records()}, spider)
+
+        assert len(subject["records"]) == 8
+        assert "num_skipped" not in subject
+
+    def test_filter_incremental_field(self):
+        # live intervals without eoi_quantity are stored past the monthly file
+        high_water_cache[(NetworkWEM.code, "eoi_quantity")] = HIGH_WATER_MARK - timedelta(
+            hours=1
+        )
+
+        spider = FakeSpider()
+        spider.incremental_field = "eoi_quantity"
+
+        subject = filter_incremental({"records": _records()}, spider)
+
+        assert len(subject["records"]) == 5
+        assert subject["num_skipped"] == 3
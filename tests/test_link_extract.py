@@ -0,0 +1,71 @@
+from io import BytesIO
+from zipfile import ZipFile
+
+import scrapy
+from scrapy.http import HtmlResponse, Response
+
+from opennem.pipelines.files import LinkExtract
+from opennem.spiders.dirlisting import DirlistingSpider
+
+DIRLISTING_URL = "http://nemweb.com.au/Reports/Current/Next_Day_Dispatch/"
+
+LINK_URL = DIRLISTING_URL + "PUBLIC_NEXT_DAY_DISPATCH.zip"
+
+DIRLISTING = """<html><body><pre><A HREF="/Reports/">[To Parent Directory]</A><br><br>
+ Tuesday, February 9, 2021  4:05 AM         1043 <A HREF="{}">PUBLIC_NEXT_DAY_DISPATCH.zip</A><br>
+</pre></body></html>""".format(
+    LINK_URL
+).encode()
+
+
+def _zip_body() -> bytes:
+    buf = BytesIO()
+
+    with ZipFile(buf, "w") as zf:
+        zf.writestr("PUBLIC_NEXT_DAY_DISPATCH.CSV", b"C,NEMP.WORLD\n")
+
+    return buf.getvalue()
+
+
+class LinkSpider(DirlistingSpider):
+    name = "test.links"
+    pipelines = set([LinkExtract])
+
+
+class TestLinkExtract(object):
+    def test_dirlisting_requests_links(self):
+        response = HtmlResponse(url=DIRLISTING_URL, body=DIRLISTING)
+
+        subject = list(LinkSpider().parse(response))
+
+        assert len(subject) == 1
+        assert isinstance(subject[0], scrapy.Request), "Links are fetched by the downloader"
+        assert subject[0].url == LINK_URL
+
+    def test_link_body(self):
+        spider = LinkSpider()
+        request = list(spider.parse(HtmlResponse(url=DIRLISTING_URL, body=DIRLISTING)))[0]
+
+        response = Response(
+            url=LINK_URL, body=_zip_body(), headers={"ETag": "abc"}, request=request
+        )
+
+        item = list(spider.parse_link(response))[0]
+
+        assert item["etag"] == "abc"
+
+        subject = LinkExtract().process_item(item, spider)
+
+        assert subject["content"] == "C,NEMP.WORLD\n", "Body is unzipped and decoded"
+        assert "body" not in subject
+        assert subject["extension"] == ".zip"
+
+    def test_link_body_stream(self):
+        spider = LinkSpider()
+        spider.stream_content = True
+
+        item = {"link": LINK_URL, "body": _zip_body()}
+
+        subject = LinkExtract().process_item(item, spider)
+
+        assert subject["file_handle"].read() == _zip_body(), "Zip is parsed a member at a time"
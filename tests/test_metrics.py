@@ -0,0 +1,117 @@
+import pytest
+from prometheus_client import REGISTRY
+from scrapy.exceptions import DropItem
+
+from opennem.utils.metrics import count_item_bytes, count_item_records, record_table_step
+from opennem.utils.pipelines import check_spider_pipeline
+
+
+class FakeSpider(object):
+    name = "test.metrics"
+
+    def __init__(self, pipelines=None):
+        self.pipelines = pipelines or set()
+
+    def log(self, *args, **kwargs):
+        pass
+
+
+class SplitPipeline(object):
+    @check_spider_pipeline
+    def process_item(self, item, spider=None):
+        return [{"records": [r]} for r in item["records"]]
+
+
+class FailingPipeline(object):
+    @check_spider_pipeline
+    def process_item(self, item, spider=None):
+        if item.get("drop"):
+            raise DropItem("dropped")
+
+        raise Exception("failed")
+
+
+def get_sample(name, pipeline, spider="test.metrics"):
+    return REGISTRY.get_sample_value(name, {"spider": spider, "pipeline": pipeline})
+
+
+class TestItemCounts(object):
+    @pytest.mark.parametrize(
+        ["item", "count"],
+        [
+            (None, 0),
+            ({}, 0),
+            ({"records": [1, 2, 3]}, 3),
+            ([{"records": [1, 2]}, {"records": [3]}], 3),
+            ({"tables": {"A": {"records": [1, 2]}, "B": {"records": [3]}}}, 3),
+            ({"num_records": 5}, 5),
+        ],
+    )
+    def test_count_item_records(self, item, count):
+        assert count_item_records(item) == count
+
+    def test_count_item_bytes(self):
+        assert count_item_bytes({"body": b"1234"}) == 4
+        assert count_item_bytes({"content": "12"}) == 2
+        assert count_item_bytes({"file_handle": None}) is None
+        assert count_item_bytes([]) is None
+
+
+class TestPipelineMetrics(object):
+    def test_pipeline_step_recorded(self):
+        spider = FakeSpider(pipelines=set([SplitPipeline]))
+        pipeline = SplitPipeline()
+
+        count_before = get_sample("opennem_pipeline_duration_seconds_count", "SplitPipeline") or 0
+        records_before = get_sample("opennem_pipeline_records_out_sum", "SplitPipeline") or 0
+
+        subject = pipeline.process_item({"records": [1, 2, 3], "body": b"123456"}, spider)
+
+        assert len(subject) == 3
+        assert get_sample("opennem_pipeline_duration_seconds_count", "SplitPipeline") == (
+            count_before + 1
+        )
+        assert get_sample("opennem_pipeline_records_out_sum", "SplitPipeline") == (
+            records_before + 3
+        )
+        assert get_sample("opennem_pipeline_bytes_in_sum", "SplitPipeline") >= 6
+
+    def test_disabled_pipeline_not_recorded(self):
+        spider = FakeSpider()
+        spider.name = "test.metrics.disabled"
+
+        item = {"records": [1]}
+
+        assert SplitPipeline().process_item(item, spider) is item
+        assert (
+            get_sample(
+                "opennem_pipeline_duration_seconds_count",
+                "SplitPipeline",
+                spider="test.metrics.disabled",
+            )
+            is None
+        )
+
+    def test_pipeline_errors_counted(self):
+        spider = FakeSpider(pipelines=set([FailingPipeline]))
+        pipeline = FailingPipeline()
+
+        errors_before = get_sample("opennem_pipeline_errors_total", "FailingPipeline") or 0
+
+        with pytest.raises(Exception):
+            pipeline.process_item({}, spider)
+
+        with pytest.raises(DropItem):
+            pipeline.process_item({"drop": True}, spider)
+
+        assert get_sample("opennem_pipeline_errors_total", "FailingPipeline") == errors_before + 1
+
+    def test_table_step_recorded(self):
+        labels = {"spider": "test.metrics", "table": "DISPATCH_UNIT_SCADA"}
+        records_before = REGISTRY.get_sample_value("opennem_table_records_total", labels) or 0
+
+        record_table_step("DISPATCH_UNIT_SCADA", FakeSpider(), 0.5, 10)
+
+        assert REGISTRY.get_sample_value("opennem_table_records_total", labels) == (
+            records_before + 10
+        )
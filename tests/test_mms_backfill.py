@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+
+from opennem.importer import mms_backfill
+from opennem.importer.mms_backfill import backfill_archive, get_archive_url, store_record_item
+from opennem.pipelines.bulk_insert import BulkInsertPipeline
+
+
+class FakeResponse(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=None):
+        yield b"archive"
+
+
+class FakeHttp(object):
+    def get(self, url, stream=False):
+        return FakeResponse()
+
+
+@pytest.fixture
+def checkpoints(monkeypatch):
+    stored = []
+
+    monkeypatch.setattr(mms_backfill, "http", FakeHttp())
+    monkeypatch.setattr(
+        mms_backfill, "store_backfill_checkpoint", lambda *args: stored.append(args)
+    )
+
+    return stored
+
+
+class TestMMSBackfill(object):
+    def test_archive_url(self):
+        subject = get_archive_url("dispatch_unit_scada", datetime(2015, 3, 1))
+
+        assert subject.endswith(
+            "MMSDM/2015/MMSDM_2015_03/MMSDM_Historical_Data_SQLLoader/DATA/"
+            "PUBLIC_DVD_DISPATCH_UNIT_SCADA_201503010000.zip"
+        )
+
+    def test_store_processed_item(self):
+        subject = store_record_item({"num_records": 12}, BulkInsertPipeline())
+
+        assert subject == 12, "Records stored by the processor are counted"
+
+    def test_store_processed_item_error(self):
+        subject = store_record_item({"num_records": "ERROR"}, BulkInsertPipeline())
+
+        assert subject == 0
+
+    def test_store_processed_item_failed(self):
+        with pytest.raises(Exception):
+            store_record_item({"num_records": 0, "num_errors": 1}, BulkInsertPipeline())
+
+    def test_backfill_checkpoint(self, monkeypatch, checkpoints):
+        monkeypatch.setattr(
+            mms_backfill, "process_table_stream", lambda fh, spider: iter([{"num_records": 5}])
+        )
+
+        assert backfill_archive("DISPATCH_REGIONSUM", datetime(2015, 3, 1)) == 5
+        assert checkpoints == [("DISPATCH_REGIONSUM", datetime(2015, 3, 1), 5)]
+
+    def test_backfill_failed_not_checkpointed(self, monkeypatch, checkpoints):
+        monkeypatch.setattr(
+            mms_backfill,
+            "process_table_stream",
+            lambda fh, spider: iter([{"num_records": 5}, {"num_records": 0, "num_errors": 1}]),
+        )
+
+        with pytest.raises(Exception):
+            backfill_archive("DISPATCH_REGIONSUM", datetime(2015, 3, 1))
+
+        assert checkpoints == [], "Failed archive is retried on the next run"
@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+import pytest
+
+from opennem.core.normalizers import clean_float, clean_float_column
+
+
+class TestCleanFloatColumn(object):
+    def test_matches_clean_float(self):
+        values = ["12.5", " 1.25 ", "", "0", 350, 1.5, Decimal("2.5"), None]
+
+        assert clean_float_column(values) == [clean_float(i) for i in values]
+
+    def test_null_values(self):
+        assert clean_float_column(["", " ", "-", "NULL", "N/A"]) == [None] * 5
+
+    def test_as_str(self):
+        subject = clean_float_column(["12.5", "1e-05", "0", ""], as_str=True)
+
+        assert subject == ["12.5", "0.00001", 0.0, None]
+
+    def test_repeated_values(self):
+        subject = clean_float_column(["1.5"] * 3 + ["2"])
+
+        assert subject == [1.5, 1.5, 1.5, 2.0]
+
+    def test_invalid_value(self):
+        with pytest.raises(ValueError) as excinfo:
+            clean_float_column(["1.5", "bad"])
+
+        assert "Invalid float value: bad" in str(excinfo.value)
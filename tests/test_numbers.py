@@ -1,6 +1,6 @@
 import pytest
 
-from opennem.utils.numbers import sigfig_compact
+from opennem.utils.numbers import float_to_str, sigfig_compact
 
 
 @pytest.mark.parametrize(
@@ -30,3 +30,22 @@ from opennem.utils.numbers import sigfig_compact
 def test_sigfig_compact(number, number_expected) -> None:
     number = sigfig_compact(number, 4)
     assert number == number_expected
+
+
+@pytest.mark.parametrize(
+    "number,number_expected",
+    [
+        (0.0, "0.0"),
+        (-0.0, "-0.0"),
+        (12.5, "12.5"),
+        (100.0, "100.0"),
+        (1e-05, "0.00001"),
+        (-1.25e-07, "-0.000000125"),
+        (1e16, "10000000000000000"),
+        (1.5e16, "15000000000000000"),
+        (float("nan"), "NaN"),
+        (float("-inf"), "-Infinity"),
+    ],
+)
+def test_float_to_str(number, number_expected) -> None:
+    assert float_to_str(number) == number_expected
@@ -0,0 +1,67 @@
+from opennem.utils.pipelines import (
+    check_spider_pipeline,
+    get_spider_pipelines,
+    spider_has_pipeline,
+)
+
+
+class EnabledPipeline(object):
+    @check_spider_pipeline
+    def process_item(self, item, spider=None):
+        item["processed"] = True
+        return item
+
+
+class ExtraPipeline(EnabledPipeline):
+    pass
+
+
+class DisabledPipeline(EnabledPipeline):
+    pass
+
+
+class FakeSpider(object):
+    name = "test.pipelines"
+
+    pipelines = set([EnabledPipeline])
+
+    def log(self, *args, **kwargs):
+        pass
+
+
+class TestSpiderPipelines(object):
+    def test_enabled_pipelines(self):
+        spider = FakeSpider()
+        spider.pipelines_extra = set([ExtraPipeline])
+
+        assert get_spider_pipelines(spider) == frozenset([EnabledPipeline, ExtraPipeline])
+        assert spider_has_pipeline(ExtraPipeline(), spider) is True
+        assert spider_has_pipeline(DisabledPipeline(), spider) is False
+
+    def test_enabled_pipelines_cached(self):
+        spider = FakeSpider()
+
+        assert get_spider_pipelines(spider) is get_spider_pipelines(spider)
+
+    def test_reassigned_pipelines(self):
+        spider = FakeSpider()
+
+        assert spider_has_pipeline(DisabledPipeline(), spider) is False
+
+        spider.pipelines = set([DisabledPipeline])
+
+        assert spider_has_pipeline(DisabledPipeline(), spider) is True
+        assert spider_has_pipeline(EnabledPipeline(), spider) is False
+
+    def test_invalid_pipelines(self):
+        spider = FakeSpider()
+        spider.pipelines = [EnabledPipeline]
+
+        assert get_spider_pipelines(spider) == frozenset()
+        assert get_spider_pipelines(None) == frozenset()
+
+    def test_check_spider_pipeline(self):
+        spider = FakeSpider()
+
+        assert EnabledPipeline().process_item({}, spider) == {"processed": True}
+        assert DisabledPipeline().process_item({}, spider) == {}
@@ -0,0 +1,264 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from databases.backends.postgres import PostgresBackend, PostgresConnection
+from sqlalchemy.dialects import postgresql
+
+from opennem.api.export.queries import (
+    power_network_fueltech_query,
+    price_network_query,
+    weather_observation_query,
+)
+from opennem.api.stats.queries import (
+    energy_network,
+    energy_network_fueltech,
+    energy_network_fueltech_year,
+    power_facility_query,
+    power_network_fueltech,
+    price_network_monthly,
+    price_network_region,
+)
+from opennem.api.stats.schema import ScadaDateRange
+from opennem.api.templates import (
+    QueryTemplateException,
+    get_query,
+    get_query_template,
+    register_query_template,
+)
+from opennem.api.time import human_to_interval, human_to_period
+from opennem.api.weather.queries import observation_query
+from opennem.db import SESSION_TIMEZONE_OPTION
+from opennem.schema.dates import TimeSeries
+from opennem.schema.network import NetworkAU, NetworkNEM, NetworkWEM
+
+DIALECT = postgresql.dialect()
+
+ASYNC_BACKEND = PostgresBackend("postgresql://localhost/opennem")
+
+# asyncpg has the server infer parameter types and only encodes matching python types
+CAST_TYPES = {
+    "text": (str,),
+    "timestamptz": (datetime, type(None)),
+}
+
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+END = datetime(2021, 2, 1, tzinfo=timezone.utc)
+
+SCADA_RANGE = ScadaDateRange(start=START, end=END, network=NetworkNEM)
+
+register_query_template(
+    "test_template",
+    """
+    select * from facility_scada fs
+    where fs.facility_code = ANY(:facility_codes) {network_query}
+    """,
+)
+
+
+def _compile(query):
+    compiled = query.compile(dialect=DIALECT)
+
+    return str(compiled), compiled.params
+
+
+def _compile_async(query):
+    """Compile as `databases` does before passing the arguments to asyncpg"""
+    connection = PostgresConnection(ASYNC_BACKEND, ASYNC_BACKEND._dialect)
+    query, args, _ = connection._compile(query)
+
+    return query, args
+
+
+def _time_series(interval: str = "1d", period: str = "7d") -> TimeSeries:
+    return TimeSeries(
+        start=START,
+        end=END,
+        network=NetworkNEM,
+        interval=human_to_interval(interval),
+        period=human_to_period(period),
+    )
+
+
+class TestQueryTemplates(object):
+    def test_registered_once(self):
+        with pytest.raises(QueryTemplateException):
+            register_query_template("test_template", "select 1")
+
+    def test_missing(self):
+        with pytest.raises(QueryTemplateException):
+            get_query_template("test_template_missing")
+
+    def test_variants_compiled_once(self):
+        slots = {"network_query": "and fs.network_id = :network_code"}
+
+        assert get_query_template("test_template", slots) is get_query_template(
+            "test_template", dict(slots)
+        )
+        assert get_query_template("test_template", slots) is not get_query_template(
+            "test_template", {"network_query": ""}
+        )
+
+    def test_unused_params_dropped(self):
+        query, params = _compile(
+            get_query(
+                "test_template",
+                {"network_query": ""},
+                facility_codes=["BAYSW1"],
+                network_code="NEM",
+            )
+        )
+
+        assert "%(facility_codes)s" in query
+        assert params == {"facility_codes": ["BAYSW1"]}
+
+    def test_statement_stable(self):
+        first, _ = _compile(
+            get_query("test_template", {"network_query": ""}, facility_codes=["BAYSW1"])
+        )
+        second, _ = _compile(
+            get_query("test_template", {"network_query": ""}, facility_codes=["A", "B"])
+        )
+
+        assert first == second
+
+
+class TestStatsQueries(object):
+    def test_power_facility(self):
+        query, params = _compile(
+            power_facility_query(
+                ["BAYSW1 ", "BAYSW2"],
+                NetworkNEM,
+                human_to_period("7d"),
+                interval=human_to_interval("5m"),
+                date_range=SCADA_RANGE,
+            )
+        )
+
+        assert "BAYSW" not in query
+        assert params["facility_codes"] == ["BAYSW1", "BAYSW2"]
+        assert params["date_max"] == END
+        assert params["date_min"] == datetime(2021, 1, 25, tzinfo=timezone.utc)
+
+    def test_network_region_slot(self):
+        interval = human_to_interval("5m")
+        period = human_to_period("7d")
+
+        query, params = _compile(energy_network_fueltech(NetworkNEM, interval, period, "NSW1"))
+
+        assert "f.network_region = %(network_region)s" in query
+        assert params["network_region"] == "NSW1"
+        assert params["interval_size"] == 5
+
+        query, params = _compile(energy_network_fueltech(NetworkNEM, interval, period))
+
+        assert "network_region" not in query
+        assert "network_region" not in params
+
+    def test_price_region_year(self):
+        query, params = _compile(
+            price_network_region(
+                NetworkNEM, "NSW1", human_to_interval("1d"), None, SCADA_RANGE, year=2020
+            )
+        )
+
+        assert params["year_start"] == datetime(2020, 1, 1, tzinfo=NetworkNEM.get_fixed_offset())
+        assert "period" not in params
+
+    def test_session_timezone(self):
+        query = price_network_monthly(NetworkNEM, None, SCADA_RANGE)
+
+        assert "SET SESSION" not in str(query)
+        assert query.get_execution_options()[SESSION_TIMEZONE_OPTION] == "+10"
+
+    def test_price_monthly_networks(self):
+        _, params = _compile(price_network_monthly(NetworkAU, None, SCADA_RANGE))
+
+        assert params["network_codes"] == ["WEM", "NEM"]
+
+        _, params = _compile(price_network_monthly(NetworkNEM, None, SCADA_RANGE))
+
+        assert params["network_codes"] == ["NEM"]
+
+
+class TestExportQueries(object):
+    def test_weather_station_codes(self):
+        query, params = _compile(weather_observation_query(_time_series(), ["066062"]))
+
+        assert "ANY(%(station_codes)s)" in query
+        assert params["station_codes"] == ["066062"]
+
+    def test_price_group_field(self):
+        query, _ = _compile(price_network_query(_time_series(), network_region="NSW1"))
+
+        assert "bs.network_region," in query
+
+        query, params = _compile(
+            price_network_query(_time_series(), networks_query=[NetworkNEM, NetworkWEM])
+        )
+
+        assert "'AU'," in query
+        assert params["network_codes"] == ["NEM", "WEM"]
+
+    def test_power_fueltech_wem_rooftop(self):
+        query, params = _compile(
+            power_network_fueltech_query(_time_series(), networks_query=[NetworkWEM])
+        )
+
+        assert "f.network_id='APVI'" in query
+        assert params["fueltechs_exclude"] == ["exports", "imports", "solar_rooftop"]
+
+
+class TestAsyncQueries(object):
+    @pytest.mark.parametrize(
+        "query",
+        [
+            power_facility_query(
+                ["BAYSW1"],
+                NetworkNEM,
+                human_to_period("7d"),
+                interval=human_to_interval("5m"),
+                date_range=SCADA_RANGE,
+            ),
+            power_network_fueltech(
+                NetworkNEM, human_to_interval("30m"), human_to_period("7d"), "NSW1", SCADA_RANGE
+            ),
+            energy_network(NetworkNEM, human_to_interval("1d"), human_to_period("1M")),
+            energy_network_fueltech_year(NetworkNEM, human_to_interval("1d"), 2020),
+            price_network_region(
+                NetworkNEM, "NSW1", human_to_interval("30m"), human_to_period("7d"), SCADA_RANGE
+            ),
+            price_network_region(
+                NetworkNEM, "NSW1", human_to_interval("1d"), None, SCADA_RANGE, year=2020
+            ),
+            observation_query(
+                ["066062"],
+                human_to_interval("30m"),
+                period=human_to_period("7d"),
+                scada_range=SCADA_RANGE,
+            ),
+        ],
+    )
+    def test_cast_argument_types(self, query):
+        query, args = _compile_async(query)
+        casts = re.findall(r"CAST\(\$(\d+) AS (\w+)\)", query)
+
+        assert casts
+
+        for position, cast_type in casts:
+            assert cast_type in CAST_TYPES, "{} bound to a str won't encode".format(cast_type)
+            assert isinstance(args[int(position) - 1], CAST_TYPES[cast_type])
+
+    def test_interval_bound_as_text(self):
+        query, args = _compile_async(
+            price_network_region(
+                NetworkNEM, "NSW1", human_to_interval("30m"), human_to_period("7d"), SCADA_RANGE
+            )
+        )
+
+        # arguments are ordered by bind name
+        assert "CAST($1 AS timestamptz) - CAST($4 AS text)::interval" in query
+        assert args[0] == END
+        assert args[3] == human_to_period("7d").period_sql
+        assert not [i for i in args if isinstance(i, timedelta)]
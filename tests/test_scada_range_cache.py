@@ -0,0 +1,231 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from opennem.api.stats import controllers
+from opennem.api.stats.controllers import (
+    extend_scada_range_for_records,
+    get_facility_scada_ranges,
+    get_scada_range,
+)
+from opennem.api.stats.schema import ScadaDateRange
+from opennem.schema.network import NetworkNEM, NetworkWEM
+from opennem.utils.cache import (
+    cache_scada_result,
+    extend_scada_range_cache,
+    get_cached_scada_range,
+    get_scada_range_key,
+    scada_cache,
+    set_cached_scada_range,
+    single_flight,
+)
+
+START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+END = datetime(2021, 2, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    scada_cache.clear()
+    yield
+    scada_cache.clear()
+
+
+def _range(end: datetime = END, network=NetworkNEM) -> ScadaDateRange:
+    return ScadaDateRange(start=START, end=end, network=network)
+
+
+class FakeRangeQuery(object):
+    """Stands in for the facility range query and records what was asked for"""
+
+    def __init__(self, ranges):
+        self.ranges = ranges
+        self.calls = []
+
+    def __call__(self, facility_codes, network=None):
+        self.calls.append(list(facility_codes))
+
+        return {f: self.ranges[f] for f in facility_codes if f in self.ranges}
+
+
+class TestScadaRangeKey(object):
+    def test_sorted(self):
+        assert get_scada_range_key(["WEM", "NEM"]) == get_scada_range_key(["NEM", "WEM"])
+        assert get_scada_range_key(["NEM"], ["B", "A"]) == "NEM:A,B"
+
+    def test_networks_only(self):
+        assert get_scada_range_key(["NEM", "NEM"]) == "NEM:"
+
+
+class TestCacheScadaResult(object):
+    def test_cached(self):
+        calls = []
+
+        @cache_scada_result
+        def scada_range(network=None, networks=None, network_region=None, facilities=None):
+            calls.append(network)
+            return _range(network=network)
+
+        assert scada_range(network=NetworkNEM) == _range()
+        assert scada_range(network=NetworkNEM) == _range()
+        assert len(calls) == 1
+
+        scada_range(network=NetworkWEM)
+
+        assert len(calls) == 2
+
+    def test_none_not_cached(self):
+        calls = []
+
+        @cache_scada_result
+        def scada_range(network=None, networks=None, network_region=None, facilities=None):
+            calls.append(network)
+            return None
+
+        assert scada_range(network=NetworkNEM) is None
+        assert scada_range(network=NetworkNEM) is None
+        assert len(calls) == 2
+
+    def test_returns_copies(self):
+        set_cached_scada_range("NEM:", _range())
+
+        get_cached_scada_range("NEM:").end = START
+
+        assert get_cached_scada_range("NEM:").end == END
+
+
+def test_single_flight():
+    calls = []
+    results = []
+
+    def _compute():
+        calls.append(1)
+        time.sleep(0.05)
+        set_cached_scada_range("NEM:", _range())
+        return _range()
+
+    def _run():
+        results.append(single_flight("NEM:", lambda: get_cached_scada_range("NEM:"), _compute))
+
+    threads = [threading.Thread(target=_run) for _ in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [_range()] * 8
+
+
+class TestExtendScadaRange(object):
+    def test_extend_network(self):
+        set_cached_scada_range("NEM:", _range())
+        set_cached_scada_range("NEM,WEM:", _range())
+        set_cached_scada_range("WEM:", _range())
+
+        end = END + timedelta(minutes=5)
+
+        assert extend_scada_range_cache("NEM", end) == 2
+        assert get_cached_scada_range("NEM:").end == end
+        assert get_cached_scada_range("NEM,WEM:").end == end
+        assert get_cached_scada_range("WEM:").end == END
+
+    def test_extend_facilities(self):
+        set_cached_scada_range("NEM:BAYSW1", _range())
+        set_cached_scada_range("NEM:BAYSW2", _range())
+
+        end = END + timedelta(minutes=5)
+
+        assert extend_scada_range_cache("NEM", end, {"BAYSW1": end}) == 1
+        assert get_cached_scada_range("NEM:BAYSW1").end == end
+        assert get_cached_scada_range("NEM:BAYSW2").end == END
+
+    def test_never_moves_back(self):
+        set_cached_scada_range("NEM:", _range())
+
+        assert extend_scada_range_cache("NEM", END - timedelta(days=1)) == 0
+        assert get_cached_scada_range("NEM:").end == END
+
+    def test_extend_for_records(self):
+        set_cached_scada_range("NEM:", _range())
+        set_cached_scada_range("NEM:BAYSW1", _range())
+
+        end = END + timedelta(minutes=10)
+        records = [
+            {"network_id": "NEM", "facility_code": "BAYSW1", "trading_interval": end},
+            {"network_id": "NEM", "facility_code": "BAYSW1", "trading_interval": END},
+            {
+                "network_id": "NEM",
+                "facility_code": "ROOFTOP_NEM_NSW",
+                "trading_interval": end + timedelta(days=1),
+            },
+            {
+                "network_id": "NEM",
+                "facility_code": "NSW1-QLD1",
+                "trading_interval": end + timedelta(days=1),
+            },
+            {
+                "network_id": "NEM",
+                "facility_code": "BAYSW1",
+                "trading_interval": end + timedelta(days=1),
+                "is_forecast": True,
+            },
+        ]
+
+        assert extend_scada_range_for_records(records) == 2
+        assert get_cached_scada_range("NEM:").end == end
+        assert get_cached_scada_range("NEM:BAYSW1").end == end
+
+
+class TestFacilityScadaRanges(object):
+    def test_batched(self, monkeypatch):
+        query = FakeRangeQuery({"BAYSW1": _range(), "BAYSW2": _range()})
+        monkeypatch.setattr(controllers, "_query_facility_scada_ranges", query)
+
+        ranges = get_facility_scada_ranges(["BAYSW2", "BAYSW1", "BAYSW3"], network=NetworkNEM)
+
+        assert set(ranges.keys()) == {"BAYSW1", "BAYSW2"}
+        assert query.calls == [["BAYSW1", "BAYSW2", "BAYSW3"]]
+
+    def test_only_missing_queried(self, monkeypatch):
+        query = FakeRangeQuery({"BAYSW2": _range()})
+        monkeypatch.setattr(controllers, "_query_facility_scada_ranges", query)
+
+        set_cached_scada_range("NEM:BAYSW1", _range())
+
+        ranges = get_facility_scada_ranges(["BAYSW1", "BAYSW2"], network=NetworkNEM)
+
+        assert set(ranges.keys()) == {"BAYSW1", "BAYSW2"}
+        assert query.calls == [["BAYSW2"]]
+
+        get_facility_scada_ranges(["BAYSW1", "BAYSW2"], network=NetworkNEM)
+
+        assert len(query.calls) == 1
+
+    def test_scada_range_combined(self, monkeypatch):
+        query = FakeRangeQuery(
+            {
+                "BAYSW1": ScadaDateRange(start=START, end=END, network=NetworkNEM),
+                "BAYSW2": ScadaDateRange(
+                    start=START - timedelta(days=1),
+                    end=END - timedelta(days=1),
+                    network=NetworkNEM,
+                ),
+            }
+        )
+        monkeypatch.setattr(controllers, "_query_facility_scada_ranges", query)
+
+        scada_range = get_scada_range(network=NetworkNEM, facilities=["BAYSW1", "BAYSW2"])
+
+        assert scada_range.start == START - timedelta(days=1)
+        assert scada_range.end == END
+
+    def test_no_scada(self, monkeypatch):
+        monkeypatch.setattr(controllers, "_query_facility_scada_ranges", FakeRangeQuery({}))
+
+        assert get_scada_range(network=NetworkNEM, facilities=["BAYSW1"]) is None
@@ -1,4 +1,5 @@
-from opennem.core.normalizers import station_name_cleaner
+from opennem.core.normalizers import _station_name_cleaner_cached, station_name_cleaner
+from opennem.core.station_names import station_map_name
 
 
 class TestStationNameCleaner(object):
@@ -171,3 +172,24 @@ class TestStationNameCleaner(object):
         subject = station_name_cleaner(name)
 
         assert subject == "Swanbank E", "Swanbank E"
+
+    # Maps and memo
+
+    def test_name_map_prefix(self):
+        assert station_map_name("swan hill solar farm") == "Swan Hill Solar Farm"
+        assert station_map_name("Swan Hill Solar Farm stage 2") == "Swan Hill Solar Farm"
+        assert station_map_name("not a mapped name") == "not a mapped name"
+        assert station_map_name(None) is None
+
+    def test_cleaner_non_string(self):
+        assert station_name_cleaner(1) == "1"
+
+    def test_cleaner_memoized(self):
+        name = "Memo Test Power Station"
+
+        assert station_name_cleaner(name) == "Memo Test"
+
+        hits = _station_name_cleaner_cached.cache_info().hits
+
+        assert station_name_cleaner(name) == "Memo Test"
+        assert _station_name_cleaner_cached.cache_info().hits == hits + 1
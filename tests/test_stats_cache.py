@@ -0,0 +1,236 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.testclient import TestClient
+
+from opennem.api.stats import cache
+from opennem.api.stats.cache import (
+    STATS_CACHE_LOCAL_TTL,
+    STATS_CACHE_TTL_HISTORY,
+    StatsCacheKey,
+    cache_stats_response,
+    clear_stats_cache,
+    get_cached_response,
+    get_stats_cache_key,
+    get_stats_cache_ttl,
+    invalidate_stats_cache,
+    invalidate_stats_cache_for_records,
+    set_cached_response,
+)
+from opennem.api.stats.schema import OpennemDataSet
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    clear_stats_cache()
+    yield
+    clear_stats_cache()
+
+
+def _key(code: str = "BAYSW", network: str = "NEM", year: str = "") -> StatsCacheKey:
+    return get_stats_cache_key("power_station", network, code, "5m", "7d", year)
+
+
+class TestStatsCacheKey(object):
+    def test_normalised(self):
+        key = get_stats_cache_key("power_station", "nem ", " BAYSW", "5m", "7d", 2020)
+
+        assert key == StatsCacheKey("power_station", "NEM", "BAYSW", "5m", "7d", "2020")
+
+    def test_unset_params(self):
+        key = get_stats_cache_key("energy_network", "WEM")
+
+        assert key == StatsCacheKey("energy_network", "WEM", "", "", "", "")
+
+    def test_redis_key_round_trip(self):
+        key = get_stats_cache_key("power_station", "NEM", "A:B", "1d", "all", 2019)
+
+        assert key.redis_key == "opennem:stats:power_station:NEM:A:B:1d:all:2019"
+        assert StatsCacheKey.from_redis_key(key.redis_key) == key
+
+
+@pytest.mark.parametrize(
+    ["interval", "year", "ttl_expected"],
+    [
+        ("5m", None, 60),
+        (None, None, 60),
+        ("30m", None, 300),
+        ("1d", None, 900),
+        ("1M", None, 3600),
+        ("1Y", None, 3600),
+        ("1d", str(datetime.now().year), 900),
+        ("1d", "2015", STATS_CACHE_TTL_HISTORY),
+    ],
+)
+def test_stats_cache_ttl(interval, year, ttl_expected):
+    assert get_stats_cache_ttl(interval, year) == ttl_expected
+
+
+class TestStatsCacheStore(object):
+    def test_hit_and_miss(self):
+        set_cached_response(_key(), b"{}")
+
+        assert get_cached_response(_key()) == b"{}"
+        assert get_cached_response(_key("ERARING")) is None
+
+    def test_expired(self):
+        set_cached_response(_key(), b"{}", ttl=-1)
+
+        assert get_cached_response(_key()) is None
+
+    def test_local_ttl_capped(self, monkeypatch):
+        now = cache.time.monotonic()
+        set_cached_response(_key(year="2015"), b"{}")
+
+        monkeypatch.setattr(
+            cache, "time", SimpleNamespace(monotonic=lambda: now + STATS_CACHE_LOCAL_TTL + 1)
+        )
+
+        assert get_cached_response(_key(year="2015")) is None
+
+    def test_invalidate_network(self):
+        set_cached_response(_key("BAYSW"), b"{}")
+        set_cached_response(_key("ERARING"), b"{}")
+        set_cached_response(_key("MUJA", network="WEM"), b"{}")
+
+        assert invalidate_stats_cache("nem") == 2
+        assert get_cached_response(_key("BAYSW")) is None
+        assert get_cached_response(_key("MUJA", network="WEM")) == b"{}"
+
+    def test_invalidate_codes(self):
+        set_cached_response(_key("BAYSW"), b"{}")
+        set_cached_response(_key("ERARING"), b"{}")
+
+        assert invalidate_stats_cache("NEM", codes=["ERARING"]) == 1
+        assert get_cached_response(_key("BAYSW")) == b"{}"
+
+    def test_invalidate_since_keeps_history(self):
+        set_cached_response(_key("BAYSW", year="2019"), b"{}")
+        set_cached_response(_key("BAYSW", year="2021"), b"{}")
+        set_cached_response(_key("BAYSW"), b"{}")
+
+        assert invalidate_stats_cache("NEM", since=datetime(2021, 2, 1)) == 2
+        assert get_cached_response(_key("BAYSW", year="2019")) == b"{}"
+
+    def test_invalidate_for_records(self):
+        set_cached_response(_key("BAYSW", year="2020"), b"{}")
+        set_cached_response(_key("BAYSW", year="2021"), b"{}")
+        set_cached_response(_key("MUJA", network="WEM"), b"{}")
+
+        records = [
+            {"network_id": "NEM", "trading_interval": datetime(2021, 2, 1, 12, 5)},
+            {"network_id": "NEM", "trading_interval": datetime(2021, 2, 1, 12, 0)},
+            {"network_id": None, "trading_interval": datetime(2021, 2, 1, 12, 0)},
+        ]
+
+        assert invalidate_stats_cache_for_records(records) == 1
+        assert get_cached_response(_key("BAYSW", year="2020")) == b"{}"
+        assert get_cached_response(_key("MUJA", network="WEM")) == b"{}"
+
+
+class TestCacheStatsResponse(object):
+    def setup_method(self):
+        self.num_calls = 0
+
+        app = FastAPI()
+
+        def get_result(network_code: str, station_code: str) -> OpennemDataSet:
+            self.num_calls += 1
+
+            if station_code == "MISSING":
+                raise HTTPException(status_code=404, detail="Station not found")
+
+            return OpennemDataSet(
+                network=network_code,
+                code=station_code,
+                created_at=datetime(2021, 2, 1, 12, 0, 30),
+                data=[],
+            )
+
+        @app.get(
+            "/cached/{network_code}/{station_code}",
+            response_model=OpennemDataSet,
+            response_model_exclude_unset=True,
+        )
+        @cache_stats_response("test", code="station_code", interval="interval_human")
+        def cached_route(
+            network_code: str = Query(...),
+            station_code: str = Query(...),
+            interval_human: str = Query(None),
+        ) -> OpennemDataSet:
+            return get_result(network_code, station_code)
+
+        @app.get(
+            "/cached_async/{network_code}/{station_code}",
+            response_model=OpennemDataSet,
+            response_model_exclude_unset=True,
+        )
+        @cache_stats_response("test_async", code="station_code")
+        async def cached_async_route(
+            network_code: str = Query(...),
+            station_code: str = Query(...),
+        ) -> OpennemDataSet:
+            return get_result(network_code, station_code)
+
+        @app.get(
+            "/uncached/{network_code}/{station_code}",
+            response_model=OpennemDataSet,
+            response_model_exclude_unset=True,
+        )
+        def uncached_route(
+            network_code: str = Query(...),
+            station_code: str = Query(...),
+        ) -> OpennemDataSet:
+            return get_result(network_code, station_code)
+
+        self.client = TestClient(app)
+
+    def test_response_matches_uncached(self):
+        cached = self.client.get("/cached/NEM/BAYSW")
+        uncached = self.client.get("/uncached/NEM/BAYSW")
+
+        assert cached.status_code == 200
+        assert cached.headers["content-type"] == "application/json"
+        assert cached.content == uncached.content
+
+    def test_cached(self):
+        first = self.client.get("/cached/NEM/BAYSW", params={"interval_human": "5m"})
+        second = self.client.get("/cached/NEM/BAYSW", params={"interval_human": "5m"})
+
+        assert first.content == second.content
+        assert self.num_calls == 1
+
+        self.client.get("/cached/NEM/BAYSW", params={"interval_human": "1d"})
+
+        assert self.num_calls == 2
+
+    def test_cached_async(self):
+        first = self.client.get("/cached_async/NEM/BAYSW")
+        second = self.client.get("/cached_async/NEM/BAYSW")
+        uncached = self.client.get("/uncached/NEM/BAYSW")
+
+        assert first.content == second.content == uncached.content
+        assert self.num_calls == 2
+        assert self.client.get("/cached_async/NEM/MISSING").status_code == 404
+
+    def test_invalidated(self):
+        self.client.get("/cached/NEM/BAYSW")
+        invalidate_stats_cache("NEM", codes=["BAYSW"])
+        self.client.get("/cached/NEM/BAYSW")
+
+        assert self.num_calls == 2
+
+    def test_errors_not_cached(self):
+        assert self.client.get("/cached/NEM/MISSING").status_code == 404
+        assert self.client.get("/cached/NEM/MISSING").status_code == 404
+        assert self.num_calls == 2
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(cache.settings, "cache_stats_enabled", False)
+
+        self.client.get("/cached/NEM/BAYSW")
+        self.client.get("/cached/NEM/BAYSW")
+
+        assert self.num_calls == 2
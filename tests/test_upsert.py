@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+from opennem.db.models.opennem import BalancingSummary, FacilityScada
+from opennem.db.upsert import build_upsert_query, get_upsert_columns
+
+RECORDS = [
+    {
+        "network_id": "NEM",
+        "facility_code": "N-Q-MNSP1",
+        "trading_interval": datetime(2020, 10, 7, 10, 15, 0),
+        "generated": -20.0,
+    }
+]
+
+
+class TestUpsert(object):
+    def test_upsert_columns_defaults(self):
+        column_names, column_defaults = get_upsert_columns(FacilityScada, RECORDS)
+
+        assert column_names == [
+            "network_id",
+            "trading_interval",
+            "facility_code",
+            "generated",
+            "is_forecast",
+        ], "Columns are in table order"
+        assert column_defaults == {"is_forecast": False}, "Primary key default is filled in"
+
+    def test_upsert_columns_invalid(self):
+        with pytest.raises(Exception):
+            get_upsert_columns(FacilityScada, [{"network_id": "NEM", "invalid": 1}])
+
+    def test_upsert_query(self):
+        query = build_upsert_query(BalancingSummary, ["network_id", "price"], ["price"])
+
+        assert "INSERT INTO balancing_summary (network_id,price)" in query
+        assert "VALUES %s" in query
+        assert "(network_id,trading_interval,network_region) DO UPDATE" in query
+        assert "price = EXCLUDED.price" in query
+
+    def test_upsert_query_no_update(self):
+        query = build_upsert_query(BalancingSummary, ["network_id"])
+
+        assert "ON CONFLICT DO NOTHING" in query